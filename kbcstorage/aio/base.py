@@ -0,0 +1,143 @@
+"""
+Base classes for constructing the asynchronous client.
+
+The asynchronous endpoints reuse the request building of their synchronous
+counterparts and only replace the HTTP layer, so ``await endpoint.list()``
+sends exactly the same request as ``endpoint.list()`` does. Failed requests
+raise ``httpx.HTTPStatusError``.
+"""
+import asyncio
+import contextvars
+import functools
+
+from kbcstorage.aio.retry_requests import AsyncRetryRequests
+from kbcstorage import json_backend
+from kbcstorage.base import Endpoint
+from kbcstorage.single_flight import get_request_key
+
+
+class AsyncEndpoint(Endpoint):
+    """
+    Base class for implementing a single asynchronous endpoint. It is meant
+    to be mixed in front of the synchronous endpoint class.
+    """
+    transport_class = AsyncRetryRequests
+
+    async def _get_raw(self, url, params=None, **kwargs):
+        """
+        Make an authenticated GET request.
+
+        Args:
+            url (str): requested url
+            params (dict): additional url params
+            **kwargs: Key word arguments to pass to the request.
+
+        Returns:
+            r (httpx.Response): object
+
+        Raises:
+            httpx.HTTPStatusError: If the API request fails.
+        """
+        headers = kwargs.pop('headers', {})
+        headers.update(self._auth_header)
+        single_flight = getattr(self.requests, 'single_flight', None)
+        if single_flight is None or kwargs:
+            r = await self.requests.get(url, params=params, headers=headers, **kwargs)
+        else:
+            # identical requests in flight share the response
+            r = await single_flight.do(get_request_key(url, params, headers),
+                                       lambda: self.requests.get(url, params=params, headers=headers))
+        r.raise_for_status()
+        return r
+
+    async def _get(self, url, params=None, **kwargs):
+        """
+        Make authenticated GET request and return json
+
+        Raises:
+            httpx.HTTPStatusError: If the API request fails.
+        """
+        cache = self._get_cache(url, kwargs)
+        if cache is None:
+            r = await self._get_raw(url, params, **kwargs)
+            body = json_backend.loads(r.content)
+            self._record_read(url, body)
+            return body
+        key = cache.get_key(self.token, url, params)
+        entry = cache.get(key)
+        if entry is not None and entry.is_fresh():
+            return entry.body
+        headers = kwargs.pop('headers', {})
+        headers.update(cache.get_validators(entry))
+        headers.update(self._auth_header)
+        r = await self.requests.get(url, params=params, headers=headers, **kwargs)
+        if r.status_code != 304:
+            r.raise_for_status()
+        return cache.update(key, url, entry, r.status_code, r.headers, r.text)
+
+    async def _get_iter(self, url, params=None):
+        """
+        Make authenticated GET request and yield the items of the JSON array
+        in the response. The response is downloaded first, only its parsing
+        is incremental.
+
+        Raises:
+            httpx.HTTPStatusError: If the API request fails.
+        """
+        r = await self._get_raw(url, params)
+        for item in json_backend.iter_array(r.iter_bytes()):
+            yield item
+
+    async def _post(self, url, **kwargs):
+        """
+        Make authenticated POST request and return json
+
+        Raises:
+            httpx.HTTPStatusError: If the API request fails.
+        """
+        headers = kwargs.pop('headers', {})
+        headers.update(self._auth_header)
+        r = await self.requests.post(url, headers=headers, **kwargs)
+        self._invalidate_cache(url)
+        r.raise_for_status()
+        return json_backend.loads(r.content)
+
+    async def _put(self, url, **kwargs):
+        """
+        Make authenticated PUT request and return json
+
+        Raises:
+            httpx.HTTPStatusError: If the API request fails.
+        """
+        headers = kwargs.pop('headers', {})
+        headers.update(self._auth_header)
+        r = await self.requests.put(url, headers=headers, **kwargs)
+        self._invalidate_cache(url)
+        r.raise_for_status()
+        return json_backend.loads(r.content)
+
+    async def _delete(self, url, **kwargs):
+        """
+        Make authenticated DELETE request and return json, if any
+
+        Raises:
+            httpx.HTTPStatusError: If the API request fails.
+        """
+        headers = kwargs.pop('headers', {})
+        headers.update(self._auth_header)
+        r = await self.requests.delete(url, headers=headers, **kwargs)
+        self._invalidate_cache(url)
+        r.raise_for_status()
+        if 'application/json' in r.headers.get('Content-Type', ''):
+            return json_backend.loads(r.content)
+
+    @staticmethod
+    async def _run_sync(func, *args, **kwargs):
+        """
+        Run blocking work, such as cloud storage transfers, in the default
+        executor of the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        # the executor does not carry the context, which holds the current span
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(None, functools.partial(context.run, func, *args, **kwargs))
@@ -0,0 +1,11 @@
+"""
+Asynchronous calls to the Storage API relating to development branches.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.branches import Branches
+
+
+class AsyncBranches(AsyncEndpoint, Branches):
+    """
+    Asynchronous Branches Endpoint
+    """
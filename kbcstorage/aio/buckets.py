@@ -0,0 +1,32 @@
+"""
+Asynchronous calls to the Storage API relating to buckets.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.aio.jobs import AsyncJobs
+from kbcstorage.buckets import Buckets
+
+
+class AsyncBuckets(AsyncEndpoint, Buckets):
+    """
+    Asynchronous Buckets Endpoint
+    """
+    async def delete(self, bucket_id, force=False, asynchronous=True):
+        """
+        Delete a bucket referenced by ``bucket_id``.
+
+        Args:
+            bucket_id (str): The id of the bucket to be deleted.
+            force (bool): If ``True``, deletes the bucket even if it is not
+                empty. Default ``False``.
+            asynchronous (bool): If ``True``, wait for the deletion job.
+        """
+        url = '{}/{}'.format(self.base_url, bucket_id)
+        params = {'force': force, 'async': asynchronous}
+        if asynchronous:
+            job = await self._delete(url, params=params)
+            jobs = AsyncJobs(self.root_url, self.token, transport=self.requests)
+            job = await jobs.block_until_completed(job['id'])
+            if job['status'] == 'error':
+                raise RuntimeError(job['error']['message'])
+        else:
+            await self._delete(url, params=params)
@@ -0,0 +1,38 @@
+"""
+Asynchronous loading of the index of the tables of a project.
+"""
+import asyncio
+
+from kbcstorage.catalog import CATALOG_INCLUDE, Catalog
+
+
+class AsyncCatalog(Catalog):
+    """
+    Index of the tables of a project loaded with an :obj:`AsyncTables`
+    endpoint. Lookups are synchronous.
+    """
+    async def load(self):
+        """
+        Load all tables of the project, replacing the current index.
+
+        Returns:
+            catalog (:obj:`AsyncCatalog`): The catalog itself.
+        """
+        self._replace(await self.tables_endpoint.list(include=CATALOG_INCLUDE))
+        return self
+
+    async def refresh(self):
+        """
+        Update the index with the tables created, changed or deleted since
+        it was loaded, fetching the changed tables concurrently.
+
+        Returns:
+            changed (set): Ids of the tables added, changed or removed.
+        """
+        changed, removed = self._diff(await self.tables_endpoint.list())
+        if len(changed) > self.max_details:
+            await self.load()
+        else:
+            tables = await asyncio.gather(*(self.tables_endpoint.detail(table_id) for table_id in changed))
+            self._update(tables, removed)
+        return set(changed) | removed
@@ -0,0 +1,182 @@
+"""
+Entry point for the asynchronous Storage API client.
+"""
+from kbcstorage.aio.branches import AsyncBranches
+from kbcstorage.aio.buckets import AsyncBuckets
+from kbcstorage.aio.files import AsyncFiles
+from kbcstorage.aio.components import AsyncComponents
+from kbcstorage.aio.configurations import AsyncConfigurations
+from kbcstorage.aio.jobs import AsyncJobs
+from kbcstorage.aio.retry_requests import AsyncRetryRequests, create_async_client
+from kbcstorage.aio.tables import AsyncTables
+from kbcstorage.aio.tokens import AsyncTokens
+from kbcstorage.aio.triggers import AsyncTriggers
+from kbcstorage.aio.workspaces import AsyncWorkspaces
+from kbcstorage.base import lazy_endpoint
+from kbcstorage.circuit_breaker import CLOSED
+from kbcstorage.events import Events
+from kbcstorage.files import MAX_WORKERS_DEFAULT, UPLOAD_PART_RETRIES_DEFAULT, UPLOAD_PART_SIZE_DEFAULT
+from kbcstorage.rate_limiter import RateLimits
+from kbcstorage.retry_requests import MAX_RETRIES_DEFAULT, POOL_MAXSIZE_DEFAULT
+from kbcstorage.tables import SUBMIT_MAX_WORKERS_DEFAULT
+
+
+class AsyncClient:
+    """
+    Asynchronous Storage API Client.
+
+    All endpoints share a single connection pool, so many exports and loads
+    can run concurrently from one event loop::
+
+        async with AsyncClient('https://connection.keboola.com', token) as client:
+            await asyncio.gather(*(client.tables.export_to_file(table_id, '/data/')
+                                   for table_id in table_ids))
+    """
+
+    def __init__(self, api_domain, token, branch_id='default', file_storage_support=True,
+                 pool_maxsize=POOL_MAXSIZE_DEFAULT, max_connections=None,
+                 max_requests_retries=MAX_RETRIES_DEFAULT, retry_policy=None, rate_limits=None,
+                 circuit_breaker=None, cache=None, events=None, tracing=None,
+                 max_workers=SUBMIT_MAX_WORKERS_DEFAULT, transfer_max_workers=MAX_WORKERS_DEFAULT,
+                 upload_part_size=UPLOAD_PART_SIZE_DEFAULT, max_part_retries=UPLOAD_PART_RETRIES_DEFAULT):
+        """
+        Initialise a client.
+
+        Args:
+            api_domain (str): The domain on which the API sits. eg.
+                "https://connection.keboola.com".
+            token (str): A storage API key.
+            branch_id (str): The ID of branch to use, use 'default' to work without branch (in main).
+            file_storage_support (bool): If False, the client has no ``files`` endpoint. Endpoints are created on
+                first access and the libraries of a storage backend are imported only when a file stored in it
+                is transferred.
+            pool_maxsize (int): Maximum number of idle keep-alive connections.
+            max_connections (int): Maximum number of concurrent connections, unlimited by default.
+            max_requests_retries (int): Number of retries of failed requests.
+            retry_policy (:obj:`RetryPolicy`): Policy of retrying failed requests, overrides
+                ``max_requests_retries``.
+            rate_limits (:obj:`RateLimits`): Adaptive rate limits of the groups of endpoints,
+                ``RateLimits()`` by default. ``RateLimits({})`` disables them.
+            circuit_breaker (:obj:`CircuitBreaker`): Circuit breaker failing requests fast with
+                :obj:`CircuitOpenError` while the API is down, e.g. ``CircuitBreaker()``. None by default.
+            cache (:obj:`ResponseCache`): Cache of responses of the metadata of buckets, tables, components,
+                configurations and branches, e.g. ``ResponseCache(ttl=60)``. Responses are not cached by default.
+            events (:obj:`Events`): Subscribers of the events of the requests, job waits and file transfers of
+                the client, a new :obj:`Events` by default, see ``kbcstorage.events``.
+            tracing (:obj:`Tracing`): OpenTelemetry tracing of the requests and operations of the client, e.g.
+                ``Tracing()``, see ``kbcstorage.tracing``. Not traced by default.
+            max_workers (int): Number of table loads and exports started by the ``tables.submit_*`` methods
+                that run at once.
+            transfer_max_workers (int): Number of parts and slices of a file transferred at once by the
+                ``files`` endpoint and by table loads and exports.
+            upload_part_size (int): Size in bytes of the parts of multipart uploads.
+            max_part_retries (int): Number of attempts to upload each part of a multipart upload.
+        """
+        self.root_url = api_domain.rstrip("/")
+        self._token = token
+        self._branch_id = branch_id
+        self._transport = AsyncRetryRequests(
+            max_requests_retries,
+            client=create_async_client(pool_maxsize=pool_maxsize, max_connections=max_connections),
+            retry_policy=retry_policy,
+            rate_limits=rate_limits if rate_limits is not None else RateLimits(),
+            circuit_breaker=circuit_breaker,
+            cache=cache,
+            events=events if events is not None else Events(),
+            tracing=tracing
+        )
+
+        self._file_storage_support = file_storage_support
+        self._max_workers = max_workers
+        self._transfer_settings = {'max_workers': transfer_max_workers, 'upload_part_size': upload_part_size,
+                                   'max_part_retries': max_part_retries}
+
+    @lazy_endpoint
+    def buckets(self):
+        return AsyncBuckets(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def files(self):
+        if not self._file_storage_support:
+            raise AttributeError("The client was created without file storage support.")
+        return AsyncFiles(self.root_url, self.token, transport=self._transport, **self._transfer_settings)
+
+    @lazy_endpoint
+    def jobs(self):
+        return AsyncJobs(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def tables(self):
+        files = AsyncFiles(self.root_url, self.token, transport=self._transport, **self._transfer_settings)
+        return AsyncTables(self.root_url, self.token, transport=self._transport, max_workers=self._max_workers,
+                           files=files)
+
+    @lazy_endpoint
+    def workspaces(self):
+        return AsyncWorkspaces(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def components(self):
+        return AsyncComponents(self.root_url, self.token, self.branch_id, transport=self._transport)
+
+    @lazy_endpoint
+    def configurations(self):
+        return AsyncConfigurations(self.root_url, self.token, self.branch_id, transport=self._transport)
+
+    @lazy_endpoint
+    def tokens(self):
+        return AsyncTokens(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def branches(self):
+        return AsyncBranches(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def triggers(self):
+        return AsyncTriggers(self.root_url, self.token, transport=self._transport)
+
+    async def close(self):
+        """
+        Close the connections held open by the client.
+        """
+        await self._transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def circuit_state(self):
+        """
+        State of the circuit breaker of the client: 'closed', 'open' or
+        'half_open', always 'closed' without a breaker. Schedulers may shed
+        load while it is not closed.
+        """
+        if self._transport.circuit_breaker is None:
+            return CLOSED
+        return self._transport.circuit_breaker.state
+
+    @property
+    def events(self):
+        """
+        Subscribers of the events of the client, e.g.
+        ``client.events.subscribe(callback, ['request_end'])``.
+        """
+        return self._transport.events
+
+    @property
+    def http_client(self):
+        """
+        The pooled HTTP client shared by all endpoints of the client.
+        """
+        return self._transport.client
+
+    @property
+    def token(self):
+        return self._token
+
+    @property
+    def branch_id(self):
+        return self._branch_id
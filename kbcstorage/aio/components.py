@@ -0,0 +1,11 @@
+"""
+Asynchronous calls to the Storage API relating to components.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.components import Components
+
+
+class AsyncComponents(AsyncEndpoint, Components):
+    """
+    Asynchronous Components Endpoint
+    """
@@ -0,0 +1,39 @@
+"""
+Asynchronous calls to the Storage API relating to configurations.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.aio.configurations_metadata import AsyncConfigurationsMetadata
+from kbcstorage.configurations import Configurations
+
+
+class AsyncConfigurations(AsyncEndpoint, Configurations):
+    """
+    Asynchronous Configurations Endpoint
+    """
+    def __init__(self, root_url, token, branch_id, transport=None):
+        """
+        Create a Configurations endpoint.
+
+        Args:
+            root_url (:obj:`str`): The base url for the API.
+            token (:obj:`str`): A storage API key.
+            branch_id (str): The ID of branch to use, use 'default' to work without branch (in main).
+            transport (:obj:`AsyncRetryRequests`): Shared HTTP transport.
+        """
+        super().__init__(root_url, token, branch_id, transport=transport)
+        self.metadata = AsyncConfigurationsMetadata(root_url, token, branch_id, transport=self.requests)
+
+    async def delete(self, component_id, configuration_id):
+        """
+        Deletes the configuration.
+
+        Args:
+            component_id (str): The id of the component.
+            configuration_id (str): The id of the configuration.
+        """
+        if not isinstance(component_id, str) or component_id == '':
+            raise ValueError("Invalid component_id '{}'.".format(component_id))
+        if not isinstance(configuration_id, str) or configuration_id == '':
+            raise ValueError("Invalid component_id '{}'.".format(configuration_id))
+        url = '{}/{}/configs/{}'.format(self.base_url, component_id, configuration_id)
+        await self._delete(url)
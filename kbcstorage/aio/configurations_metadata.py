@@ -0,0 +1,29 @@
+"""
+Asynchronous calls to the Storage API relating to configurations metadata.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.configurations_metadata import ConfigurationsMetadata
+
+
+class AsyncConfigurationsMetadata(AsyncEndpoint, ConfigurationsMetadata):
+    """
+    Asynchronous ConfigurationsMetadata Endpoint
+    """
+
+    async def delete(self, component_id, configuration_id, metadata_id):
+        """
+        Deletes the configuration metadata identified by ``metadata_id``.
+
+        Args:
+            component_id (str): The id of the component.
+            configuration_id (str): The id of the configuration.
+            metadata_id (str): The id of the metadata (not key!).
+        """
+        if not isinstance(component_id, str) or component_id == '':
+            raise ValueError("Invalid component_id '{}'.".format(component_id))
+        if not isinstance(configuration_id, str) or configuration_id == '':
+            raise ValueError("Invalid configuration_id '{}'.".format(configuration_id))
+        if not isinstance(metadata_id, str) or metadata_id == '':
+            raise ValueError("Invalid metadata_id '{}'.".format(metadata_id))
+        url = '{}/{}/configs/{}/metadata/{}'.format(self.base_url, component_id, configuration_id, metadata_id)
+        await self._delete(url)
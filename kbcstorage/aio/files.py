@@ -0,0 +1,159 @@
+"""
+Asynchronous calls to the Storage API relating to files.
+
+Cloud storage transfers use the blocking provider SDKs, so they run in the
+default executor of the event loop.
+"""
+import os
+
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.files import COMPRESS_CHUNK_SIZE, Files, _read_chunks
+
+
+class AsyncFiles(AsyncEndpoint, Files):
+    """
+    Asynchronous Files Endpoint
+    """
+    async def upload_file(self, file_path, tags=None, is_public=False,
+                          is_permanent=False, is_encrypted=True,
+                          is_sliced=False, do_notify=False, compress=False):
+        """
+        Upload a file to storage
+
+        Args:
+            file_path (str): Local path to file to upload
+            tags (list): Array of tags
+            is_public (bool): File is public
+            is_permanent (bool): File is permanent
+            is_encrypted (bool): File is encrypted
+            is_sliced (bool): File is sliced
+            do_notify (bool): Notify members of project that file was uploaded
+            compress (bool): Gzip the file while uploading it, the file is
+                stored with the '.gz' extension
+
+        Returns:
+            file_id (str): Id of the created file
+        """
+        with self._span('files.upload_file', file_name=os.path.basename(file_path)):
+            if not os.path.exists(file_path) or not os.path.isfile(file_path):
+                raise ValueError("File " + file_path + " does not exist")
+            file_name = os.path.basename(file_path)
+            if compress:
+                chunks = _read_chunks(file_path, chunk_size=COMPRESS_CHUNK_SIZE)
+                parts, size = await self._run_sync(self._start_upload_parts, chunks, True,
+                                                   os.path.getsize(file_path))
+                with self._span('files.prepare'):
+                    file_resource = await self.prepare_upload(file_name + '.gz', size, tags, is_public,
+                                                              is_permanent, is_encrypted,
+                                                              is_sliced, do_notify, True)
+                await self._run_sync(self._upload_parts, file_resource, parts, is_encrypted)
+                return file_resource['id']
+            size = os.path.getsize(file_path)
+            with self._span('files.prepare'):
+                file_resource = await self.prepare_upload(file_name, size, tags, is_public,
+                                                          is_permanent, is_encrypted,
+                                                          is_sliced, do_notify, True)
+            await self._run_sync(self._upload, file_resource, file_path, is_encrypted)
+            return file_resource['id']
+
+    async def upload_data(self, name, chunks, tags=None, is_public=False,
+                          is_permanent=False, is_encrypted=True, do_notify=False,
+                          compress=True):
+        """
+        Upload data produced in chunks to storage, without a local file.
+
+        Args:
+            name (str): The file name
+            chunks (iterable): The data in chunks of bytes, produced in the
+                executor of the loop
+            tags (list): Array of tags
+            is_public (bool): File is public
+            is_permanent (bool): File is permanent
+            is_encrypted (bool): File is encrypted
+            do_notify (bool): Notify members of project that file was uploaded
+            compress (bool): Gzip the data while uploading it
+
+        Returns:
+            file_id (str): Id of the created file
+        """
+        parts, size = await self._run_sync(self._start_upload_parts, chunks, compress)
+        with self._span('files.prepare'):
+            file_resource = await self.prepare_upload(name + '.gz' if compress else name, size, tags,
+                                                      is_public, is_permanent, is_encrypted,
+                                                      False, do_notify, True)
+        await self._run_sync(self._upload_parts, file_resource, parts, is_encrypted)
+        return file_resource['id']
+
+    async def upload_sliced_file(self, name, slices, tags=None, is_public=False,
+                                 is_permanent=False, is_encrypted=True,
+                                 do_notify=False, compress=True):
+        """
+        Upload a sliced file to storage
+
+        Args:
+            name (str): The file name
+            slices (list): Byte ranges of local files, a
+                ``(file_path, offset, size)`` tuple for each slice in order
+            tags (list): Array of tags
+            is_public (bool): File is public
+            is_permanent (bool): File is permanent
+            is_encrypted (bool): File is encrypted
+            do_notify (bool): Notify members of project that file was uploaded
+            compress (bool): Gzip the slices while uploading them
+
+        Returns:
+            file_id (str): Id of the created file
+        """
+        size = None if compress else sum(size for _, _, size in slices)
+        with self._span('files.prepare'):
+            file_resource = await self.prepare_upload(name + '.gz' if compress else name, size, tags,
+                                                      is_public, is_permanent, is_encrypted,
+                                                      True, do_notify, True)
+        await self._run_sync(self._upload_slices, file_resource, slices, is_encrypted, compress)
+        return file_resource['id']
+
+    async def delete(self, file_id):
+        """
+        Delete a file referenced by ``file_id``.
+
+        Args:
+            file_id (str): The id of the file to be deleted.
+        """
+        url = '{}/{}'.format(self.base_url, file_id)
+        await self._delete(url)
+
+    async def download(self, file_id, local_path):
+        """
+        Download a file from storage to a local directory.
+
+        Args:
+            file_id (str): The id of the file.
+            local_path (str): Local directory to download the file to.
+
+        Returns:
+            local_file (str): Path to the downloaded file
+        """
+        with self._span('files.download', file_id=file_id):
+            if not os.path.exists(local_path):
+                os.mkdir(local_path)
+            file_info = await self.detail(file_id=file_id, federation_token=True)
+            local_file = os.path.join(local_path, file_info['name'])
+            await self._run_sync(self._download, file_info, local_file)
+            return local_file
+
+    async def open_slices(self, file_id):
+        """
+        Get functions streaming the content of a file without storing it
+        locally.
+
+        Args:
+            file_id (str): The id of the file.
+
+        Returns:
+            slice_openers (list): A function opening a readable binary stream
+                of each slice of the file in order, a single one for a file
+                that is not sliced. The streams block, so the functions are to
+                be called and the streams read in an executor.
+        """
+        file_info = await self.detail(file_id=file_id, federation_token=True)
+        return await self._run_sync(self._get_slice_openers, file_info)
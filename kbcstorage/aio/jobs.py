@@ -0,0 +1,165 @@
+"""
+Asynchronous calls to the Storage API relating to jobs.
+"""
+import asyncio
+
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.events import JOB_WAIT
+from kbcstorage.jobs import COMPLETED_STATUSES, MAX_CONCURRENT_REQUESTS_DEFAULT, Jobs, _get_poll_interval
+
+
+def _get_timeout_error(tasks, timeout):
+    """
+    Get the error of the jobs polled by ``tasks`` which did not complete,
+    the builtin TimeoutError raised by ``Jobs`` rather than
+    ``asyncio.TimeoutError``, which differs before Python 3.11.
+    """
+    return TimeoutError("Jobs {} did not complete in {} seconds.".format(
+        ', '.join(str(job_id) for task, job_id in tasks.items() if task.cancelled() or not task.done()), timeout))
+
+
+class AsyncJobs(AsyncEndpoint, Jobs):
+    """
+    Asynchronous Jobs Endpoint
+    """
+    async def status(self, job_id):
+        """
+        Retrieve the status of a given job.
+
+        Args:
+            job_id (str or int): The id of the job.
+        """
+        job = await self.detail(job_id)
+        return job['status']
+
+    async def completed(self, job_id):
+        """
+        Check if a job is completed or not.
+
+        Args:
+            job_id (str or int): The id of the job.
+
+        Returns:
+            completed (bool): True if job is completed, else False.
+        """
+        completed_statuses = ('error', 'success')
+        return await self.status(job_id) in completed_statuses
+
+    async def block_until_completed(self, job_id):
+        """
+        Poll the API until the job is completed without blocking the event
+        loop between the polls.
+
+        Args:
+            job_id (str): The id of the job
+
+        Returns:
+            response_body: The parsed json from the HTTP response
+                containing a storage Job.
+        """
+        retries = 1
+        with self._measure(JOB_WAIT, job_id=job_id) as fields:
+            while True:
+                job = await self.detail(job_id)
+                if job['status'] in ('error', 'success'):
+                    fields.update(status=job['status'], polls=retries, job=job)
+                    return job
+                retries += 1
+                await asyncio.sleep(min(2 ** retries, 20))
+
+    async def block_for_success(self, job_id):
+        """
+        Poll the API until the job is completed, then return ``True`` if the
+        job is successful, else ``False``.
+
+        Args:
+            job_id (str): The id of the job
+
+        Returns:
+            success (bool): True if the job status is success, else False.
+        """
+        job = await self.block_until_completed(job_id)
+        return job['status'] == 'success'
+
+    async def as_completed(self, job_ids, timeout=None,
+                           max_concurrent_requests=MAX_CONCURRENT_REQUESTS_DEFAULT):
+        """
+        Poll many jobs concurrently and yield each job as it completes.
+
+        Args:
+            job_ids (list): The ids of the jobs.
+            timeout (float): Overall deadline in seconds, no deadline by
+                default.
+            max_concurrent_requests (int): Maximum number of job status
+                requests in flight at once.
+
+        Yields:
+            response_body: The parsed json from the HTTP response
+                containing a completed storage Job.
+
+        Raises:
+            TimeoutError: If the jobs do not complete before the deadline.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrent_requests))
+        tasks = {asyncio.ensure_future(self._poll_until_completed(job_id, semaphore)): job_id for job_id in job_ids}
+        try:
+            for task in asyncio.as_completed(tasks, timeout=timeout):
+                try:
+                    job = await task
+                except asyncio.TimeoutError:
+                    raise _get_timeout_error(tasks, timeout) from None
+                yield job
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def wait_all(self, job_ids, timeout=None,
+                       max_concurrent_requests=MAX_CONCURRENT_REQUESTS_DEFAULT):
+        """
+        Poll the API until all the jobs are completed.
+
+        Returns:
+            jobs (list): The completed storage Jobs in the order of
+                ``job_ids``.
+
+        Raises:
+            TimeoutError: If the jobs do not complete before the deadline.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrent_requests))
+        tasks = {asyncio.ensure_future(self._poll_until_completed(job_id, semaphore)): job_id for job_id in job_ids}
+        try:
+            return await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+        except asyncio.TimeoutError:
+            raise _get_timeout_error(tasks, timeout) from None
+
+    async def wait_any(self, job_ids, timeout=None,
+                       max_concurrent_requests=MAX_CONCURRENT_REQUESTS_DEFAULT):
+        """
+        Poll the API until any of the jobs is completed.
+
+        Returns:
+            response_body: The parsed json from the HTTP response
+                containing the first completed storage Job.
+
+        Raises:
+            TimeoutError: If no job completes before the deadline.
+        """
+        completed = self.as_completed(job_ids, timeout, max_concurrent_requests)
+        try:
+            return await completed.__anext__()
+        finally:
+            await completed.aclose()
+
+    async def _poll_until_completed(self, job_id, semaphore):
+        attempt = 0
+        last_status = None
+        while True:
+            async with semaphore:
+                job = await self.detail(job_id)
+            if job['status'] in COMPLETED_STATUSES:
+                return job
+            if job['status'] != last_status:
+                attempt = 0
+            last_status = job['status']
+            await asyncio.sleep(_get_poll_interval(attempt))
+            attempt += 1
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import httpx
+
+from kbcstorage.aio.single_flight import AsyncSingleFlight
+from kbcstorage.circuit_breaker import is_failure
+from kbcstorage.events import REQUEST_END, REQUEST_START, RETRY, get_content_length
+from kbcstorage.retry_requests import (MAX_RETRIES_DEFAULT, POOL_MAXSIZE_DEFAULT, REFUSED_STATUSES, RetryBudget,
+                                       RetryPolicy, _is_open)
+
+
+def create_async_client(pool_maxsize=POOL_MAXSIZE_DEFAULT, max_connections=None):
+    """
+    Create a keep-alive asynchronous HTTP client with a connection pool.
+
+    Args:
+        pool_maxsize (int): Maximum number of idle keep-alive connections.
+        max_connections (int): Maximum number of concurrent connections,
+            unlimited by default.
+
+    Returns:
+        client (httpx.AsyncClient): The configured client.
+    """
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=pool_maxsize)
+    # requests has no timeout by default and long running Storage API calls rely on it
+    return httpx.AsyncClient(limits=limits, timeout=None)
+
+
+def _encode_values(values):
+    # requests silently drops None values and sends booleans as 'True'/'False'
+    if isinstance(values, dict):
+        return {k: str(v) if isinstance(v, bool) else v for k, v in values.items() if v is not None}
+    return values
+
+
+def _to_httpx_kwargs(kwargs):
+    """
+    Translate keyword arguments of a ``requests`` call to their ``httpx``
+    equivalent.
+    """
+    if 'params' in kwargs:
+        kwargs['params'] = _encode_values(kwargs['params'])
+    data = kwargs.get('data')
+    if isinstance(data, (str, bytes)):
+        kwargs['content'] = kwargs.pop('data')
+    elif data is not None:
+        kwargs['data'] = _encode_values(data)
+    return kwargs
+
+
+class AsyncRetryRequests:
+    def __init__(self, max_requests_retries=MAX_RETRIES_DEFAULT, client=None, retry_policy=None,
+                 rate_limits=None, circuit_breaker=None,
+                 cache=None, events=None, tracing=None) -> None:
+        if retry_policy is None:
+            retry_policy = RetryPolicy(max_attempts=max_requests_retries, budget=RetryBudget())
+        self.retry_policy = retry_policy
+        self.rate_limits = rate_limits
+        self.circuit_breaker = circuit_breaker
+        self.cache = cache
+        self.events = events
+        self.tracing = tracing
+        self.single_flight = AsyncSingleFlight()
+        self.client = client if client is not None else create_async_client()
+
+    @property
+    def max_retries(self):
+        return self.retry_policy.max_attempts
+
+    async def _retry_request(self, method, url, **kwargs):
+        kwargs = _to_httpx_kwargs(kwargs)
+        tracing = self.tracing
+        if tracing is None:
+            return await self._observe_request(method, url, **kwargs)
+        with tracing.request(method, url, kwargs) as span:
+            response = await self._observe_request(method, url, **kwargs)
+            tracing.record_response(span, response.status_code)
+            return response
+
+    async def _observe_request(self, method, url, **kwargs):
+        events = self.events
+        if events is None or not events.enabled:
+            return await self._send(method, url, None, **kwargs)
+        stats = {'retries': 0, 'backoff_seconds': 0.0, 'throttled_seconds': 0.0}
+        events.emit(REQUEST_START, method=method, url=url)
+        start = time.perf_counter()
+        try:
+            response = await self._send(method, url, stats, **kwargs)
+        except BaseException as e:
+            events.emit(REQUEST_END, method=method, url=url, status_code=None, error=type(e).__name__,
+                        seconds=time.perf_counter() - start, bytes_sent=None, bytes_received=None, **stats)
+            raise
+        events.emit(REQUEST_END, method=method, url=url, status_code=response.status_code, error=None,
+                    seconds=time.perf_counter() - start,
+                    bytes_sent=get_content_length(response.request.headers),
+                    bytes_received=len(response.content), **stats)
+        return response
+
+    async def _send(self, method, url, stats, **kwargs):
+        state = self.retry_policy.start(method)
+        limiter = self.rate_limits.get(method, url) if self.rate_limits is not None else None
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before_request()
+        while True:
+            if limiter is not None:
+                wait = limiter.reserve()
+                if wait > 0:
+                    if stats is not None:
+                        stats['throttled_seconds'] += wait
+                    await asyncio.sleep(wait)
+            status_code = error = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                sent = not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                delay = None if _is_open(breaker) else state.next_delay(sent=sent)
+                if delay is None:
+                    if breaker is not None:
+                        breaker.record(False)
+                    raise
+                error = type(e).__name__
+            else:
+                if limiter is not None:
+                    limiter.record(response.status_code in REFUSED_STATUSES)
+                delay = None
+                if (response.status_code >= 500 or response.status_code == 429) and not _is_open(breaker):
+                    delay = state.next_delay(response.status_code, response.headers.get('Retry-After'))
+                if delay is None:
+                    if breaker is not None:
+                        breaker.record(not is_failure(response.status_code))
+                    return response
+                await response.aclose()
+                status_code = response.status_code
+            if stats is not None:
+                stats['retries'] += 1
+                stats['backoff_seconds'] += delay
+                self.events.emit(RETRY, method=method, url=url, attempt=state.attempts, status_code=status_code,
+                                 error=error, delay=delay)
+            if self.tracing is not None:
+                self.tracing.record_retry(state.attempts, status_code, error, delay)
+            await asyncio.sleep(delay)
+
+    async def get(self, url, **kwargs):
+        return await self._retry_request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self._retry_request('POST', url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self._retry_request('PUT', url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self._retry_request('DELETE', url, **kwargs)
+
+    async def close(self):
+        await self.client.aclose()
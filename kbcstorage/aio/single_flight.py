@@ -0,0 +1,48 @@
+"""
+Coalescing of identical concurrent requests of the asynchronous client.
+"""
+import asyncio
+
+
+class _LeaderCancelled(Exception):
+    """
+    Set on the call of a cancelled task, so that a task waiting for the call
+    makes it instead.
+    """
+
+
+class AsyncSingleFlight:
+    """
+    Registry of requests in flight within an event loop.
+    """
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func):
+        """
+        Await ``func()`` unless a call with the same key is in flight, in
+        which case wait for it and share its result or error. When the task
+        making the call is cancelled, the first waiting task makes it again.
+        """
+        future = self._calls.get(key)
+        while future is not None:
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                future = self._calls.get(key)
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        # nobody may be waiting for the error
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
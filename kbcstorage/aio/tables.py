@@ -0,0 +1,346 @@
+"""
+Asynchronous calls to the Storage API relating to tables.
+"""
+import asyncio
+import os
+
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.aio.files import AsyncFiles
+from kbcstorage.aio.jobs import AsyncJobs
+from kbcstorage.aio.tables_metadata import AsyncTablesMetadata
+from kbcstorage.events import FILE_TRANSFER
+from kbcstorage.tables import SLICE_SIZE_DEFAULT, SUBMIT_MAX_WORKERS_DEFAULT, Tables, _import_pyarrow
+
+# rows of an export read at once in the executor of the loop
+READ_BATCH_ROWS = 10000
+
+
+class AsyncTables(AsyncEndpoint, Tables):
+    """
+    Asynchronous Tables Endpoint
+
+    The ``submit_*`` methods start the coroutines as tasks of the running
+    loop and return the :obj:`asyncio.Task`.
+    """
+    def __init__(self, root_url, token, transport=None,
+                 max_workers=SUBMIT_MAX_WORKERS_DEFAULT, files=None):
+        """
+        Create a Tables endpoint.
+
+        Args:
+            root_url (:obj:`str`): The base url for the API.
+            token (:obj:`str`): A storage API key.
+            transport (:obj:`AsyncRetryRequests`): Shared HTTP transport.
+            max_workers (int): Number of loads and exports started by the
+                ``submit_*`` methods that run at once.
+            files (:obj:`AsyncFiles`): Endpoint transferring the files of
+                loads and exports, an :obj:`AsyncFiles` with the default
+                transfer settings by default.
+        """
+        super().__init__(root_url, token, transport=transport, max_workers=max_workers, files=files)
+        self.metadata = AsyncTablesMetadata(root_url, token, transport=self.requests)
+        if files is None:
+            self.files = AsyncFiles(root_url, token, transport=self.requests)
+        self._submit_semaphore = None
+
+    async def delete(self, table_id):
+        """
+        Delete a table referenced by ``table_id``.
+
+        Args:
+            table_id (str): The id of the table to be deleted.
+        """
+        if not isinstance(table_id, str) or table_id == '':
+            raise ValueError("Invalid table_id '{}'.".format(table_id))
+        url = '{}/{}'.format(self.base_url, table_id)
+        await self._delete(url)
+
+    async def create(self, bucket_id, name, file_path, delimiter=',', enclosure='"',
+                     escaped_by='', primary_key=None, slice_size=SLICE_SIZE_DEFAULT):
+        """
+        Create a new table from CSV file.
+
+        Args:
+            bucket_id (str): Bucket id where table is created
+            name (str): The new table name (only alphanumeric and underscores)
+            file_path (str): Path to local CSV file.
+            delimiter (str): Field delimiter used in the CSV file.
+            enclosure (str): Field enclosure used in the CSV file.
+            escaped_by (str): Escape character used in the CSV file.
+            primary_key (list): Primary key of a table.
+            slice_size (int): Files larger than this many bytes are split
+                into slices uploaded in parallel, None to upload them whole.
+
+        Returns:
+            table_id (str): Id of the created table.
+        """
+        files = self.files
+        columns = None
+        sliced = await self._run_sync(self._slice_csv, file_path, slice_size, delimiter, enclosure,
+                                      escaped_by)
+        if sliced is None:
+            file_id = await files.upload_file(file_path=file_path, tags=['file-import'],
+                                              do_notify=False, is_public=False)
+        else:
+            columns, slices = sliced
+            file_id = await files.upload_sliced_file(os.path.basename(file_path), slices,
+                                                     tags=['file-import'], do_notify=False,
+                                                     is_public=False)
+        job = await self.create_raw(bucket_id=bucket_id, name=name,
+                                    data_file_id=file_id, delimiter=delimiter,
+                                    enclosure=enclosure, escaped_by=escaped_by,
+                                    primary_key=primary_key, columns=columns)
+        job = await self._wait_for_job(job)
+        return job['results']['id']
+
+    async def load(self, table_id, file_path, is_incremental=False, delimiter=',',
+                   enclosure='"', escaped_by='', columns=None,
+                   without_headers=False, slice_size=SLICE_SIZE_DEFAULT):
+        """
+        Load data into an existing table
+
+        Args:
+            table_id (str): Table id
+            file_path (str): Path to local CSV file.
+            is_incremental (bool): Load incrementally (do not truncate table).
+            delimiter (str): Field delimiter used in the CSV file.
+            enclosure (str): Field enclosure used in the CSV file.
+            escaped_by (str): Escape character used in the CSV file.
+            columns (list): List of columns
+            without_headers (bool): CSV does not contain headers
+            slice_size (int): Files larger than this many bytes are split
+                into slices uploaded in parallel, None to upload them whole.
+
+        Returns:
+            response_body: The parsed json from the HTTP response
+                containing write results
+        """
+        with self._span('tables.load', table_id=table_id):
+            files = self.files
+            sliced = await self._run_sync(self._slice_csv, file_path, slice_size, delimiter, enclosure,
+                                          escaped_by, without_headers, columns)
+            if sliced is None:
+                file_id = await files.upload_file(file_path=file_path, tags=['file-import'],
+                                                  do_notify=False, is_public=False)
+            else:
+                columns, slices = sliced
+                file_id = await files.upload_sliced_file(os.path.basename(file_path), slices,
+                                                         tags=['file-import'], do_notify=False,
+                                                         is_public=False)
+            with self._span('jobs.start', table_id=table_id):
+                job = await self.load_raw(table_id=table_id, data_file_id=file_id,
+                                          delimiter=delimiter, enclosure=enclosure,
+                                          escaped_by=escaped_by,
+                                          is_incremental=is_incremental, columns=columns,
+                                          without_headers=without_headers)
+            job = await self._wait_for_job(job)
+            return job['results']
+
+    async def _load_data(self, table_id, chunks, is_incremental):
+        """
+        Upload CSV data in chunks and load it into an existing table. The
+        chunks are produced in the executor of the loop.
+        """
+        if not isinstance(table_id, str) or table_id == '':
+            raise ValueError("Invalid table_id '{}'.".format(table_id))
+        files = self.files
+        file_id = await files.upload_data('{}.csv'.format(table_id.split('.')[-1]), chunks,
+                                          tags=['file-import'], do_notify=False, is_public=False)
+        job = await self.load_raw(table_id=table_id, data_file_id=file_id,
+                                  is_incremental=is_incremental)
+        job = await self._wait_for_job(job)
+        return job['results']
+
+    async def preview(self, table_id, changed_since=None, changed_until=None,
+                      columns=None, where_column=None, where_values=None,
+                      where_operator='eq'):
+        """
+        Export preview of a table.
+
+        Returns:
+            response_body: Table data contents.
+        """
+        r = await self._preview_raw(table_id, changed_since, changed_until,
+                                    columns, where_column, where_values,
+                                    where_operator)
+        return r.content.decode('utf-8')
+
+    async def export_to_file(self, table_id, path_name, limit=None,
+                             file_format='rfc', changed_since=None,
+                             changed_until=None, columns=None,
+                             where_column=None, where_values=None,
+                             where_operator='eq', is_gzip=True):
+        """
+        Export data from a table to a local file
+
+        Returns:
+            destination_file: Local file with exported data
+        """
+        with self._span('tables.export_to_file', table_id=table_id):
+            table_detail = await self.detail(table_id)
+            with self._span('jobs.start', table_id=table_id):
+                job = await self.export_raw(table_id=table_id, limit=limit,
+                                            file_format=file_format,
+                                            changed_since=changed_since,
+                                            changed_until=changed_until, columns=columns,
+                                            where_column=where_column,
+                                            where_values=where_values,
+                                            where_operator=where_operator, is_gzip=is_gzip)
+            job = await self._wait_for_job(job)
+            files = self.files
+            file_info = await files.detail(file_id=job['results']['file']['id'], federation_token=True)
+            destination_file = os.path.join(path_name, table_detail['name'])
+            if columns is None:
+                columns = table_detail['columns']
+            with self._measure(FILE_TRANSFER, phase='download', file_id=file_info['id'],
+                               provider=file_info['provider']) as fields:
+                await self._run_sync(self._write_export_file, files._open_slices(file_info), destination_file,
+                                     columns, is_gzip)
+                fields['bytes'] = os.path.getsize(destination_file)
+            return destination_file
+
+    async def export_iter(self, table_id, limit=None, changed_since=None,
+                          changed_until=None, columns=None, where_column=None,
+                          where_values=None, where_operator='eq', batch_size=None):
+        """
+        Export data from a table and iterate over its rows as the export
+        streams in, without writing a local file.
+
+        The export job runs when the coroutine is awaited, the rows are then
+        read slice by slice in the executor of the loop::
+
+            async for row in await client.tables.export_iter(table_id):
+                ...
+
+        Returns:
+            rows (async generator): Each row as a list of values in the order
+                of ``columns``, or lists of rows when ``batch_size`` is given.
+        """
+        if batch_size is not None and (not isinstance(batch_size, int) or batch_size < 1):
+            raise ValueError("Invalid batch_size '{}'.".format(batch_size))
+        file_id = await self.export(table_id=table_id, limit=limit, file_format='rfc',
+                                    changed_since=changed_since,
+                                    changed_until=changed_until, columns=columns,
+                                    where_column=where_column,
+                                    where_values=where_values,
+                                    where_operator=where_operator, is_gzip=True)
+        files = self.files
+        file_info = await files.detail(file_id, federation_token=True)
+        rows = self._read_export_rows(files._open_slices(file_info), is_gzip=True)
+        return self._iter_batches(self._batch_rows(rows, batch_size or READ_BATCH_ROWS), batch_size is None)
+
+    async def _iter_batches(self, batches, flatten):
+        """
+        Yield batches of rows, or their rows if ``flatten``, each batch read
+        in the executor of the loop.
+        """
+        step = None
+        try:
+            while True:
+                step = asyncio.ensure_future(self._run_sync(next, batches, None))
+                batch = await asyncio.shield(step)
+                step = None
+                if batch is None:
+                    return
+                if flatten:
+                    for row in batch:
+                        yield row
+                else:
+                    yield batch
+        finally:
+            if step is not None:
+                # the generator cannot be closed while reading in the executor
+                await asyncio.gather(step, return_exceptions=True)
+            # closes the slice being read
+            batches.close()
+
+    async def export_arrow(self, table_id, limit=None, changed_since=None,
+                           changed_until=None, columns=None, where_column=None,
+                           where_values=None, where_operator='eq',
+                           column_types=None):
+        """
+        Export data from a table into an Arrow table, without writing a
+        local file. Requires pyarrow.
+
+        Returns:
+            table (pyarrow.Table): The exported data.
+        """
+        pa = _import_pyarrow()
+        table_info = await self.detail(table_id)
+        columns = columns or table_info['columns']
+        schema = self._get_arrow_schema(pa, table_info, columns, column_types)
+        file_id = await self.export(table_id=table_id, limit=limit, file_format='rfc',
+                                    changed_since=changed_since,
+                                    changed_until=changed_until, columns=columns,
+                                    where_column=where_column,
+                                    where_values=where_values,
+                                    where_operator=where_operator, is_gzip=True)
+        files = self.files
+        slice_openers = await files.open_slices(file_id)
+        return await self._run_sync(self._read_arrow, slice_openers, schema)
+
+    async def export_parquet(self, table_id, path, limit=None, changed_since=None,
+                             changed_until=None, columns=None, where_column=None,
+                             where_values=None, where_operator='eq',
+                             column_types=None, compression='snappy'):
+        """
+        Export data from a table into a local Parquet file. Requires pyarrow.
+
+        Returns:
+            path (str): Path of the created Parquet file.
+        """
+        pa = _import_pyarrow()
+        table_info = await self.detail(table_id)
+        columns = columns or table_info['columns']
+        schema = self._get_arrow_schema(pa, table_info, columns, column_types)
+        file_id = await self.export(table_id=table_id, limit=limit, file_format='rfc',
+                                    changed_since=changed_since,
+                                    changed_until=changed_until, columns=columns,
+                                    where_column=where_column,
+                                    where_values=where_values,
+                                    where_operator=where_operator, is_gzip=True)
+        files = self.files
+        slice_openers = await files.open_slices(file_id)
+        await self._run_sync(self._export_parquet, slice_openers, schema, path, compression)
+        return path
+
+    def _export_parquet(self, slice_openers, schema, path, compression):
+        """
+        Stream the slices of an export into a Parquet file, blocking.
+        """
+        self._write_parquet(self._read_arrow(slice_openers, schema, as_reader=True), path, compression)
+
+    async def export(self, table_id, limit=None, file_format='rfc',
+                     changed_since=None, changed_until=None, columns=None,
+                     where_column=None, where_values=None, where_operator='eq',
+                     is_gzip=False):
+        """
+        Export data from a table to a Storage file
+
+        Returns:
+            response_body: File id of the table export
+        """
+        job = await self.export_raw(table_id=table_id, limit=limit,
+                                    file_format=file_format,
+                                    changed_since=changed_since,
+                                    changed_until=changed_until, columns=columns,
+                                    where_column=where_column,
+                                    where_values=where_values,
+                                    where_operator=where_operator, is_gzip=is_gzip)
+        job = await self._wait_for_job(job)
+        return job['results']['file']['id']
+
+    def _submit(self, method, *args, **kwargs):
+        async def run():
+            if self._submit_semaphore is None:
+                self._submit_semaphore = asyncio.Semaphore(self.max_workers)
+            async with self._submit_semaphore:
+                return await method(*args, **kwargs)
+        return asyncio.create_task(run())
+
+    async def _wait_for_job(self, job):
+        jobs = AsyncJobs(self.root_url, self.token, transport=self.requests)
+        job = await jobs.block_until_completed(job['id'])
+        if job['status'] == 'error':
+            raise RuntimeError(job['error']['message'])
+        return job
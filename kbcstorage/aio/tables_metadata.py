@@ -0,0 +1,26 @@
+"""
+Asynchronous calls to the Storage API relating to table metadata.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.tables_metadata import TablesMetadata
+
+
+class AsyncTablesMetadata(AsyncEndpoint, TablesMetadata):
+    """
+    Asynchronous TablesMetadata Endpoint
+    """
+
+    async def delete(self, table_id, metadata_id):
+        """
+        Delete a table metadata referenced by ``metadata_id``.
+
+        Args:
+            table_id (str): The id of the table.
+            metadata_id (str): The id of the table metdata entry to be deleted.
+        """
+        if not isinstance(table_id, str) or table_id == '':
+            raise ValueError("Invalid table_id '{}'.".format(table_id))
+        if not isinstance(metadata_id, str) or metadata_id == '':
+            raise ValueError("Invalid metadata_id '{}'.".format(metadata_id))
+        url = '{}/{}/metadata/{}'.format(self.base_url, table_id, metadata_id)
+        await self._delete(url)
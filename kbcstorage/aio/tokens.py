@@ -0,0 +1,11 @@
+"""
+Asynchronous calls to the Storage API relating to tokens.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.tokens import Tokens
+
+
+class AsyncTokens(AsyncEndpoint, Tokens):
+    """
+    Asynchronous Tokens Endpoint
+    """
@@ -0,0 +1,21 @@
+"""
+Asynchronous calls to the Storage API relating to triggers.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.triggers import Triggers
+
+
+class AsyncTriggers(AsyncEndpoint, Triggers):
+    """
+    Asynchronous Triggers Endpoint
+    """
+
+    async def delete(self, trigger_id):
+        """
+        Delete a trigger referenced by ``trigger_id``.
+
+        Args:
+            trigger_id (int): The id of the trigger to be deleted.
+        """
+        url = '{}/{}'.format(self.base_url, trigger_id)
+        await self._delete(url)
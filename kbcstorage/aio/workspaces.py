@@ -0,0 +1,68 @@
+"""
+Asynchronous calls to the Storage API relating to workspaces.
+"""
+from kbcstorage.aio.base import AsyncEndpoint
+from kbcstorage.aio.files import AsyncFiles
+from kbcstorage.aio.jobs import AsyncJobs
+from kbcstorage.workspaces import Workspaces, _make_body
+
+
+class AsyncWorkspaces(AsyncEndpoint, Workspaces):
+    """
+    Asynchronous Workspaces Endpoint
+    """
+    async def delete(self, workspace_id):
+        """
+        Deletes a workspace.
+
+        This also irreversibly removes workspace content.
+
+        Args:
+            workspace_id (int or str): The id of the workspace to be deleted.
+        """
+        url = '{}/{}'.format(self.base_url, workspace_id)
+        await self._delete(url)
+
+    async def load_files(self, workspace_id, file_mapping):
+        """
+        Load files from file storage into a workspace.
+        * only supports abs workspace
+        writes the matching files to "{destination}/file_name/file_id"
+
+        Args:
+            workspace_id (int or str): The id of the workspace to which to load
+                the tables.
+            file_mapping (:obj:`dict`):
+                tags: [],
+                operator: enum('or', 'and') default or,
+                destination: string path without trailing /
+        """
+        workspace = await self.detail(workspace_id)
+        if (workspace['type'] != 'file' and workspace['connection']['backend'] != 'abs'):
+            raise Exception('Loading files to workspace is only available for ABS workspaces')
+        files = AsyncFiles(self.root_url, self.token, transport=self.requests)
+        if ('operator' in file_mapping and file_mapping['operator'] == 'and'):
+            query = ' AND '.join(map(lambda tag: 'tags:"' + tag + '"', file_mapping['tags']))
+            file_list = await files.list(q=query)
+        else:
+            file_list = await files.list(tags=file_mapping['tags'])
+
+        jobs = AsyncJobs(self.root_url, self.token, transport=self.requests)
+        jobs_list = []
+        for file in file_list:
+            inputs = {
+                file['id']: "%s/%s" % (file_mapping['destination'], file['name'])
+            }
+            body = _make_body(inputs, source_key='dataFileId')
+            # always preserve the workspace, otherwise it would be silly
+            body['preserve'] = 1
+            url = '{}/{}/load'.format(self.base_url, workspace['id'])
+            job = await self._post(url, data=body)
+            jobs_list.append(job)
+
+        async for job in jobs.as_completed([job['id'] for job in jobs_list]):
+            if job['status'] != 'success':
+                try:
+                    print("Failed to load a file with error: %s" % job['error']['message'])
+                except (KeyError, TypeError):
+                    print("An unknown error occurred loading data.  Job ID %s" % job['id'])
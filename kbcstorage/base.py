@@ -9,9 +9,52 @@ various endpoints, such as tables, workspaces, jobs, etc. as described in the
 .. _Storage API documentation:
     http://docs.keboola.apiary.io/
 """
+import contextlib
+import contextvars
+import threading
+
+from kbcstorage import json_backend
+from kbcstorage.cache import get_cache_group
 from kbcstorage.retry_requests import MAX_RETRIES_DEFAULT, RetryRequests
+from kbcstorage.single_flight import get_request_key
 import requests
 
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def with_context(func):
+    """
+    Wrap a function to run in other threads in a copy of the context of the
+    calling thread, so that its spans are children of the current span.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # a context can be entered by a single thread at once
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+
+class lazy_endpoint:
+    """
+    Decorator of a client method creating an endpoint, which turns it into
+    an attribute created on first access and then kept by the client.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+        self._lock = threading.Lock()
+
+    def __get__(self, client, owner=None):
+        if client is None:
+            return self
+        with self._lock:
+            endpoint = client.__dict__.get(self.name)
+            if endpoint is None:
+                endpoint = client.__dict__[self.name] = self.factory(client)
+        return endpoint
+
 
 class Endpoint:
     """
@@ -22,7 +65,10 @@ class Endpoint:
         base_url (str): The base URL for this endpoint.
         token (str): A key for the Storage API.
     """
-    def __init__(self, root_url, path_component, token, max_requests_retries=MAX_RETRIES_DEFAULT):
+    transport_class = RetryRequests
+
+    def __init__(self, root_url, path_component, token, max_requests_retries=MAX_RETRIES_DEFAULT,
+                 transport=None):
         """
         Create an endpoint.
 
@@ -33,6 +79,10 @@ class Endpoint:
                 endpoint. eg. "buckets"
             token (str): A key for the Storage API. Can be found in the storage
                 console.
+            max_requests_retries (int): Number of retries of failed requests,
+                used only when ``transport`` is not given.
+            transport (:obj:`RetryRequests`): Shared HTTP transport. When
+                omitted, the endpoint creates its own pooled transport.
         """
         if not root_url:
             raise ValueError("Root URL is required.")
@@ -45,7 +95,9 @@ class Endpoint:
         self._auth_header = {'X-StorageApi-Token': self.token,
                              'Accept-Encoding': 'gzip',
                              'User-Agent': 'Keboola Storage API Python Client'}
-        self.requests = RetryRequests(max_requests_retries)
+        if transport is None:
+            transport = self.transport_class(max_requests_retries)
+        self.requests = transport
 
     def _get_raw(self, url, params=None, **kwargs):
         """
@@ -68,7 +120,13 @@ class Endpoint:
         headers = kwargs.pop('headers', {})
         headers.update(self._auth_header)
 
-        r = self.requests.get(url, params=params, headers=headers, **kwargs)
+        single_flight = getattr(self.requests, 'single_flight', None)
+        if single_flight is None or kwargs:
+            r = self.requests.get(url, params=params, headers=headers, **kwargs)
+        else:
+            # identical requests in flight share the response
+            r = single_flight.do(get_request_key(url, params, headers),
+                                 lambda: self.requests.get(url, params=params, headers=headers))
         try:
             r.raise_for_status()
         except requests.HTTPError:
@@ -94,7 +152,84 @@ class Endpoint:
             requests.HTTPError: If the API request fails.
 
         """
-        return self._get_raw(url, params, **kwargs).json()
+        cache = self._get_cache(url, kwargs)
+        if cache is None:
+            body = json_backend.loads(self._get_raw(url, params, **kwargs).content)
+            self._record_read(url, body)
+            return body
+        key = cache.get_key(self.token, url, params)
+        entry = cache.get(key)
+        if entry is not None and entry.is_fresh():
+            return entry.body
+        headers = kwargs.pop('headers', {})
+        headers.update(cache.get_validators(entry))
+        r = self._get_raw(url, params, headers=headers, **kwargs)
+        return cache.update(key, url, entry, r.status_code, r.headers, r.text)
+
+    def _get_iter(self, url, params=None):
+        """
+        Make authenticated GET request and yield the items of the JSON array
+        in the response while it is being downloaded.
+
+        Args:
+            url (str): requested url
+            params (dict): additional url params
+
+        Yields:
+            item: Items of the response body parsed from json.
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        r = self._get_raw(url, params, stream=True)
+        with r:
+            yield from json_backend.iter_array(r.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+    def _get_cache(self, url, kwargs):
+        """
+        Get the response cache of the transport if a GET request to ``url``
+        with ``kwargs`` is to be cached.
+        """
+        cache = getattr(self.requests, 'cache', None)
+        if cache is None or set(kwargs) - {'headers'} or get_cache_group(url) is None:
+            return None
+        return cache
+
+    def _record_read(self, url, body):
+        cache = getattr(self.requests, 'cache', None)
+        if cache is not None:
+            cache.record_read(url, body)
+
+    def _measure(self, name, **fields):
+        """
+        Measure the block of a with statement as an event of the transport,
+        see :obj:`Events.measure`, traced as a span when the transport is
+        traced.
+        """
+        events = getattr(self.requests, 'events', None)
+        measure = contextlib.nullcontext(fields) if events is None else events.measure(name, **fields)
+        tracing = getattr(self.requests, 'tracing', None)
+        if tracing is None:
+            return measure
+        return tracing.measure(name, measure)
+
+    def _span(self, name, **attributes):
+        """
+        Trace the block of a with statement as a span when the transport is
+        traced, see :obj:`Tracing.span`.
+        """
+        tracing = getattr(self.requests, 'tracing', None)
+        if tracing is None:
+            return contextlib.nullcontext()
+        return tracing.span(name, **attributes)
+
+    def _invalidate_cache(self, url):
+        """
+        Drop the cached responses a write to ``url`` changes.
+        """
+        cache = getattr(self.requests, 'cache', None)
+        if cache is not None and url is not None:
+            cache.invalidate(url)
 
     def _post(self, *args, **kwargs):
         """
@@ -114,13 +249,14 @@ class Endpoint:
         headers = kwargs.pop('headers', {})
         headers.update(self._auth_header)
         r = self.requests.post(headers=headers, *args, **kwargs)
+        self._invalidate_cache(args[0] if args else kwargs.get('url'))
         try:
             r.raise_for_status()
         except requests.HTTPError:
             # Handle different error codes
             raise
         else:
-            return r.json()
+            return json_backend.loads(r.content)
 
     def _put(self, *args, **kwargs):
         """
@@ -140,13 +276,14 @@ class Endpoint:
         headers = kwargs.pop('headers', {})
         headers.update(self._auth_header)
         r = self.requests.put(headers=headers, *args, **kwargs)
+        self._invalidate_cache(args[0] if args else kwargs.get('url'))
         try:
             r.raise_for_status()
         except requests.HTTPError:
             # Handle different error codes
             raise
         else:
-            return r.json()
+            return json_backend.loads(r.content)
 
     def _delete(self, *args, **kwargs):
         """
@@ -166,6 +303,7 @@ class Endpoint:
         headers = kwargs.pop('headers', {})
         headers.update(self._auth_header)
         r = self.requests.delete(headers=headers, *args, **kwargs)
+        self._invalidate_cache(args[0] if args else kwargs.get('url'))
         try:
             r.raise_for_status()
         except requests.HTTPError:
@@ -173,4 +311,4 @@ class Endpoint:
             raise
 
         if 'application/json' in r.headers.get('Content-Type', ''):
-            return r.json()
+            return json_backend.loads(r.content)
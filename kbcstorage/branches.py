@@ -11,17 +11,18 @@ class Branches(Endpoint):
     """
     Tokens  Endpoint
     """
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None):
         """
         Create a Tokens endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
         # Branches have inconsistent endpoint naming - it's either dev-branches or branch, so it need to be resolved
         # endpoint by endpoint.
-        super().__init__(root_url, "", token)
+        super().__init__(root_url, "", token, transport=transport)
 
     def metadata(self, branch_id="default"):
         """
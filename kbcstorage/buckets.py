@@ -14,15 +14,16 @@ class Buckets(Endpoint):
     """
     Buckets Endpoint
     """
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None):
         """
         Create a Buckets endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
-        super().__init__(root_url, 'buckets', token)
+        super().__init__(root_url, 'buckets', token, transport=transport)
 
     def list(self):
         """
@@ -37,6 +38,19 @@ class Buckets(Endpoint):
 
         return self._get(self.base_url)
 
+    def iter_list(self):
+        """
+        List all buckets in project, yielding each bucket as soon as it is
+        parsed.
+
+        Yields:
+            bucket (dict): The parsed json of a bucket.
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        return self._get_iter(self.base_url)
+
     def list_tables(self, bucket_id, include=None):
         """
         List all tables in a bucket.
@@ -121,7 +135,7 @@ class Buckets(Endpoint):
         params = {'force': force, 'async': asynchronous}
         if (asynchronous):
             job = self._delete(url, params=params)
-            jobs = Jobs(self.root_url, self.token)
+            jobs = Jobs(self.root_url, self.token, transport=self.requests)
             job = jobs.block_until_completed(job['id'])
             if job['status'] == 'error':
                 raise RuntimeError(job['error']['message'])
@@ -0,0 +1,227 @@
+"""
+Cache of responses of read-only Storage API requests.
+
+Responses of GET requests to the metadata of buckets, tables, components,
+configurations and branches are kept for ``ttl`` seconds and then revalidated
+with ``If-None-Match`` and ``If-Modified-Since`` where the API sent an ETag or
+Last-Modified header. Writes through the same client drop the cached
+responses of the group of endpoints they change, and so does a completed
+storage job.
+"""
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from kbcstorage import json_backend
+
+TTL_DEFAULT = 60.0
+MAX_ENTRIES_DEFAULT = 1024
+# first path segment after /v2/storage/ -> group of endpoints invalidated together
+CACHE_GROUPS = {
+    'buckets': 'storage',
+    'tables': 'storage',
+    'branch': 'configurations',
+    'dev-branches': 'branches',
+}
+JOB_COMPLETED_STATUSES = ('error', 'success')
+
+
+def get_cache_group(url):
+    """
+    Get the group of endpoints of a url, None for urls which are not cached.
+    """
+    path = urlparse(url).path
+    if '/v2/storage/' not in path:
+        return None
+    segment = path.split('/v2/storage/', 1)[1].split('/', 1)[0]
+    return CACHE_GROUPS.get(segment)
+
+
+class CacheEntry:
+    """
+    A cached response.
+    """
+    def __init__(self, group, text, etag=None, last_modified=None, expires_at=0.0):
+        self.group = group
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def body(self):
+        """
+        A new copy of the parsed response body.
+        """
+        return json_backend.loads(self.text)
+
+    def is_fresh(self):
+        return time.time() < self.expires_at
+
+
+class MemoryCache:
+    """
+    In-memory storage of cached responses evicting the least recently used
+    ones. Safe to share between threads.
+    """
+    def __init__(self, max_entries=MAX_ENTRIES_DEFAULT):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, group):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.group == group]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteCache:
+    """
+    On-disk storage of cached responses in a sqlite database evicting the
+    least recently used ones, shared by processes using the same file.
+    """
+    def __init__(self, path, max_entries=MAX_ENTRIES_DEFAULT):
+        """
+        Args:
+            path (str): Path of the database file.
+            max_entries (int): Maximum number of cached responses.
+        """
+        self.max_entries = max_entries
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, grp TEXT, body TEXT, etag TEXT, '
+                'last_modified TEXT, expires_at REAL, used_at REAL)'
+            )
+
+    def get(self, key):
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT grp, body, etag, last_modified, expires_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE responses SET used_at = ? WHERE key = ?', (time.time(), key))
+        return CacheEntry(*row)
+
+    def set(self, key, entry):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, entry.group, entry.text, entry.etag, entry.last_modified, entry.expires_at, time.time())
+            )
+            self._connection.execute(
+                'DELETE FROM responses WHERE key IN '
+                '(SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+            )
+
+    def invalidate(self, group):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM responses WHERE grp = ?', (group,))
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM responses')
+
+    def close(self):
+        self._connection.close()
+
+
+class ResponseCache:
+    """
+    Cache of responses of the read-only endpoints of a client.
+    """
+    def __init__(self, backend=None, ttl=TTL_DEFAULT):
+        """
+        Args:
+            backend (:obj:`MemoryCache` or :obj:`SqliteCache`): Storage of
+                the cached responses, a :obj:`MemoryCache` by default.
+            ttl (float): Seconds a response is served without revalidation.
+        """
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl
+
+    @staticmethod
+    def get_key(token, url, params):
+        data = json.dumps([token, url, params], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Get the cached response of a request, None if not cached.
+        """
+        return self.backend.get(key)
+
+    @staticmethod
+    def get_validators(entry):
+        """
+        Get the headers revalidating a stale cached response.
+        """
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def update(self, key, url, entry, status_code, headers, text):
+        """
+        Store the response of a request made with the validators of
+        ``entry``.
+
+        Returns:
+            body: The parsed response body.
+        """
+        expires_at = time.time() + self.ttl
+        if status_code == 304 and entry is not None:
+            entry.expires_at = expires_at
+        else:
+            entry = CacheEntry(get_cache_group(url), text, headers.get('ETag'), headers.get('Last-Modified'),
+                               expires_at)
+        self.backend.set(key, entry)
+        return entry.body
+
+    def record_read(self, url, body):
+        """
+        Drop the cached storage responses when a read job has completed, as
+        storage jobs change buckets and tables after the request creating
+        them.
+        """
+        path = urlparse(url).path
+        if '/v2/storage/jobs/' in path and isinstance(body, dict) \
+                and body.get('status') in JOB_COMPLETED_STATUSES:
+            self.backend.invalidate('storage')
+
+    def invalidate(self, url):
+        """
+        Drop the cached responses of the group of endpoints of a url.
+        """
+        group = get_cache_group(url)
+        if group is not None:
+            self.backend.invalidate(group)
+
+    def clear(self):
+        self.backend.clear()
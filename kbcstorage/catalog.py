@@ -0,0 +1,185 @@
+"""
+In-process index of the buckets, tables and columns of a project.
+
+The catalog loads all tables with their columns, buckets and attributes in a
+single request and answers lookups, such as the tables containing a column,
+from dictionaries. Refreshing it lists the tables without their details and
+fetches only the tables whose ``lastChangeDate`` changed.
+"""
+import collections
+import threading
+
+CATALOG_INCLUDE = ['columns', 'buckets', 'attributes']
+MAX_DETAILS_DEFAULT = 20
+
+
+class Catalog:
+    """
+    Index of the tables of a project.
+    """
+    def __init__(self, tables, max_details=MAX_DETAILS_DEFAULT):
+        """
+        Args:
+            tables (:obj:`Tables`): Tables endpoint the catalog is loaded
+                with.
+            max_details (int): Maximum number of changed tables fetched one
+                by one on refresh, more changes reload the whole catalog.
+        """
+        self.tables_endpoint = tables
+        self.max_details = max_details
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._tables = {}
+        self._buckets = {}
+        self._by_bucket = collections.defaultdict(set)
+        self._by_name = collections.defaultdict(set)
+        self._by_column = collections.defaultdict(set)
+        self._by_attribute = collections.defaultdict(lambda: collections.defaultdict(set))
+
+    def load(self):
+        """
+        Load all tables of the project, replacing the current index.
+
+        Returns:
+            catalog (:obj:`Catalog`): The catalog itself.
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        self._replace(self.tables_endpoint.list(include=CATALOG_INCLUDE))
+        return self
+
+    def refresh(self):
+        """
+        Update the index with the tables created, changed or deleted since
+        it was loaded.
+
+        Returns:
+            changed (set): Ids of the tables added, changed or removed.
+
+        Raises:
+            requests.HTTPError: If any API request fails.
+        """
+        changed, removed = self._diff(self.tables_endpoint.list())
+        if len(changed) > self.max_details:
+            self.load()
+        else:
+            self._update([self.tables_endpoint.detail(table_id) for table_id in changed], removed)
+        return set(changed) | removed
+
+    def _diff(self, listing):
+        """
+        Compare a listing of tables to the index.
+
+        Returns:
+            changed (list): Ids of the tables which are new or changed.
+            removed (set): Ids of the tables which no longer exist.
+        """
+        with self._lock:
+            changed = [table['id'] for table in listing
+                       if table['id'] not in self._tables
+                       or self._tables[table['id']].get('lastChangeDate') != table.get('lastChangeDate')]
+            removed = set(self._tables) - {table['id'] for table in listing}
+        return changed, removed
+
+    def _replace(self, tables):
+        with self._lock:
+            self._clear()
+            for table in tables:
+                self._add(table)
+
+    def _update(self, tables, removed):
+        with self._lock:
+            for table_id in removed:
+                self._remove(table_id)
+            for table in tables:
+                self._remove(table['id'])
+                self._add(table)
+
+    def _add(self, table):
+        table_id = table['id']
+        self._tables[table_id] = table
+        bucket = table.get('bucket') or {}
+        bucket_id = bucket.get('id', table_id.rsplit('.', 1)[0])
+        if bucket:
+            self._buckets[bucket_id] = bucket
+        self._by_bucket[bucket_id].add(table_id)
+        self._by_name[table['name']].add(table_id)
+        for column in table.get('columns', []):
+            self._by_column[column].add(table_id)
+        for attribute in table.get('attributes', []):
+            self._by_attribute[attribute['name']][attribute.get('value')].add(table_id)
+
+    def _remove(self, table_id):
+        table = self._tables.pop(table_id, None)
+        if table is None:
+            return
+        bucket_id = (table.get('bucket') or {}).get('id', table_id.rsplit('.', 1)[0])
+        self._by_bucket[bucket_id].discard(table_id)
+        self._by_name[table['name']].discard(table_id)
+        for column in table.get('columns', []):
+            self._by_column[column].discard(table_id)
+        for attribute in table.get('attributes', []):
+            self._by_attribute[attribute['name']][attribute.get('value')].discard(table_id)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def __contains__(self, table_id):
+        return table_id in self._tables
+
+    def get(self, table_id):
+        """
+        Get a table with its columns, bucket and attributes, None if it does
+        not exist.
+        """
+        return self._tables.get(table_id)
+
+    def get_bucket(self, bucket_id):
+        """
+        Get a bucket containing any table, None if there is no such bucket.
+        """
+        return self._buckets.get(bucket_id)
+
+    def missing(self, table_ids):
+        """
+        Get the ids of the given tables which do not exist.
+
+        Returns:
+            missing (list): The ids in the order given.
+        """
+        return [table_id for table_id in table_ids if table_id not in self._tables]
+
+    def tables_in_bucket(self, bucket_id):
+        """
+        Get the ids of the tables of a bucket.
+        """
+        with self._lock:
+            return set(self._by_bucket.get(bucket_id, ()))
+
+    def tables_named(self, name):
+        """
+        Get the ids of the tables with a name, in any bucket.
+        """
+        with self._lock:
+            return set(self._by_name.get(name, ()))
+
+    def tables_with_column(self, column):
+        """
+        Get the ids of the tables containing a column.
+        """
+        with self._lock:
+            return set(self._by_column.get(column, ()))
+
+    def tables_with_attribute(self, name, value=None):
+        """
+        Get the ids of the tables having an attribute, with the given value
+        unless ``value`` is None.
+        """
+        with self._lock:
+            values = self._by_attribute.get(name, {})
+            if value is not None:
+                return set(values.get(value, ()))
+            return set().union(*values.values())
@@ -0,0 +1,125 @@
+"""
+Circuit breaker of the Storage API transport.
+
+When too many of the recent requests to the API fail, after their retries,
+the circuit opens and new requests fail fast with :obj:`CircuitOpenError`
+instead of retrying against a backend which is down. After a while the circuit lets a probe request
+through (half-open) and closes again once the probe succeeds.
+"""
+import collections
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+FAILURE_RATE_DEFAULT = 0.5
+WINDOW_SIZE_DEFAULT = 20
+MIN_CALLS_DEFAULT = 10
+OPEN_TIMEOUT_DEFAULT = 30.0
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of sending a request while the circuit is open.
+
+    Attributes:
+        retry_in (float): Seconds until the circuit lets a probe through.
+    """
+    def __init__(self, retry_in):
+        super().__init__('Storage API circuit is open, retry in {:.1f} seconds.'.format(retry_in))
+        self.retry_in = retry_in
+
+
+def is_failure(status_code):
+    """
+    Tell whether a response status means the backend is failing. Throttling
+    (429) and client errors do not count.
+    """
+    return status_code >= 500 and status_code != 501
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcomes of requests and decides whether to send new ones.
+    Safe to share between threads.
+    """
+    def __init__(self, failure_rate=FAILURE_RATE_DEFAULT, window_size=WINDOW_SIZE_DEFAULT,
+                 min_calls=MIN_CALLS_DEFAULT, open_timeout=OPEN_TIMEOUT_DEFAULT):
+        """
+        Args:
+            failure_rate (float): Share of failed requests among the last
+                ``window_size`` ones which opens the circuit.
+            window_size (int): Number of the last requests considered.
+            min_calls (int): The circuit never opens on fewer requests.
+            open_timeout (float): Seconds the circuit stays open before
+                letting a probe through.
+        """
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_timeout = open_timeout
+        self._outcomes = collections.deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        State of the circuit: 'closed', 'open' or 'half_open'.
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def before_request(self):
+        """
+        Check that a request may be sent.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or another request is
+                probing it.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == OPEN:
+                remaining = self._opened_at + self.open_timeout - now
+                if remaining > 0:
+                    raise CircuitOpenError(remaining)
+                self._state = HALF_OPEN
+            elif now - self._probe_started < self.open_timeout:
+                # a probe in flight, a probe which never reported is replaced
+                raise CircuitOpenError(self._probe_started + self.open_timeout - now)
+            self._probe_started = now
+
+    def record(self, success):
+        """
+        Record the outcome of a request.
+
+        Args:
+            success (bool): The backend handled the request.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if success:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
@@ -1,12 +1,19 @@
 """"
 Entry point for the Storage API client.
 """
+from kbcstorage.base import lazy_endpoint
 from kbcstorage.branches import Branches
 from kbcstorage.buckets import Buckets
+from kbcstorage.circuit_breaker import CLOSED
 from kbcstorage.components import Components
+from kbcstorage.events import Events
+from kbcstorage.files import MAX_WORKERS_DEFAULT, UPLOAD_PART_RETRIES_DEFAULT, UPLOAD_PART_SIZE_DEFAULT, Files
 from kbcstorage.configurations import Configurations
 from kbcstorage.jobs import Jobs
-from kbcstorage.tables import Tables
+from kbcstorage.rate_limiter import RateLimits
+from kbcstorage.retry_requests import (MAX_RETRIES_DEFAULT, POOL_MAXSIZE_DEFAULT, RetryRequests,
+                                       create_session)
+from kbcstorage.tables import SUBMIT_MAX_WORKERS_DEFAULT, Tables
 from kbcstorage.tokens import Tokens
 from kbcstorage.triggers import Triggers
 from kbcstorage.workspaces import Workspaces
@@ -17,7 +24,12 @@ class Client:
     Storage API Client.
     """
 
-    def __init__(self, api_domain, token, branch_id='default', file_storage_support=True):
+    def __init__(self, api_domain, token, branch_id='default', file_storage_support=True,
+                 pool_maxsize=POOL_MAXSIZE_DEFAULT, max_requests_retries=MAX_RETRIES_DEFAULT,
+                 max_workers=SUBMIT_MAX_WORKERS_DEFAULT, retry_policy=None, rate_limits=None,
+                 circuit_breaker=None, cache=None, events=None, tracing=None,
+                 transfer_max_workers=MAX_WORKERS_DEFAULT, upload_part_size=UPLOAD_PART_SIZE_DEFAULT,
+                 max_part_retries=UPLOAD_PART_RETRIES_DEFAULT):
         """
         Initialise a client.
 
@@ -26,26 +38,134 @@ class Client:
                 "https://connection.keboola.com".
             token (str): A storage API key.
             branch_id (str): The ID of branch to use, use 'default' to work without branch (in main).
-            file_storage_support (bool): If False, it saves memory by not importing libraries for all storage backends.
+            file_storage_support (bool): If False, the client has no ``files`` endpoint. Endpoints are created on
+                first access and the libraries of a storage backend are imported only when a file stored in it
+                is transferred.
+            pool_maxsize (int): Maximum number of keep-alive connections kept open per host. All endpoints
+                of the client share a single connection pool.
+            max_requests_retries (int): Number of retries of failed requests.
+            max_workers (int): Number of table loads and exports started by the ``tables.submit_*`` methods
+                that run at once.
+            retry_policy (:obj:`RetryPolicy`): Policy of retrying failed requests, overrides
+                ``max_requests_retries``. By default requests are retried with jittered backoff within a
+                retry budget shared by the whole client. ``RetryPolicy(budget=RetryBudget(max_seconds=300))``
+                also limits the total time the requests of the client wait to be retried.
+            rate_limits (:obj:`RateLimits`): Adaptive rate limits of the groups of endpoints shared by the whole
+                client, ``RateLimits()`` by default. ``RateLimits({})`` disables them.
+            circuit_breaker (:obj:`CircuitBreaker`): Circuit breaker failing requests fast with
+                :obj:`CircuitOpenError` while the API is down, e.g. ``CircuitBreaker()``. None by default.
+            cache (:obj:`ResponseCache`): Cache of responses of the metadata of buckets, tables, components,
+                configurations and branches, e.g. ``ResponseCache(ttl=60)``. Responses are not cached by default.
+            events (:obj:`Events`): Subscribers of the events of the requests, job waits and file transfers of
+                the client, a new :obj:`Events` by default, see ``kbcstorage.events``.
+            tracing (:obj:`Tracing`): OpenTelemetry tracing of the requests and operations of the client, e.g.
+                ``Tracing()``, see ``kbcstorage.tracing``. Not traced by default.
+            transfer_max_workers (int): Number of parts and slices of a file transferred at once by the
+                ``files`` endpoint and by table loads and exports.
+            upload_part_size (int): Size in bytes of the parts of multipart uploads.
+            max_part_retries (int): Number of attempts to upload each part of a multipart upload.
         """
         self.root_url = api_domain.rstrip("/")
         self._token = token
         self._branch_id = branch_id
+        self._transport = RetryRequests(max_requests_retries,
+                                        session=create_session(pool_maxsize=pool_maxsize),
+                                        retry_policy=retry_policy,
+                                        rate_limits=rate_limits if rate_limits is not None else RateLimits(),
+                                        circuit_breaker=circuit_breaker,
+                                        cache=cache,
+                                        events=events if events is not None else Events(),
+                                        tracing=tracing)
 
-        self.buckets = Buckets(self.root_url, self.token)
+        self._file_storage_support = file_storage_support
+        self._max_workers = max_workers
+        self._transfer_settings = {'max_workers': transfer_max_workers, 'upload_part_size': upload_part_size,
+                                   'max_part_retries': max_part_retries}
 
-        if file_storage_support:
-            from kbcstorage.files import Files
-            self.files = Files(self.root_url, self.token)
+    @lazy_endpoint
+    def buckets(self):
+        return Buckets(self.root_url, self.token, transport=self._transport)
 
-        self.jobs = Jobs(self.root_url, self.token)
-        self.tables = Tables(self.root_url, self.token)
-        self.workspaces = Workspaces(self.root_url, self.token)
-        self.components = Components(self.root_url, self.token, self.branch_id)
-        self.configurations = Configurations(self.root_url, self.token, self.branch_id)
-        self.tokens = Tokens(self.root_url, self.token)
-        self.branches = Branches(self.root_url, self.token)
-        self.triggers = Triggers(self.root_url, self.token)
+    @lazy_endpoint
+    def files(self):
+        if not self._file_storage_support:
+            raise AttributeError("The client was created without file storage support.")
+        return Files(self.root_url, self.token, transport=self._transport, **self._transfer_settings)
+
+    @lazy_endpoint
+    def jobs(self):
+        return Jobs(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def tables(self):
+        files = Files(self.root_url, self.token, transport=self._transport, **self._transfer_settings)
+        return Tables(self.root_url, self.token, transport=self._transport, max_workers=self._max_workers,
+                      files=files)
+
+    @lazy_endpoint
+    def workspaces(self):
+        return Workspaces(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def components(self):
+        return Components(self.root_url, self.token, self.branch_id, transport=self._transport)
+
+    @lazy_endpoint
+    def configurations(self):
+        return Configurations(self.root_url, self.token, self.branch_id, transport=self._transport)
+
+    @lazy_endpoint
+    def tokens(self):
+        return Tokens(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def branches(self):
+        return Branches(self.root_url, self.token, transport=self._transport)
+
+    @lazy_endpoint
+    def triggers(self):
+        return Triggers(self.root_url, self.token, transport=self._transport)
+
+    def close(self):
+        """
+        Close the connections held open by the client, after the operations
+        submitted in the background finish.
+        """
+        if 'tables' in self.__dict__:
+            self.tables.shutdown()
+        self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def circuit_state(self):
+        """
+        State of the circuit breaker of the client: 'closed', 'open' or
+        'half_open', always 'closed' without a breaker. Schedulers may shed
+        load while it is not closed.
+        """
+        if self._transport.circuit_breaker is None:
+            return CLOSED
+        return self._transport.circuit_breaker.state
+
+    @property
+    def events(self):
+        """
+        Subscribers of the events of the client, e.g.
+        ``client.events.subscribe(callback, ['request_end'])``.
+        """
+        return self._transport.events
+
+    @property
+    def session(self):
+        """
+        The pooled HTTP session shared by all endpoints of the client.
+        """
+        return self._transport.session
 
     @property
     def token(self):
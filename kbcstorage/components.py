@@ -10,7 +10,7 @@ class Components(Endpoint):
     """
     Components Endpoint
     """
-    def __init__(self, root_url, token, branch_id):
+    def __init__(self, root_url, token, branch_id, transport=None):
         """
         Create a Configuration endpoint.
 
@@ -18,8 +18,9 @@ class Components(Endpoint):
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
             branch_id (str): The ID of branch to use, use 'default' to work without branch (in main).
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
-        super().__init__(root_url, f"branch/{branch_id}/components", token)
+        super().__init__(root_url, f"branch/{branch_id}/components", token, transport=transport)
 
     def list(self, include=None):
         """
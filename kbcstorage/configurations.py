@@ -13,7 +13,7 @@ class Configurations(Endpoint):
     Configurations Endpoint
     """
 
-    def __init__(self, root_url, token, branch_id):
+    def __init__(self, root_url, token, branch_id, transport=None):
         """
         Create a Component endpoint.
 
@@ -21,9 +21,10 @@ class Configurations(Endpoint):
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
             branch_id (str): The ID of branch to use, use 'default' to work without branch (in main).
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
-        super().__init__(root_url, f"branch/{branch_id}/components", token)
-        self.metadata = ConfigurationsMetadata(root_url, token, branch_id)
+        super().__init__(root_url, f"branch/{branch_id}/components", token, transport=transport)
+        self.metadata = ConfigurationsMetadata(root_url, token, branch_id, transport=self.requests)
 
     def detail(self, component_id, configuration_id):
         """
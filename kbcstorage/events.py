@@ -0,0 +1,118 @@
+"""
+Events of the requests, job waits and file transfers of a client, for
+feeding metrics and logs.
+
+A subscriber is a function of the name of an event and a dict of its fields.
+Subscribers are called in the thread emitting the event, so they should be
+fast; an exception raised by a subscriber is logged and does not fail the
+operation. The events are:
+
+``request_start``
+    ``method``, ``url``.
+
+``request_end``
+    ``method``, ``url``, ``status_code`` (None if no response was received),
+    ``error`` (name of the exception raised, None otherwise), ``seconds``,
+    ``retries``, ``backoff_seconds`` slept between attempts,
+    ``throttled_seconds`` waited for the rate limit, ``bytes_sent`` and
+    ``bytes_received`` (None if unknown, e.g. for streamed bodies).
+
+``retry``
+    ``method``, ``url``, ``attempt``, ``status_code``, ``error`` and
+    ``delay`` slept before the next attempt.
+
+``job_wait``
+    ``job_id``, ``status``, ``polls``, ``seconds``, ``error`` and ``job``,
+    the completed job, whose ``createdTime``, ``startTime`` and ``endTime``
+    tell the time spent in the queue from the time spent processing.
+
+``file_transfer``
+    ``phase`` ('upload', 'upload_slice', 'download', 'download_slice' or
+    'merge'), ``file_id``, ``provider``, ``bytes`` (None if unknown),
+    ``seconds`` and ``error``; ``slice`` for the phases of a single slice.
+"""
+import contextlib
+import logging
+import threading
+import time
+
+REQUEST_START = 'request_start'
+REQUEST_END = 'request_end'
+RETRY = 'retry'
+JOB_WAIT = 'job_wait'
+FILE_TRANSFER = 'file_transfer'
+
+logger = logging.getLogger(__name__)
+
+
+def get_content_length(headers):
+    """
+    Get the size of a body from the Content-Length header, None if missing.
+    """
+    value = headers.get('Content-Length')
+    return int(value) if value is not None and value.isdigit() else None
+
+
+class Events:
+    """
+    Subscribers of the events of a client. Safe to share between threads.
+    """
+    def __init__(self):
+        # replaced rather than changed, so emitting needs no lock
+        self._subscribers = ()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """
+        True if there is any subscriber.
+        """
+        return bool(self._subscribers)
+
+    def subscribe(self, callback, names=None):
+        """
+        Call ``callback(name, fields)`` on events.
+
+        Args:
+            callback (callable): The subscriber.
+            names (list): Names of the events, all events by default.
+
+        Returns:
+            callback: The subscriber, to be used as a decorator.
+        """
+        with self._lock:
+            self._subscribers += ((callback, None if names is None else frozenset(names)),)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = tuple(subscriber for subscriber in self._subscribers if subscriber[0] != callback)
+
+    def emit(self, name, **fields):
+        for callback, names in self._subscribers:
+            if names is not None and name not in names:
+                continue
+            try:
+                callback(name, fields)
+            except Exception:
+                logger.exception("Subscriber of the '%s' event failed.", name)
+
+    @contextlib.contextmanager
+    def measure(self, name, **fields):
+        """
+        Emit an event with the ``seconds`` and the ``error`` of the block
+        of the with statement.
+
+        Yields:
+            fields (dict): Fields of the event, the block may add to them.
+        """
+        if not self._subscribers:
+            yield fields
+            return
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            self.emit(name, **dict(fields, seconds=time.perf_counter() - start, error=type(e).__name__))
+            raise
+        self.emit(name, **dict(fields, seconds=time.perf_counter() - start, error=None))
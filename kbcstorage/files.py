@@ -6,30 +6,264 @@ Full documentation `here`.
 .. _here:
     http://docs.keboola.apiary.io/#reference/files/
 """
+import collections
+import copy
+import functools
+import io
+import itertools
 import json
 import os
-import boto3
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import requests
 
-from azure.storage.blob import BlobServiceClient, ContentSettings
-from kbcstorage.base import Endpoint
-from google.oauth2 import credentials
-from google.cloud import storage as GCPStorage
+from kbcstorage.base import Endpoint, with_context
+from kbcstorage.events import FILE_TRANSFER
+from kbcstorage.retry_requests import _get_jittered_backoff
+
+MAX_WORKERS_DEFAULT = 8
+COPY_CHUNK_SIZE = 16 * 1024 * 1024
+UPLOAD_PART_SIZE_DEFAULT = 64 * 1024 * 1024
+UPLOAD_PART_RETRIES_DEFAULT = 5
+# the lowest limit of parts of a single object among the providers
+MAX_UPLOAD_PARTS = 10000
+GCP_CHUNK_SIZE_UNIT = 256 * 1024
+COMPRESS_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _copy_file_range(in_fd, out_fd, count):
+    return os.copy_file_range(in_fd, out_fd, count)
+
+
+def _sendfile(in_fd, out_fd, count):
+    return os.sendfile(out_fd, in_fd, None, count)
+
+
+def _read_write(in_fd, out_fd, count):
+    data = os.read(in_fd, min(count, COPY_CHUNK_SIZE))
+    view = memoryview(data)
+    while view:
+        view = view[os.write(out_fd, view):]
+    return len(data)
+
+
+def _read_part(file_path, offset, size):
+    with open(file_path, mode='rb') as file:
+        file.seek(offset)
+        return file.read(size)
+
+
+def _read_chunks(file_path, offset=0, size=None, chunk_size=COPY_CHUNK_SIZE):
+    """
+    Read chunks of a local file from ``offset``, up to ``size`` bytes or to
+    the end of the file when ``size`` is None.
+    """
+    with open(file_path, mode='rb') as file:
+        file.seek(offset)
+        while size is None or size > 0:
+            chunk = file.read(chunk_size if size is None else min(chunk_size, size))
+            if not chunk:
+                return
+            if size is not None:
+                size -= len(chunk)
+            yield chunk
+
+
+def _count_bytes(parts, fields):
+    """
+    Pass parts through, adding their size to ``fields['bytes']``.
+    """
+    fields['bytes'] = 0
+    for part in parts:
+        fields['bytes'] += len(part)
+        yield part
+
+
+def _get_file_fields(file_resource):
+    """
+    Get the fields of the transfer events of a file resource.
+    """
+    return {'file_id': file_resource.get('id'), 'provider': file_resource.get('provider')}
+
+
+def _join_chunks(chunks, min_size):
+    """
+    Join chunks of bytes into chunks of at least ``min_size`` bytes, except
+    the last one.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        if not buffer and len(chunk) >= min_size:
+            yield bytes(chunk)
+            continue
+        buffer += chunk
+        if len(buffer) >= min_size:
+            yield bytes(buffer)
+            buffer = bytearray()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _gzip_member(data):
+    """
+    Compress data into a complete gzip member, members concatenated are a
+    valid gzip file.
+    """
+    compressor = zlib.compressobj(wbits=31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _append_file(in_fd, out_fd):
+    """
+    Copy the rest of one file descriptor to another, in the kernel where the
+    platform and file system allow it.
+
+    Both descriptors are advanced, so a copy method failing halfway is
+    continued by the next one from where it stopped.
+    """
+    remaining = os.fstat(in_fd).st_size - os.lseek(in_fd, 0, os.SEEK_CUR)
+    copy_methods = [_read_write]
+    if hasattr(os, 'sendfile'):
+        copy_methods.insert(0, _sendfile)
+    if hasattr(os, 'copy_file_range'):
+        copy_methods.insert(0, _copy_file_range)
+    for copy_method in copy_methods:
+        try:
+            while remaining > 0:
+                copied = copy_method(in_fd, out_fd, min(remaining, COPY_CHUNK_SIZE))
+                if copied == 0:
+                    return
+                remaining -= copied
+            return
+        except OSError:
+            if copy_method is _read_write:
+                raise
+
+
+class _ChunksReader(io.RawIOBase):
+    """
+    Read-only raw stream over an iterator of byte chunks.
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._chunk:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._chunk = memoryview(chunk)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+
+def _get_status_code(error):
+    """
+    Get the HTTP status of an error of a storage library, None for errors
+    without a response such as broken connections.
+    """
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        # botocore
+        return response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    # azure, requests and google
+    status_code = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status_code is None and isinstance(getattr(error, 'code', None), int):
+        status_code = error.code
+    return status_code
+
+
+class _ResumingReader(io.RawIOBase):
+    """
+    Read-only raw stream over a slice in storage, reopened from the offset
+    reached when opening or reading it fails.
+
+    The failures are retried by the retry policy of the client, like failed
+    requests, and the slice is not read again from its start.
+    """
+    def __init__(self, open_range, retry_policy):
+        """
+        Args:
+            open_range (callable): Opens a readable binary stream of the
+                slice starting at the given offset.
+            retry_policy (:obj:`RetryPolicy`): Policy of retrying failures.
+        """
+        self._open_range = open_range
+        self._retry_policy = retry_policy
+        self._offset = 0
+        self._stream = None
+        self._retry(lambda: None)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._retry(lambda: self._stream.read(len(buffer)))
+        buffer[:len(data)] = data
+        self._offset += len(data)
+        return len(data)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        super().close()
+
+    def _retry(self, func):
+        state = None
+        while True:
+            try:
+                if self._stream is None:
+                    self._stream = self._open_range(self._offset)
+                return func()
+            except Exception as e:
+                if state is None:
+                    state = self._retry_policy.start('GET')
+                delay = state.next_delay(_get_status_code(e))
+                if delay is None:
+                    raise
+                if self._stream is not None:
+                    try:
+                        self._stream.close()
+                    except Exception:
+                        pass
+                    self._stream = None
+                time.sleep(delay)
 
 
 class Files(Endpoint):
     """
     Buckets Endpoint
     """
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None, max_workers=MAX_WORKERS_DEFAULT,
+                 upload_part_size=UPLOAD_PART_SIZE_DEFAULT,
+                 max_part_retries=UPLOAD_PART_RETRIES_DEFAULT):
         """
         Create a Files endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
+            max_workers (int): Number of slices of a sliced file, or parts of
+                an uploaded file, transferred at once.
+            upload_part_size (int): Files larger than this many bytes are
+                uploaded in parts of this size. The size grows for files too
+                large for the part limit of the provider.
+            max_part_retries (int): Number of attempts to upload each part.
         """
-        super().__init__(root_url, 'files', token)
+        super().__init__(root_url, 'files', token, transport=transport)
+        self.max_workers = max_workers
+        self.upload_part_size = upload_part_size
+        self.max_part_retries = max_part_retries
 
     def detail(self, file_id, federation_token=False):
         """
@@ -63,6 +297,8 @@ class Files(Endpoint):
             is_encrypted (bool): File is encrypted
             is_sliced (bool): File is sliced
             do_notify (bool): Notify members of project that file was uploaded
+            compress (bool): Gzip the file while uploading it, the file is
+                stored with the '.gz' extension
 
         Returns:
             file_id (str): Id of the created file
@@ -70,27 +306,97 @@ class Files(Endpoint):
         Raises:
             requests.HTTPError: If the API request fails.
         """
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
-            raise ValueError("File " + file_path + " does not exist")
-        if compress:
-            import gzip
-            import shutil
-            with open(file_path, 'rb') as f_in, \
-                    gzip.open(file_path + '.gz', 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
-            file_path = file_path + '.gz'
-        file_name = os.path.basename(file_path)
-        size = os.path.getsize(file_path)
-        file_resource = self.prepare_upload(file_name, size, tags, is_public,
-                                            is_permanent, is_encrypted,
-                                            is_sliced, do_notify, True)
-        if file_resource['provider'] == 'azure':
-            self.__upload_to_azure(file_resource, file_path)
-        elif file_resource['provider'] == 'aws':
-            self.__upload_to_aws(file_resource, file_path, is_encrypted)
-        elif file_resource['provider'] == 'gcp':
-            self.__upload_to_gcp(file_resource, file_path)
+        with self._span('files.upload_file', file_name=os.path.basename(file_path)):
+            if not os.path.exists(file_path) or not os.path.isfile(file_path):
+                raise ValueError("File " + file_path + " does not exist")
+            file_name = os.path.basename(file_path)
+            if compress:
+                chunks = _read_chunks(file_path, chunk_size=COMPRESS_CHUNK_SIZE)
+                parts, size = self._start_upload_parts(chunks, True, os.path.getsize(file_path))
+                with self._span('files.prepare'):
+                    file_resource = self.prepare_upload(file_name + '.gz', size, tags, is_public,
+                                                        is_permanent, is_encrypted,
+                                                        is_sliced, do_notify, True)
+                self._upload_parts(file_resource, parts, is_encrypted)
+                return file_resource['id']
+            size = os.path.getsize(file_path)
+            with self._span('files.prepare'):
+                file_resource = self.prepare_upload(file_name, size, tags, is_public,
+                                                    is_permanent, is_encrypted,
+                                                    is_sliced, do_notify, True)
+            self._upload(file_resource, file_path, is_encrypted)
+
+            return file_resource['id']
+
+    def upload_data(self, name, chunks, tags=None, is_public=False,
+                    is_permanent=False, is_encrypted=True, do_notify=False,
+                    compress=True):
+        """
+        Upload data produced in chunks to storage, without a local file.
+
+        The chunks are consumed as the upload progresses, so only the parts
+        being uploaded are held in memory.
 
+        Args:
+            name (str): The file name
+            chunks (iterable): The data in chunks of bytes
+            tags (list): Array of tags
+            is_public (bool): File is public
+            is_permanent (bool): File is permanent
+            is_encrypted (bool): File is encrypted
+            do_notify (bool): Notify members of project that file was uploaded
+            compress (bool): Gzip the data while uploading it, the file is
+                stored with the '.gz' extension
+
+        Returns:
+            file_id (str): Id of the created file
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        parts, size = self._start_upload_parts(chunks, compress)
+        with self._span('files.prepare'):
+            file_resource = self.prepare_upload(name + '.gz' if compress else name, size, tags,
+                                                is_public, is_permanent, is_encrypted,
+                                                False, do_notify, True)
+        self._upload_parts(file_resource, parts, is_encrypted)
+        return file_resource['id']
+
+    def upload_sliced_file(self, name, slices, tags=None, is_public=False,
+                           is_permanent=False, is_encrypted=True,
+                           do_notify=False, compress=True):
+        """
+        Upload a sliced file to storage
+
+        The slices are uploaded concurrently, each compressed on the fly,
+        and a manifest listing them is uploaded last. The parts of each slice
+        are uploaded one by one, so at most ``max_workers`` parts are in
+        memory at once.
+
+        Args:
+            name (str): The file name
+            slices (list): Byte ranges of local files, a
+                ``(file_path, offset, size)`` tuple for each slice in order
+            tags (list): Array of tags
+            is_public (bool): File is public
+            is_permanent (bool): File is permanent
+            is_encrypted (bool): File is encrypted
+            do_notify (bool): Notify members of project that file was uploaded
+            compress (bool): Gzip the slices while uploading them, the file
+                is stored with the '.gz' extension
+
+        Returns:
+            file_id (str): Id of the created file
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        size = None if compress else sum(size for _, _, size in slices)
+        with self._span('files.prepare'):
+            file_resource = self.prepare_upload(name + '.gz' if compress else name, size, tags,
+                                                is_public, is_permanent, is_encrypted,
+                                                True, do_notify, True)
+        self._upload_slices(file_resource, slices, is_encrypted, compress)
         return file_resource['id']
 
     def prepare_upload(self, name, size_bytes=None, tags=None, is_public=False,
@@ -179,23 +485,307 @@ class Files(Endpoint):
         return self._get(self.base_url, params=params)
 
     def download(self, file_id, local_path):
-        if not os.path.exists(local_path):
-            os.mkdir(local_path)
+        """
+        Download a file from storage to a local directory.
+
+        Args:
+            file_id (str): The id of the file.
+            local_path (str): Local directory to download the file to.
+
+        Returns:
+            local_file (str): Path to the downloaded file
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        with self._span('files.download', file_id=file_id):
+            if not os.path.exists(local_path):
+                os.mkdir(local_path)
+            file_info = self.detail(file_id=file_id, federation_token=True)
+            local_file = os.path.join(local_path, file_info['name'])
+            self._download(file_info, local_file)
+            return local_file
+
+    def open_slices(self, file_id):
+        """
+        Stream the content of a file without storing it locally.
+
+        Args:
+            file_id (str): The id of the file.
+
+        Returns:
+            slices (generator): Readable binary stream of each slice of the
+                file in order, a single stream for a file that is not sliced.
+                A stream is closed when the next one is requested.
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
         file_info = self.detail(file_id=file_id, federation_token=True)
-        local_file = os.path.join(local_path, file_info['name'])
+        return self._open_slices(file_info)
+
+    def _open_slices(self, file_info):
+        """
+        Yield a readable binary stream for each slice of a file.
+
+        Args:
+            file_info (dict): Response of ``detail`` with a federation token
+        """
+        for open_slice in self._get_slice_openers(file_info):
+            stream = open_slice()
+            try:
+                yield stream
+            finally:
+                stream.close()
+
+    def _get_slice_openers(self, file_info):
+        """
+        Get a function opening a readable binary stream for each slice of a
+        file, in order. The functions may be called from multiple threads.
+
+        A stream failing to open or read is reopened from where it stopped,
+        retried by the retry policy of the client.
+
+        Args:
+            file_info (dict): Response of ``detail`` with a federation token
+        """
+        if file_info['provider'] == 'azure':
+            container_client = self.__get_azure_container_client(file_info)
+            if file_info['isSliced']:
+                keys = self.__get_azure_slice_keys(file_info, container_client)
+            else:
+                keys = [file_info['absPath']['name']]
+
+            def open_range(key, offset):
+                kwargs = {'offset': offset} if offset else {}
+                return _ChunksReader(container_client.download_blob(key, **kwargs).chunks())
+        elif file_info['provider'] == 'aws':
+            s3_client = self.__get_s3_resource(file_info).meta.client
+            bucket = file_info['s3Path']['bucket']
+            if file_info['isSliced']:
+                keys = self.__get_slice_keys(file_info)
+            else:
+                keys = [file_info['s3Path']['key']]
+
+            def open_range(key, offset):
+                kwargs = {'Range': 'bytes={}-'.format(offset)} if offset else {}
+                return s3_client.get_object(Bucket=bucket, Key=key, **kwargs)['Body']
+        elif file_info['provider'] == 'gcp':
+            bucket = self.__get_gcp_client(
+                file_info['gcsCredentials']['access_token'],
+                file_info['gcsCredentials']['projectId'],
+            ).bucket(file_info['gcsPath']['bucket'])
+            if file_info['isSliced']:
+                keys = self.__get_slice_keys(file_info)
+            else:
+                keys = [file_info['gcsPath']['key']]
+
+            def open_range(key, offset):
+                stream = bucket.blob(key).open('rb', chunk_size=COPY_CHUNK_SIZE)
+                stream.seek(offset)
+                return stream
+        else:
+            raise ValueError("Unsupported file provider '{}'.".format(file_info['provider']))
+
+        def open_slice(key):
+            reader = _ResumingReader(functools.partial(open_range, key), self.requests.retry_policy)
+            return io.BufferedReader(reader, COPY_CHUNK_SIZE)
+
+        return [functools.partial(open_slice, key) for key in keys]
+
+    def _start_upload_parts(self, chunks, compress, size=None):
+        """
+        Start producing upload parts from data in chunks.
+
+        Compressed data is gzipped in chunks in parallel, each into its own
+        gzip member, and no compressed copy is stored. The first parts are
+        produced right away to learn the size of data that fits into a
+        single part.
+
+        Args:
+            chunks (iterable): The data in chunks of bytes
+            compress (bool): Gzip the data
+            size (int): Size of the data if known, larger data is uploaded
+                in larger parts to stay within the part limits
+
+        Returns:
+            parts (iterator): The data in parts of at least the upload part
+                size, except the last one.
+            size (int): Size of the uploaded data in a single part, None
+                otherwise.
+        """
+        if compress:
+            chunks = self.__iter_gzip_members(_join_chunks(chunks, COMPRESS_CHUNK_SIZE), self.max_workers)
+        parts = _join_chunks(chunks, self.__get_part_size(size or 0))
+        first_part = next(parts, b'')
+        second_part = next(parts, None)
+        if second_part is None:
+            return iter([first_part]), len(first_part)
+        return itertools.chain([first_part, second_part], parts), None
+
+    @staticmethod
+    def __iter_gzip_members(chunks, max_workers):
+        max_workers = max(1, max_workers)
+        pending = collections.deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for chunk in chunks:
+                    pending.append(executor.submit(_gzip_member, chunk))
+                    # bound the chunks held in memory, zlib runs outside the GIL
+                    if len(pending) > max_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _upload(self, file_resource, file_path, is_encrypted):
+        """
+        Upload a local file to the cloud storage of a prepared file resource.
+
+        Args:
+            file_resource (dict): Response of ``prepare_upload``
+            file_path (str): Local path to file to upload
+            is_encrypted (bool): File is encrypted
+        """
+        size = os.path.getsize(file_path)
+        with self._measure(FILE_TRANSFER, phase='upload', bytes=size, **_get_file_fields(file_resource)):
+            if size <= self.upload_part_size:
+                with open(file_path, mode='rb') as file:
+                    self.__upload_body(file_resource, file, is_encrypted)
+            elif file_resource['provider'] == 'gcp':
+                self.__upload_file_to_gcp(file_resource, file_path, size)
+            else:
+                part_size = self.__get_part_size(size)
+                parts = (_read_part(file_path, offset, part_size) for offset in range(0, size, part_size))
+                self.__upload_multipart(file_resource, parts, is_encrypted)
+
+    def _upload_parts(self, file_resource, parts, is_encrypted):
+        """
+        Upload data produced part by part to the cloud storage of a prepared
+        file resource. A single part is uploaded in one request.
+
+        Args:
+            file_resource (dict): Response of ``prepare_upload``
+            parts (iterable): The data as bytes, all parts but the last one
+                at least as large as the upload part size
+            is_encrypted (bool): File is encrypted
+        """
+        with self._measure(FILE_TRANSFER, phase='upload', **_get_file_fields(file_resource)) as fields:
+            self.__put_parts(file_resource, _count_bytes(parts, fields), is_encrypted)
+
+    def __put_parts(self, file_resource, parts, is_encrypted, max_workers=None):
+        parts = iter(parts)
+        first_part = next(parts, b'')
+        second_part = next(parts, None)
+        if second_part is None:
+            self.__upload_body(file_resource, io.BytesIO(first_part), is_encrypted)
+        else:
+            self.__upload_multipart(file_resource, itertools.chain([first_part, second_part], parts), is_encrypted,
+                                    max_workers)
+
+    def _upload_slices(self, file_resource, slices, is_encrypted, compress):
+        """
+        Upload the slices of a prepared sliced file and its manifest.
+
+        Args:
+            file_resource (dict): Response of ``prepare_upload``
+            slices (list): Byte ranges ``(file_path, offset, size)`` of the
+                slices
+            is_encrypted (bool): File is encrypted
+            compress (bool): Gzip the slices while uploading them
+        """
+        file_fields = _get_file_fields(file_resource)
+        slice_sizes = [0] * len(slices)
+
+        def upload_slice(index, file_slice):
+            file_path, offset, size = file_slice
+            slice_name = 'part{:04d}{}'.format(index, '.gz' if compress else '')
+            part_size = self.__get_part_size(size)
+            if compress:
+                # slices are compressed in parallel with each other
+                chunks = _read_chunks(file_path, offset, size, COMPRESS_CHUNK_SIZE)
+                parts = _join_chunks(self.__iter_gzip_members(chunks, 1), part_size)
+            else:
+                parts = (_read_part(file_path, offset + part_offset, min(part_size, size - part_offset))
+                         for part_offset in range(0, size, part_size))
+            with self._measure(FILE_TRANSFER, phase='upload_slice', slice=index, **file_fields) as fields:
+                # slices are uploaded in parallel, their parts one by one to bound the parts in memory
+                self.__put_parts(self.__get_slice_resource(file_resource, slice_name), _count_bytes(parts, fields),
+                                 is_encrypted, max_workers=1)
+            slice_sizes[index] = fields['bytes']
+            return self.__get_slice_url(file_resource, slice_name)
+
+        with self._measure(FILE_TRANSFER, phase='upload', **file_fields) as fields:
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                urls = list(executor.map(with_context(upload_slice), itertools.count(), slices))
+            manifest = {'entries': [{'url': url, 'mandatory': True} for url in urls]}
+            self.__put_parts(self.__get_slice_resource(file_resource, 'manifest'),
+                             [json.dumps(manifest).encode('utf-8')], is_encrypted)
+            fields['bytes'] = sum(slice_sizes)
+
+    @staticmethod
+    def __get_slice_resource(file_resource, slice_name):
+        slice_resource = copy.deepcopy(file_resource)
+        if file_resource['provider'] == 'azure':
+            slice_resource['absUploadParams']['blobName'] += slice_name
+        elif file_resource['provider'] == 'aws':
+            slice_resource['uploadParams']['key'] += slice_name
+        elif file_resource['provider'] == 'gcp':
+            slice_resource['gcsUploadParams']['key'] += slice_name
+        return slice_resource
+
+    @staticmethod
+    def __get_slice_url(file_resource, slice_name):
+        if file_resource['provider'] == 'azure':
+            upload_params = file_resource['absUploadParams']
+            return 'azure://{}.blob.core.windows.net/{}/{}{}'.format(
+                upload_params['accountName'], upload_params['container'], upload_params['blobName'], slice_name)
+        if file_resource['provider'] == 'aws':
+            upload_params = file_resource['uploadParams']
+            return 's3://{}/{}{}'.format(upload_params['bucket'], upload_params['key'], slice_name)
+        if file_resource['provider'] == 'gcp':
+            upload_params = file_resource['gcsUploadParams']
+            return 'gs://{}/{}{}'.format(upload_params['bucket'], upload_params['key'], slice_name)
+        raise ValueError("Unsupported file provider '{}'.".format(file_resource['provider']))
+
+    def __upload_body(self, file_resource, body, is_encrypted):
+        if file_resource['provider'] == 'azure':
+            self.__upload_to_azure(file_resource, body)
+        elif file_resource['provider'] == 'aws':
+            self.__upload_to_aws(file_resource, body, is_encrypted)
+        elif file_resource['provider'] == 'gcp':
+            self.__upload_to_gcp(file_resource, body)
+
+    def __upload_multipart(self, file_resource, parts, is_encrypted, max_workers=None):
+        if file_resource['provider'] == 'azure':
+            self.__upload_blocks_to_azure(file_resource, parts, max_workers)
+        elif file_resource['provider'] == 'aws':
+            self.__upload_multipart_to_aws(file_resource, parts, is_encrypted, max_workers)
+        elif file_resource['provider'] == 'gcp':
+            self.__upload_resumable_to_gcp(file_resource, parts)
+
+    def _download(self, file_info, local_file):
+        """
+        Download a file from the cloud storage to a local file.
+
+        Args:
+            file_info (dict): Response of ``detail`` with a federation token
+            local_file (str): Local path to the destination file
+        """
+        with self._measure(FILE_TRANSFER, phase='download', **_get_file_fields(file_info)) as fields:
+            self.__download_file(file_info, local_file)
+            fields['bytes'] = os.path.getsize(local_file)
+
+    def __download_file(self, file_info, local_file):
         if file_info['provider'] == 'azure':
             if file_info['isSliced']:
                 self.__download_sliced_file_from_azure(file_info, local_file)
             else:
                 self.__download_file_from_azure(file_info, local_file)
         elif file_info['provider'] == 'aws':
-            s3 = boto3.resource(
-                's3',
-                aws_access_key_id=file_info['credentials']['AccessKeyId'],
-                aws_secret_access_key=file_info['credentials']['SecretAccessKey'],
-                aws_session_token=file_info['credentials']['SessionToken'],
-                region_name=file_info['region']
-            )
+            s3 = self.__get_s3_resource(file_info)
             if file_info['isSliced']:
                 self.__download_sliced_file_from_aws(file_info, local_file, s3)
             else:
@@ -210,71 +800,189 @@ class Files(Endpoint):
                 self.__download_sliced_file_from_gcp(file_info, local_file, storage_client)
             else:
                 self.__download_file_from_gcp(file_info, local_file, storage_client)
-        return local_file
 
-    def __upload_to_azure(self, preparation_result, file_path):
-        blob_client = self.__get_blob_client(
+    def __upload_to_azure(self, preparation_result, body):
+        blob_client = self.__get_upload_blob_client(preparation_result)
+        blob_client.upload_blob(
+            body,
+            blob_type='BlockBlob',
+            content_settings=self.__get_azure_content_settings(preparation_result)
+        )
+
+    def __upload_blocks_to_azure(self, preparation_result, parts, max_workers=None):
+        from azure.storage.blob import BlobBlock
+        blob_client = self.__get_upload_blob_client(preparation_result)
+
+        def upload_block(number, data):
+            # the SDK encodes the ids, which must all have the same length
+            block_id = '{:05d}'.format(number)
+            blob_client.stage_block(block_id, data, length=len(data))
+            return BlobBlock(block_id=block_id)
+
+        blocks = self.__upload_parts(parts, upload_block, max_workers)
+        # blocks left uncommitted after a failure are discarded by Azure
+        blob_client.commit_block_list(
+            blocks, content_settings=self.__get_azure_content_settings(preparation_result)
+        )
+
+    def __get_upload_blob_client(self, preparation_result):
+        return self.__get_blob_client(
             preparation_result['absUploadParams']['absCredentials']['SASConnectionString'],
             preparation_result['absUploadParams']['container'],
             preparation_result['absUploadParams']['blobName']
         )
-        with open(file_path, "rb") as blob_data:
-            blob_client.upload_blob(
-                blob_data,
-                blob_type='BlockBlob',
-                content_settings=ContentSettings(
-                    content_disposition='attachment;filename="%s"' % (preparation_result['name'])
-                )
-            )
 
-    def __upload_to_aws(self, prepare_result, file_path, is_encrypted):
+    @staticmethod
+    def __get_azure_content_settings(preparation_result):
+        from azure.storage.blob import ContentSettings
+        return ContentSettings(
+            content_disposition='attachment;filename="%s"' % (preparation_result['name'])
+        )
+
+    def __upload_to_aws(self, prepare_result, body, is_encrypted):
         upload_params = prepare_result['uploadParams']
-        key_id = upload_params['credentials']['AccessKeyId']
-        key = upload_params['credentials']['SecretAccessKey']
-        token = upload_params['credentials']['SessionToken']
-        s3 = boto3.resource('s3', aws_access_key_id=key_id,
-                            aws_secret_access_key=key,
-                            aws_session_token=token,
-                            region_name=prepare_result['region'])
+        s3 = self.__get_upload_s3_resource(prepare_result)
         s3_object = s3.Object(bucket_name=upload_params['bucket'], key=upload_params['key'])
-        disposition = 'attachment; filename={};'.format(prepare_result['name'])
-        with open(file_path, mode='rb') as file:
-            if is_encrypted:
-                encryption = upload_params['x-amz-server-side-encryption']
-                s3_object.put(ACL=upload_params['acl'], Body=file,
-                              ContentDisposition=disposition, ServerSideEncryption=encryption)
-            else:
-                s3_object.put(ACL=upload_params['acl'], Body=file,
-                              ContentDisposition=disposition)
+        s3_object.put(Body=body, **self.__get_aws_upload_args(prepare_result, is_encrypted))
+
+    def __upload_multipart_to_aws(self, prepare_result, parts, is_encrypted, max_workers=None):
+        upload_params = prepare_result['uploadParams']
+        bucket = upload_params['bucket']
+        key = upload_params['key']
+        # resources are not thread safe, the low-level client is
+        s3_client = self.__get_upload_s3_resource(prepare_result).meta.client
+        upload_id = s3_client.create_multipart_upload(
+            Bucket=bucket, Key=key, **self.__get_aws_upload_args(prepare_result, is_encrypted)
+        )['UploadId']
+
+        def upload_part(number, data):
+            response = s3_client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                             PartNumber=number, Body=data)
+            return {'PartNumber': number, 'ETag': response['ETag']}
 
-    def __upload_to_gcp(self, preparation_result, file_path):
+        try:
+            uploaded_parts = self.__upload_parts(parts, upload_part, max_workers)
+            s3_client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                                MultipartUpload={'Parts': uploaded_parts})
+        except BaseException:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            raise
+
+    def __get_upload_s3_resource(self, prepare_result):
+        import boto3
+        upload_params = prepare_result['uploadParams']
+        return boto3.resource('s3', aws_access_key_id=upload_params['credentials']['AccessKeyId'],
+                              aws_secret_access_key=upload_params['credentials']['SecretAccessKey'],
+                              aws_session_token=upload_params['credentials']['SessionToken'],
+                              region_name=prepare_result['region'])
+
+    @staticmethod
+    def __get_aws_upload_args(prepare_result, is_encrypted):
+        upload_params = prepare_result['uploadParams']
+        upload_args = {
+            'ACL': upload_params['acl'],
+            'ContentDisposition': 'attachment; filename={};'.format(prepare_result['name'])
+        }
+        if is_encrypted:
+            upload_args['ServerSideEncryption'] = upload_params['x-amz-server-side-encryption']
+        return upload_args
+
+    def __upload_to_gcp(self, preparation_result, body):
+        self.__get_upload_gcp_blob(preparation_result).upload_from_file(body)
+
+    def __upload_file_to_gcp(self, preparation_result, file_path, size):
+        from google.cloud.storage import transfer_manager
+        # XML API multipart upload, each part is retried by the library
+        transfer_manager.upload_chunks_concurrently(
+            file_path, self.__get_upload_gcp_blob(preparation_result),
+            chunk_size=self.__get_part_size(size),
+            worker_type=transfer_manager.THREAD, max_workers=max(1, self.max_workers)
+        )
+
+    def __upload_resumable_to_gcp(self, preparation_result, parts):
+        # a resumable upload of unknown size, each chunk is retried by the library
+        blob = self.__get_upload_gcp_blob(preparation_result)
+        blob.chunk_size = -(-self.upload_part_size // GCP_CHUNK_SIZE_UNIT) * GCP_CHUNK_SIZE_UNIT
+        blob.upload_from_file(io.BufferedReader(_ChunksReader(parts), buffer_size=COPY_CHUNK_SIZE))
+
+    def __get_upload_gcp_blob(self, preparation_result):
         storage_client = self.__get_gcp_client(
             preparation_result['gcsUploadParams']['access_token'],
             preparation_result['gcsUploadParams']['projectId']
         )
-
         bucket = storage_client.bucket(preparation_result['gcsUploadParams']['bucket'])
-        blob = bucket.blob(preparation_result['gcsUploadParams']['key'])
+        return bucket.blob(preparation_result['gcsUploadParams']['key'])
+
+    def __get_part_size(self, size):
+        return max(self.upload_part_size, -(-size // MAX_UPLOAD_PARTS))
+
+    def __upload_parts(self, parts, upload_part, max_workers=None):
+        """
+        Upload parts concurrently, retrying each part on its own.
+
+        Args:
+            parts (iterable): Data of the parts, produced as the uploads
+                progress so that only the parts being uploaded are in memory.
+            upload_part (callable): Uploads the data of a part, numbered from
+                one, and returns its reference for completing the upload.
+            max_workers (int): Number of parts uploaded at once,
+                ``self.max_workers`` by default. With one, the parts are
+                uploaded in the calling thread and only one is in memory.
 
-        with open(file_path, "rb") as blob_data:
-            blob.upload_from_file(blob_data)
+        Returns:
+            parts (list): References of the uploaded parts in order.
+        """
+        max_workers = max(1, self.max_workers if max_workers is None else max_workers)
+
+        def upload(number, data):
+            delay = None
+            for retry_count in range(self.max_part_retries):
+                try:
+                    return upload_part(number, data)
+                except Exception:
+                    if retry_count >= self.max_part_retries - 1:
+                        raise
+                    delay = _get_jittered_backoff(delay)
+                    time.sleep(delay)
+
+        if max_workers == 1:
+            return [upload(number, data) for number, data in enumerate(parts, start=1)]
+        futures = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                parts = iter(parts)
+                for number in itertools.count(1):
+                    # read the next part only once a worker is free for it
+                    running = [future for future in futures if not future.done()]
+                    if len(running) >= max_workers:
+                        wait(running, return_when=FIRST_COMPLETED)
+                    # stop reading parts once any part has failed
+                    for future in futures:
+                        if future.done():
+                            future.result()
+                    data = next(parts, None)
+                    if data is None:
+                        break
+                    futures.append(executor.submit(upload, number, data))
+                return [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
 
     def __download_file_from_aws(self, file_info, destination, s3):
         bucket = s3.Bucket(file_info["s3Path"]["bucket"])
         bucket.download_file(file_info["s3Path"]["key"], destination)
 
     def __download_sliced_file_from_aws(self, file_info, destination, s3):
-        manifest = requests.get(url=file_info['url']).json()
-        file_names = []
-        for entry in manifest["entries"]:
-            full_path = entry["url"]
-            file_name = full_path.rsplit("/", 1)[1]
-            file_names.append(file_name)
-            splitted_path = full_path.split("/")
-            file_key = "/".join(splitted_path[3:])
-            bucket = s3.Bucket(file_info['s3Path']['bucket'])
-            bucket.download_file(file_key, file_name)
-        self.__merge_split_files(file_names, destination)
+        # resources are not thread safe, the low-level client is
+        s3_client = s3.meta.client
+        bucket = file_info['s3Path']['bucket']
+
+        def download_slice(file_key, slice_path):
+            s3_client.download_file(bucket, file_key, slice_path)
+
+        self.__download_slices(file_info, self.__get_slice_keys(file_info), destination, download_slice)
 
     def __download_file_from_azure(self, file_info, destination):
         blob_client = self.__get_blob_client(
@@ -283,29 +991,17 @@ class Files(Endpoint):
             file_info['absPath']['name']
         )
         with open(destination, "wb") as downloaded_blob:
-            download_stream = blob_client.download_blob()
-            downloaded_blob.write(download_stream.readall())
+            blob_client.download_blob().readinto(downloaded_blob)
 
     def __download_sliced_file_from_azure(self, file_info, destination):
-        blob_service_client = BlobServiceClient.from_connection_string(
-            file_info['absCredentials']['SASConnectionString']
-        )
-        container_client = blob_service_client.get_container_client(
-            container=file_info['absPath']['container']
-        )
-        manifest_stream = container_client.download_blob(
-            file_info['absPath']['name'] + 'manifest'
-        )
-        manifest = json.loads(manifest_stream.readall())
-        file_names = []
-        for entry in manifest['entries']:
-            blob_path = entry['url'].split('blob.core.windows.net/%s/' % (file_info['absPath']['container']))[1]
-            full_path = entry["url"]
-            file_name = full_path.rsplit("/", 1)[1]
-            file_names.append(file_name)
-            with open(file_name, "wb") as file_slice:
-                file_slice.write(container_client.download_blob(blob_path).readall())
-        self.__merge_split_files(file_names, destination)
+        container_client = self.__get_azure_container_client(file_info)
+        blob_paths = self.__get_azure_slice_keys(file_info, container_client)
+
+        def download_slice(blob_path, slice_path):
+            with open(slice_path, "wb") as file_slice:
+                container_client.download_blob(blob_path).readinto(file_slice)
+
+        self.__download_slices(file_info, blob_paths, destination, download_slice)
 
     def __download_file_from_gcp(self, file_info, destination, storage_client):
 
@@ -314,36 +1010,100 @@ class Files(Endpoint):
         blob.download_to_filename(destination)
 
     def __download_sliced_file_from_gcp(self, file_info, destination, storage_client):
-        manifest = requests.get(url=file_info['url']).json()
-        file_names = []
-        for entry in manifest["entries"]:
-            full_path = entry["url"]
-            file_name = full_path.rsplit("/", 1)[1]
-            file_names.append(file_name)
-            splitted_path = full_path.split("/")
-            file_key = "/".join(splitted_path[3:])
-            bucket = storage_client.bucket(file_info['gcsPath']['bucket'])
+        bucket = storage_client.bucket(file_info['gcsPath']['bucket'])
 
-            blob = bucket.blob(file_key)
+        def download_slice(file_key, slice_path):
+            bucket.blob(file_key).download_to_filename(slice_path)
 
-            with open(file_name, "wb") as file_slice:
-                file_slice.write(blob.download_as_bytes())
+        self.__download_slices(file_info, self.__get_slice_keys(file_info), destination, download_slice)
 
-        self.__merge_split_files(file_names, destination)
+    def __download_slices(self, file_info, keys, destination, download_slice):
+        """
+        Download the slices of a sliced file concurrently, each streamed to
+        its own file next to the destination, and merge them.
+
+        Args:
+            file_info (dict): Response of ``detail`` with a federation token
+            keys (list): Storage keys of the slices.
+            destination (str): Local path to the merged file.
+            download_slice (callable): Downloads a slice key to a local path.
+        """
+        slice_paths = ['{}.slice{}'.format(destination, index) for index in range(len(keys))]
+        file_fields = _get_file_fields(file_info)
+
+        def download_measured_slice(index, key, slice_path):
+            with self._measure(FILE_TRANSFER, phase='download_slice', slice=index, **file_fields) as fields:
+                download_slice(key, slice_path)
+                fields['bytes'] = os.path.getsize(slice_path)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                # consume the results to surface the first failed slice
+                list(executor.map(with_context(download_measured_slice), itertools.count(), keys, slice_paths))
+        except BaseException:
+            for slice_path in slice_paths:
+                if os.path.exists(slice_path):
+                    os.remove(slice_path)
+            raise
+        with self._measure(FILE_TRANSFER, phase='merge', **file_fields) as fields:
+            self.__merge_split_files(slice_paths, destination)
+            fields['bytes'] = os.path.getsize(destination)
 
     def __merge_split_files(self, file_names, destination):
-        with open(destination, mode='wb') as out_file:
+        if len(file_names) == 1:
+            os.replace(file_names[0], destination)
+            return
+        # slices are removed as soon as they are appended, so the merge needs
+        # only the size of the largest slice on top of the downloaded data
+        with open(destination, mode='wb', buffering=0) as out_file:
             for file_name in file_names:
-                with open(file_name, mode='rb') as in_file:
-                    for line in in_file:
-                        out_file.write(line)
+                with open(file_name, mode='rb', buffering=0) as in_file:
+                    _append_file(in_file.fileno(), out_file.fileno())
                 os.remove(file_name)
 
+    def __get_azure_container_client(self, file_info):
+        return self.__get_blob_service_client(
+            file_info['absCredentials']['SASConnectionString']
+        ).get_container_client(container=file_info['absPath']['container'])
+
+    @staticmethod
+    def __get_azure_slice_keys(file_info, container_client):
+        """
+        Get the blob names of the slices of a sliced file on Azure from its
+        manifest, which lists their URLs.
+        """
+        manifest_stream = container_client.download_blob(file_info['absPath']['name'] + 'manifest')
+        manifest = json.loads(manifest_stream.readall())
+        return [entry['url'].split('blob.core.windows.net/%s/' % (file_info['absPath']['container']))[1]
+                for entry in manifest['entries']]
+
+    def __get_slice_keys(self, file_info):
+        manifest = requests.get(url=file_info['url']).json()
+        return ["/".join(entry["url"].split("/")[3:]) for entry in manifest["entries"]]
+
+    def __get_s3_resource(self, file_info):
+        import boto3
+        return boto3.resource(
+            's3',
+            aws_access_key_id=file_info['credentials']['AccessKeyId'],
+            aws_secret_access_key=file_info['credentials']['SecretAccessKey'],
+            aws_session_token=file_info['credentials']['SessionToken'],
+            region_name=file_info['region']
+        )
+
     def __get_blob_client(self, connection_string, container, blob_name):
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+        blob_service_client = self.__get_blob_service_client(connection_string)
         return blob_service_client.get_blob_client(container=container, blob=blob_name)
 
+    @staticmethod
+    def __get_blob_service_client(connection_string):
+        # the provider SDKs are imported only when a file of the provider is used
+        from azure.storage.blob import BlobServiceClient
+        return BlobServiceClient.from_connection_string(connection_string)
+
     def __get_gcp_client(self, token, project):
+        from google.cloud import storage as GCPStorage
+        from google.oauth2 import credentials
         creds = credentials.Credentials(token=token)
         gcp_storage_client = GCPStorage.Client(credentials=creds, project=project)
         return gcp_storage_client
@@ -7,8 +7,19 @@ Full documentation `here`.
     http://docs.keboola.apiary.io/#reference/jobs/
 """
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from kbcstorage.base import Endpoint
+from kbcstorage.base import Endpoint, with_context
+from kbcstorage.events import JOB_WAIT
+
+COMPLETED_STATUSES = ('error', 'success')
+POLL_INTERVAL_MIN = 1
+POLL_INTERVAL_MAX = 20
+MAX_CONCURRENT_REQUESTS_DEFAULT = 10
+
+
+def _get_poll_interval(attempt):
+    return min(POLL_INTERVAL_MIN * (2 ** attempt), POLL_INTERVAL_MAX)
 
 
 class Jobs(Endpoint):
@@ -33,15 +44,16 @@ class Jobs(Endpoint):
         The job is done with an error.
     """
 
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None):
         """
         Create a Jobs endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
-        super().__init__(root_url, 'jobs', token)
+        super().__init__(root_url, 'jobs', token, transport=transport)
 
     def list(self):
         """
@@ -112,12 +124,14 @@ class Jobs(Endpoint):
             requests.HTTPError: If any API request fails.
         """
         retries = 1
-        while True:
-            job = self.detail(job_id)
-            if job['status'] in ('error', 'success'):
-                return job
-            retries += 1
-            time.sleep(min(2 ** retries, 20))
+        with self._measure(JOB_WAIT, job_id=job_id) as fields:
+            while True:
+                job = self.detail(job_id)
+                if job['status'] in ('error', 'success'):
+                    fields.update(status=job['status'], polls=retries, job=job)
+                    return job
+                retries += 1
+                time.sleep(min(2 ** retries, 20))
 
     def block_for_success(self, job_id):
         """
@@ -135,3 +149,109 @@ class Jobs(Endpoint):
         """
         job = self.block_until_completed(job_id)
         return job['status'] == 'success'
+
+    def as_completed(self, job_ids, timeout=None,
+                     max_concurrent_requests=MAX_CONCURRENT_REQUESTS_DEFAULT):
+        """
+        Poll many jobs in a single loop and yield each job as it completes.
+
+        Jobs are polled round-robin, each on its own backoff interval which
+        is reset whenever the job changes its status.
+
+        Args:
+            job_ids (list): The ids of the jobs.
+            timeout (float): Overall deadline in seconds, no deadline by
+                default.
+            max_concurrent_requests (int): Maximum number of job status
+                requests in flight at once.
+
+        Yields:
+            response_body: The parsed json from the HTTP response
+                containing a completed storage Job.
+
+        Raises:
+            requests.HTTPError: If any API request fails.
+            TimeoutError: If the jobs do not complete before the deadline.
+        """
+        for _, job in self._iter_completed(job_ids, timeout, max_concurrent_requests):
+            yield job
+
+    def wait_all(self, job_ids, timeout=None,
+                 max_concurrent_requests=MAX_CONCURRENT_REQUESTS_DEFAULT):
+        """
+        Poll the API until all the jobs are completed.
+
+        Args:
+            job_ids (list): The ids of the jobs.
+            timeout (float): Overall deadline in seconds, no deadline by
+                default.
+            max_concurrent_requests (int): Maximum number of job status
+                requests in flight at once.
+
+        Returns:
+            jobs (list): The completed storage Jobs in the order of
+                ``job_ids``.
+
+        Raises:
+            requests.HTTPError: If any API request fails.
+            TimeoutError: If the jobs do not complete before the deadline.
+        """
+        job_ids = list(job_ids)
+        completed = dict(self._iter_completed(job_ids, timeout, max_concurrent_requests))
+        return [completed[job_id] for job_id in job_ids]
+
+    def wait_any(self, job_ids, timeout=None,
+                 max_concurrent_requests=MAX_CONCURRENT_REQUESTS_DEFAULT):
+        """
+        Poll the API until any of the jobs is completed.
+
+        Args:
+            job_ids (list): The ids of the jobs.
+            timeout (float): Overall deadline in seconds, no deadline by
+                default.
+            max_concurrent_requests (int): Maximum number of job status
+                requests in flight at once.
+
+        Returns:
+            response_body: The parsed json from the HTTP response
+                containing the first completed storage Job.
+
+        Raises:
+            requests.HTTPError: If any API request fails.
+            TimeoutError: If no job completes before the deadline.
+        """
+        completed = self._iter_completed(job_ids, timeout, max_concurrent_requests)
+        try:
+            return next(completed)[1]
+        finally:
+            completed.close()
+
+    def _iter_completed(self, job_ids, timeout, max_concurrent_requests):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # job id -> [next poll time, attempt, last seen status]
+        pending = {job_id: [0, 0, None] for job_id in job_ids}
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrent_requests)) as executor:
+            while pending:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    raise TimeoutError("Jobs {} did not complete in {} seconds.".format(
+                        ', '.join(str(job_id) for job_id in pending), timeout))
+                due = sorted((job_id for job_id, state in pending.items() if state[0] <= now),
+                             key=lambda job_id: pending[job_id][0])
+                if not due:
+                    wake_up = min(state[0] for state in pending.values())
+                    if deadline is not None:
+                        wake_up = min(wake_up, deadline)
+                    time.sleep(max(wake_up - now, 0))
+                    continue
+                for job_id, job in zip(due, executor.map(with_context(self.detail), due)):
+                    if job['status'] in COMPLETED_STATUSES:
+                        del pending[job_id]
+                        yield job_id, job
+                        continue
+                    state = pending[job_id]
+                    if job['status'] != state[2]:
+                        state[1] = 0
+                    state[0] = time.monotonic() + _get_poll_interval(state[1])
+                    state[1] += 1
+                    state[2] = job['status']
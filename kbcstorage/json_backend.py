@@ -0,0 +1,117 @@
+"""
+JSON decoding of API responses.
+
+Responses are decoded with orjson when it is installed and with the standard
+library otherwise; :func:`set_loads` plugs in any other decoder. Long listings
+can be parsed incrementally with :func:`iter_array`, which yields the items of
+a JSON array while its bytes are still being downloaded.
+"""
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+def _get_default_loads():
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+_loads = _get_default_loads()
+
+
+def loads(data):
+    """
+    Decode a JSON document with the configured backend.
+
+    Args:
+        data (bytes or str): UTF-8 encoded JSON.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+    """
+    return _loads(data)
+
+
+def set_loads(func=None):
+    """
+    Set the function decoding JSON documents, such as ``orjson.loads``.
+    None restores the default.
+    """
+    global _loads
+    _loads = func if func is not None else _get_default_loads()
+
+
+def iter_array(chunks):
+    """
+    Yield the items of a JSON array from chunks of its UTF-8 encoded bytes,
+    holding only the unparsed part of the array in memory.
+
+    Args:
+        chunks (iterable): Bytes of the JSON document.
+
+    Raises:
+        ValueError: If the document is not a valid JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = None
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        position, done = yield from _drain(decoder, buffer, position, final=False)
+        if done:
+            return
+        if position is not None:
+            buffer = buffer[position:]
+            position = 0
+    buffer += text_decoder.decode(b'', final=True)
+    yield from _drain(decoder, buffer, position, final=True)
+
+
+def _drain(decoder, buffer, position, final):
+    """
+    Yield the complete items of ``buffer`` from ``position``, None before
+    the opening bracket.
+
+    Returns:
+        state (tuple): Position of the first unparsed character and whether
+            the array was closed.
+    """
+    while True:
+        start = position if position is not None else 0
+        while start < len(buffer) and buffer[start] in _WHITESPACE:
+            start += 1
+        if start == len(buffer):
+            if final:
+                raise ValueError('Truncated JSON array.')
+            return start if position is not None else None, False
+        if position is None:
+            if buffer[start] != '[':
+                raise ValueError('Expected a JSON array.')
+            position = start + 1
+            continue
+        if buffer[start] == ']':
+            return start + 1, True
+        if buffer[start] == ',':
+            position = start + 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, start)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return start, False
+        following = end
+        while following < len(buffer) and buffer[following] in _WHITESPACE:
+            following += 1
+        if following == len(buffer) or buffer[following] not in ',]':
+            if final:
+                raise ValueError('Expected , or ] after an item of a JSON array.')
+            # a number may continue in the next chunk
+            return start, False
+        yield item
+        position = end
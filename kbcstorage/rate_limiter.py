@@ -0,0 +1,136 @@
+"""
+Client side rate limiting of Storage API requests.
+
+Requests are limited by token buckets whose rates adapt to throttling by the
+API: a rate grows additively while requests succeed and is cut
+multiplicatively when the API responds with 429 or 503 (AIMD). Each group of
+endpoints, such as job polling or file preparation, has its own bucket, and a
+transport shares them between all threads and endpoints using it.
+"""
+import threading
+import time
+from urllib.parse import urlparse
+
+# initial requests per second of the groups of endpoints
+RATE_LIMITS_DEFAULT = {
+    'jobs': 10.0,
+    'files': 10.0,
+    'list': 30.0,
+    'write': 20.0,
+}
+MIN_RATE_DEFAULT = 0.5
+RATE_INCREASE_DEFAULT = 1.0
+RATE_DECREASE_DEFAULT = 0.5
+THROTTLE_COOLDOWN_DEFAULT = 1.0
+
+
+def get_endpoint_group(method, url):
+    """
+    Get the group of endpoints a request belongs to.
+
+    Returns:
+        group (str): 'jobs' for job polling, 'files' for file preparation,
+            'list' for other reads and 'write' for other requests.
+    """
+    path = urlparse(url).path.rstrip('/')
+    if '/v2/storage/jobs' in path:
+        return 'jobs'
+    if path.endswith('/files/prepare'):
+        return 'files'
+    if method.upper() in ('GET', 'HEAD'):
+        return 'list'
+    return 'write'
+
+
+class RateLimiter:
+    """
+    Token bucket with a rate adapting to throttling. Safe to share between
+    threads.
+    """
+    def __init__(self, rate, burst=None, min_rate=MIN_RATE_DEFAULT, max_rate=None,
+                 increase=RATE_INCREASE_DEFAULT, decrease=RATE_DECREASE_DEFAULT,
+                 cooldown=THROTTLE_COOLDOWN_DEFAULT):
+        """
+        Args:
+            rate (float): Initial requests per second.
+            burst (int): Requests allowed at once after a quiet period, the
+                initial rate by default.
+            min_rate (float): The rate is never cut below this.
+            max_rate (float): The rate never grows above this, ten times the
+                initial rate by default.
+            increase (float): Growth of the rate per second of successful
+                requests at the full rate.
+            decrease (float): Factor cutting the rate on throttling.
+            cooldown (float): Seconds after a cut in which further throttled
+                responses, of requests sent before the cut, are ignored.
+        """
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1.0, self.rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else self.rate * 10
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._last_cut = None
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Reserve a request.
+
+        Returns:
+            delay (float): Seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # a negative balance queues the requests behind each other
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def record(self, throttled):
+        """
+        Adapt the rate to the outcome of a request.
+
+        Args:
+            throttled (bool): The API throttled the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if throttled:
+                if self._last_cut is not None and now - self._last_cut < self.cooldown:
+                    return
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_cut = now
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+
+class RateLimits:
+    """
+    Rate limiters of the groups of endpoints of a transport.
+    """
+    def __init__(self, limiters=None, get_group=get_endpoint_group):
+        """
+        Args:
+            limiters (dict): :obj:`RateLimiter` for each group of endpoints,
+                groups missing are not limited. Limiters with the rates of
+                ``RATE_LIMITS_DEFAULT`` by default.
+            get_group (callable): Gets the group of a request from its method
+                and url.
+        """
+        if limiters is None:
+            limiters = {group: RateLimiter(rate) for group, rate in RATE_LIMITS_DEFAULT.items()}
+        self.limiters = limiters
+        self.get_group = get_group
+
+    def get(self, method, url):
+        """
+        Get the limiter of a request, None if the request is not limited.
+        """
+        return self.limiters.get(self.get_group(method, url))
@@ -1,35 +1,420 @@
+import email.utils
+import random
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from kbcstorage.circuit_breaker import OPEN, is_failure
+from kbcstorage.events import REQUEST_END, REQUEST_START, RETRY, get_content_length
+from kbcstorage.single_flight import SingleFlight
 
 MAX_RETRIES_DEFAULT = 11
 BACKOFF_FACTOR = 1.0
+BACKOFF_MAX_DEFAULT = 30.0
+POOL_CONNECTIONS_DEFAULT = 10
+POOL_MAXSIZE_DEFAULT = 10
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+# responses to requests which the server refused to process
+REFUSED_STATUSES = frozenset([429, 503])
+RETRY_BUDGET_RATIO_DEFAULT = 0.2
+RETRY_BUDGET_MIN_PER_SECOND_DEFAULT = 1.0
+RETRY_BUDGET_MAX_DEFAULT = 20.0
+
+
+def _get_jittered_backoff(previous_delay=None, base=BACKOFF_FACTOR, cap=BACKOFF_MAX_DEFAULT):
+    """
+    Get the delay before the next retry with decorrelated jitter, which
+    spreads the retries of many clients failing at once.
+
+    Args:
+        previous_delay (float): The previous delay, None before the first
+            retry.
+        base (float): The minimal delay.
+        cap (float): The maximal delay.
+    """
+    if previous_delay is None:
+        previous_delay = base
+    return min(cap, random.uniform(base, max(base, previous_delay * 3)))
+
+
+def _parse_retry_after(value):
+    """
+    Parse a Retry-After header, either seconds or an HTTP date, into the
+    number of seconds to wait. None if missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def create_session(pool_connections=POOL_CONNECTIONS_DEFAULT, pool_maxsize=POOL_MAXSIZE_DEFAULT):
+    """
+    Create a keep-alive HTTP session with a connection pool.
+
+    Args:
+        pool_connections (int): Number of hosts to keep connection pools for.
+        pool_maxsize (int): Maximum number of connections kept open per host.
+
+    Returns:
+        session (requests.Session): The configured session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class RetryBudget:
+    """
+    Limit of the retries of all requests of a client.
+
+    Every request adds ``ratio`` of a retry to the budget and every retry
+    takes one, so that retries add at most that ratio of load to a failing
+    API. A reserve of ``min_per_second`` retries a second keeps retries of
+    infrequent requests possible.
+
+    The delays before the retries may also be limited to ``max_seconds`` in
+    total, refilled by a second every second, so that the requests of a
+    client do not spend more time waiting to be retried than that on top of
+    the time passing.
+    """
+    def __init__(self, ratio=RETRY_BUDGET_RATIO_DEFAULT,
+                 min_per_second=RETRY_BUDGET_MIN_PER_SECOND_DEFAULT,
+                 max_balance=RETRY_BUDGET_MAX_DEFAULT, max_seconds=None):
+        """
+        Args:
+            ratio (float): Retries allowed per request.
+            min_per_second (float): Retries allowed per second regardless of
+                the number of requests.
+            max_balance (float): Maximum number of retries saved up.
+            max_seconds (float): Maximum number of seconds of delays before
+                retries saved up, not limited by default.
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self.max_seconds = max_seconds
+        self._balance = max_balance
+        self._seconds = max_seconds
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._balance = min(self.max_balance, self._balance + elapsed * self.min_per_second)
+        if self.max_seconds is not None:
+            self._seconds = min(self.max_seconds, self._seconds + elapsed)
+        self._updated = now
+
+    def deposit(self):
+        """
+        Record a request.
+        """
+        with self._lock:
+            self._refill()
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def withdraw(self, delay=0.0):
+        """
+        Take a retry from the budget.
+
+        Args:
+            delay (float): Seconds to wait before the retry.
+
+        Returns:
+            allowed (bool): False if the budget is exhausted.
+        """
+        with self._lock:
+            self._refill()
+            if self._balance < 1:
+                return False
+            if self.max_seconds is not None:
+                if self._seconds < delay:
+                    return False
+                self._seconds -= delay
+            self._balance -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Decides whether and when failed requests are retried.
 
+    Requests are retried on server errors except 501, on 429 and on
+    connection errors. Requests with methods which are not idempotent, such
+    as POST creating jobs, are retried only when the server surely did not
+    process them: on 429, 503 and failures to connect. The delays honor the
+    Retry-After header and otherwise use decorrelated jitter.
+    """
+    def __init__(self, max_attempts=MAX_RETRIES_DEFAULT, backoff_base=BACKOFF_FACTOR,
+                 backoff_max=BACKOFF_MAX_DEFAULT, timeout=None, budget=None,
+                 idempotent_methods=IDEMPOTENT_METHODS):
+        """
+        Args:
+            max_attempts (int): Maximum number of attempts of a request.
+            backoff_base (float): Minimal delay between attempts in seconds.
+            backoff_max (float): Maximal delay between attempts in seconds,
+                longer Retry-After delays are not waited for.
+            timeout (float): Time budget of all attempts of a request in
+                seconds, no retry is started that would exceed it.
+            budget (:obj:`RetryBudget`): Budget of retries shared by all
+                requests using the policy.
+            idempotent_methods (frozenset): Methods safe to repeat after the
+                server may have processed the request.
+        """
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.budget = budget
+        self.idempotent_methods = idempotent_methods
 
-def _get_backoff_time(retry_count):
-    return BACKOFF_FACTOR * (2 ** retry_count)
+    def is_retryable(self, method, status_code=None, sent=True):
+        """
+        Decide whether a failed attempt may be retried.
+
+        Args:
+            method (str): HTTP method of the request.
+            status_code (int): Status of the response, None if the request
+                failed with an error.
+            sent (bool): False if the request surely did not reach the server.
+        """
+        if status_code is None:
+            return not sent or method.upper() in self.idempotent_methods
+        if status_code in REFUSED_STATUSES:
+            return True
+        if status_code < 500 or status_code == 501:
+            return False
+        return method.upper() in self.idempotent_methods
+
+    def get_delay(self, previous_delay=None, retry_after=None):
+        """
+        Get the delay before the next attempt.
+
+        Args:
+            previous_delay (float): The previous delay of the request.
+            retry_after (str): Retry-After header of the response.
+
+        Returns:
+            delay (float): Seconds to wait, None if the server asks to wait
+                longer than ``backoff_max``.
+        """
+        requested = _parse_retry_after(retry_after)
+        if requested is not None:
+            return requested if requested <= self.backoff_max else None
+        return _get_jittered_backoff(previous_delay, self.backoff_base, self.backoff_max)
+
+    def start(self, method):
+        """
+        Start tracking the attempts of a request.
+        """
+        if self.budget is not None:
+            self.budget.deposit()
+        return _RetryState(self, method)
+
+
+class _RetryState:
+    """
+    Attempts of a single request.
+    """
+    def __init__(self, policy, method):
+        self.policy = policy
+        self.method = method
+        self.attempts = 0
+        self.delay = None
+        self.deadline = None if policy.timeout is None else time.monotonic() + policy.timeout
+
+    def next_delay(self, status_code=None, retry_after=None, sent=True):
+        """
+        Record a failed attempt and get the delay before the next one.
+
+        Returns:
+            delay (float): Seconds to wait, None if the request is not to be
+                retried.
+        """
+        self.attempts += 1
+        if self.attempts >= self.policy.max_attempts:
+            return None
+        if not self.policy.is_retryable(self.method, status_code, sent):
+            return None
+        delay = self.policy.get_delay(self.delay, retry_after)
+        if delay is None:
+            return None
+        if self.deadline is not None and time.monotonic() + delay > self.deadline:
+            return None
+        if self.policy.budget is not None and not self.policy.budget.withdraw(delay):
+            return None
+        self.delay = delay
+        return delay
+
+
+def _is_open(breaker):
+    """
+    Tell whether the circuit opened, e.g. by failures of other requests, so
+    that a request in progress is not to be retried.
+    """
+    return breaker is not None and breaker.state == OPEN
+
+
+def _is_sent(error):
+    """
+    Tell whether a request failing with an error may have reached the server.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return not isinstance(reason, NewConnectionError)
 
 
 class RetryRequests:
-    def __init__(self, max_requests_retries=MAX_RETRIES_DEFAULT) -> None:
-        self.max_retries = max_requests_retries
-
-    def _retry_request(self, request_func, url, *args, **kwargs):
-        response = request_func(url, *args, **kwargs)
-        for retry_count in range(self.max_retries - 1):
-            if response.status_code == 501 or response.status_code < 500:
-                return response
-            time.sleep(_get_backoff_time(retry_count))
-            response = request_func(url, **kwargs)
+    def __init__(self, max_requests_retries=MAX_RETRIES_DEFAULT, session=None, retry_policy=None,
+                 rate_limits=None, circuit_breaker=None,
+                 cache=None, events=None, tracing=None) -> None:
+        """
+        Args:
+            max_requests_retries (int): Maximum number of attempts of a
+                request, used only when ``retry_policy`` is not given.
+            session (requests.Session): Session sending the requests.
+            retry_policy (:obj:`RetryPolicy`): Policy of retrying failed
+                requests.
+            rate_limits (:obj:`RateLimits`): Rate limits of the requests,
+                not limited by default.
+            circuit_breaker (:obj:`CircuitBreaker`): Circuit breaker failing
+                requests fast while the API is down, none by default.
+            cache (:obj:`ResponseCache`): Cache of responses of the endpoints
+                using the transport, none by default.
+            events (:obj:`Events`): Subscribers of the events of the requests
+                and transfers of the endpoints using the transport, none by
+                default.
+            tracing (:obj:`Tracing`): OpenTelemetry tracing of the requests
+                and operations of the endpoints using the transport, none by
+                default.
+
+        Identical GET requests of the endpoints using the transport which
+        are in flight at once are coalesced by ``single_flight``, set it to
+        None to send each of them.
+        """
+        if retry_policy is None:
+            retry_policy = RetryPolicy(max_attempts=max_requests_retries, budget=RetryBudget())
+        self.retry_policy = retry_policy
+        self.rate_limits = rate_limits
+        self.circuit_breaker = circuit_breaker
+        self.cache = cache
+        self.events = events
+        self.tracing = tracing
+        self.single_flight = SingleFlight()
+        self.session = session if session is not None else create_session()
+
+    @property
+    def max_retries(self):
+        return self.retry_policy.max_attempts
+
+    def _retry_request(self, method, request_func, url, *args, **kwargs):
+        tracing = self.tracing
+        if tracing is None:
+            return self._observe_request(method, request_func, url, *args, **kwargs)
+        with tracing.request(method, url, kwargs) as span:
+            response = self._observe_request(method, request_func, url, *args, **kwargs)
+            tracing.record_response(span, response.status_code)
+            return response
+
+    def _observe_request(self, method, request_func, url, *args, **kwargs):
+        events = self.events
+        if events is None or not events.enabled:
+            return self._send(method, request_func, url, None, *args, **kwargs)
+        stats = {'retries': 0, 'backoff_seconds': 0.0, 'throttled_seconds': 0.0}
+        events.emit(REQUEST_START, method=method, url=url)
+        start = time.perf_counter()
+        try:
+            response = self._send(method, request_func, url, stats, *args, **kwargs)
+        except BaseException as e:
+            events.emit(REQUEST_END, method=method, url=url, status_code=None, error=type(e).__name__,
+                        seconds=time.perf_counter() - start, bytes_sent=None, bytes_received=None, **stats)
+            raise
+        # the body of a streamed response is not read yet
+        events.emit(REQUEST_END, method=method, url=url, status_code=response.status_code, error=None,
+                    seconds=time.perf_counter() - start,
+                    bytes_sent=get_content_length(response.request.headers),
+                    bytes_received=None if kwargs.get('stream') else len(response.content), **stats)
         return response
 
+    def _send(self, method, request_func, url, stats, *args, **kwargs):
+        """
+        Send a request and retry it by the policy, adding the retries and
+        the waits to ``stats`` unless it is None.
+
+        The circuit breaker counts the outcome of the request rather than of
+        its attempts. When the circuit opens while the request is retried,
+        the last response is returned or the last error raised.
+        """
+        state = self.retry_policy.start(method)
+        limiter = self.rate_limits.get(method, url) if self.rate_limits is not None else None
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before_request()
+        while True:
+            if limiter is not None:
+                wait = limiter.reserve()
+                if wait > 0:
+                    if stats is not None:
+                        stats['throttled_seconds'] += wait
+                    time.sleep(wait)
+            status_code = error = None
+            try:
+                response = request_func(url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = None if _is_open(breaker) else state.next_delay(sent=_is_sent(e))
+                if delay is None:
+                    if breaker is not None:
+                        breaker.record(False)
+                    raise
+                error = type(e).__name__
+            else:
+                if limiter is not None:
+                    limiter.record(response.status_code in REFUSED_STATUSES)
+                delay = None
+                if (response.status_code >= 500 or response.status_code == 429) and not _is_open(breaker):
+                    delay = state.next_delay(response.status_code, response.headers.get('Retry-After'))
+                if delay is None:
+                    if breaker is not None:
+                        breaker.record(not is_failure(response.status_code))
+                    return response
+                response.close()
+                status_code = response.status_code
+            if stats is not None:
+                stats['retries'] += 1
+                stats['backoff_seconds'] += delay
+                self.events.emit(RETRY, method=method, url=url, attempt=state.attempts, status_code=status_code,
+                                 error=error, delay=delay)
+            if self.tracing is not None:
+                self.tracing.record_retry(state.attempts, status_code, error, delay)
+            time.sleep(delay)
+
     def get(self, url, *args, **kwargs):
-        return self._retry_request(requests.get, url, *args, **kwargs)
+        return self._retry_request('GET', self.session.get, url, *args, **kwargs)
 
     def post(self, url, *args, **kwargs):
-        return self._retry_request(requests.post, url, *args, **kwargs)
+        return self._retry_request('POST', self.session.post, url, *args, **kwargs)
 
     def put(self, url, *args, **kwargs):
-        return self._retry_request(requests.put, url, *args, **kwargs)
+        return self._retry_request('PUT', self.session.put, url, *args, **kwargs)
 
     def delete(self, url, *args, **kwargs):
-        return self._retry_request(requests.delete, url, *args, **kwargs)
+        return self._retry_request('DELETE', self.session.delete, url, *args, **kwargs)
+
+    def close(self):
+        self.session.close()
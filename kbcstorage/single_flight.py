@@ -0,0 +1,58 @@
+"""
+Coalescing of identical concurrent requests.
+
+When several threads make the same GET request at once, such as many waiters
+polling one job, only the first one sends it and the others share its
+response.
+"""
+import json
+import threading
+
+
+def get_request_key(url, params, headers):
+    """
+    Get the key identifying identical requests, tokens are in the headers.
+    """
+    return json.dumps([url, params, headers], sort_keys=True, default=str)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Registry of requests in flight. Safe to share between threads.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        Call ``func`` unless a call with the same key is in flight, in which
+        case wait for it and share its result or error.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
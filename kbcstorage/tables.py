@@ -6,28 +6,169 @@ Full documentation `here`.
 .. _here:
     http://docs.keboola.apiary.io/#reference/tables/
 """
-import tempfile
+import contextlib
+import csv
+import functools
+import gzip
+import io
+import itertools
 import os
-from kbcstorage.base import Endpoint
-from kbcstorage.files import Files
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from kbcstorage.base import Endpoint, with_context
+from kbcstorage.events import FILE_TRANSFER
+from kbcstorage.files import COMPRESS_CHUNK_SIZE, COPY_CHUNK_SIZE, Files
 from kbcstorage.jobs import Jobs
 from kbcstorage.tables_metadata import TablesMetadata
 
+SUBMIT_MAX_WORKERS_DEFAULT = 4
+# local CSV files larger than this are loaded as sliced files
+SLICE_SIZE_DEFAULT = 256 * 1024 * 1024
+# rows encoded to CSV at once when loading data from memory
+ENCODE_BATCH_ROWS = 10000
+# parallelism of parsing export slices into Arrow
+ARROW_MAX_WORKERS_DEFAULT = os.cpu_count() or 1
+
+
+def _split_csv(file_path, slice_size, enclosure='"', skip_header=True):
+    """
+    Split a local CSV file on row boundaries into byte ranges of about
+    ``slice_size`` bytes.
+
+    Line breaks in enclosed values are told apart by the parity of the
+    enclosures before them, enclosures in values are escaped by doubling.
+
+    Returns:
+        header_size (int): Size of the header row, 0 when skipped.
+        slices (list): A ``(file_path, offset, size)`` tuple for each slice.
+    """
+    file_size = os.path.getsize(file_path)
+    quote = enclosure.encode('utf-8') if enclosure else None
+    row_ends = []
+    target = 0 if skip_header else slice_size
+    in_enclosure = False
+    position = 0
+    with open(file_path, mode='rb') as file:
+        for chunk in iter(functools.partial(file.read, COPY_CHUNK_SIZE), b''):
+            # enclosures are counted up to here in the chunk
+            scanned = 0
+            while target < position + len(chunk):
+                start = max(scanned, target - position)
+                if quote:
+                    in_enclosure ^= chunk.count(quote, scanned, start) % 2 == 1
+                scanned = start
+                row_end = None
+                newline = chunk.find(b'\n', scanned)
+                while newline != -1:
+                    if quote:
+                        in_enclosure ^= chunk.count(quote, scanned, newline) % 2 == 1
+                    scanned = newline + 1
+                    if not in_enclosure:
+                        row_end = position + scanned
+                        break
+                    newline = chunk.find(b'\n', scanned)
+                if row_end is None:
+                    break
+                row_ends.append(row_end)
+                target = row_end + slice_size
+            if quote:
+                in_enclosure ^= chunk.count(quote, scanned) % 2 == 1
+            position += len(chunk)
+    header_size = 0
+    if skip_header:
+        header_size = row_ends.pop(0) if row_ends else file_size
+    offsets = [header_size] + row_ends + [file_size]
+    slices = [(file_path, start, end - start) for start, end in zip(offsets, offsets[1:]) if end > start]
+    return header_size, slices
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.csv
+    except ImportError as e:
+        raise ImportError("Arrow exports require pyarrow, install it with "
+                          "'pip install kbcstorage[arrow]'.") from e
+    return pyarrow
+
+
+def _get_arrow_type(pa, basetype, length=None):
+    """
+    Map a Keboola base type to an Arrow data type, ``None`` when the type
+    should be inferred.
+    """
+    if basetype in ('NUMERIC', 'DECIMAL'):
+        if not length:
+            return pa.float64()
+        precision, _, scale = length.partition(',')
+        precision, scale = int(precision), int(scale or 0)
+        if scale == 0 and precision <= 18:
+            # fits into a signed 64-bit integer
+            return pa.int64()
+        return pa.decimal128(precision, scale)
+    return {
+        'STRING': pa.string,
+        'INTEGER': pa.int64,
+        'FLOAT': pa.float64,
+        'BOOLEAN': pa.bool_,
+        'DATE': pa.date32,
+        'TIMESTAMP': lambda: pa.timestamp('us'),
+    }.get(basetype, lambda: None)()
+
 
 class Tables(Endpoint):
     """
     Tables Endpoint
     """
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None,
+                 max_workers=SUBMIT_MAX_WORKERS_DEFAULT, files=None):
         """
         Create a Tables endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
+            max_workers (int): Number of loads and exports started by the
+                ``submit_*`` methods that run at once.
+            files (:obj:`Files`): Endpoint transferring the files of loads
+                and exports, a :obj:`Files` with the default transfer
+                settings by default.
         """
-        super().__init__(root_url, 'tables', token)
-        self.metadata = TablesMetadata(root_url, token)
+        super().__init__(root_url, 'tables', token, transport=transport)
+        self.metadata = TablesMetadata(root_url, token, transport=self.requests)
+        self.files = files if files is not None else Files(root_url, token, transport=self.requests)
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """
+        The thread pool running operations started by the ``submit_*``
+        methods, created on first use.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='kbcstorage-tables')
+            return self._executor
+
+    def shutdown(self, wait=True):
+        """
+        Shut down the thread pool of the ``submit_*`` methods.
+
+        Args:
+            wait (bool): Wait for the submitted operations to finish.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def _submit(self, method, *args, **kwargs):
+        return self.executor.submit(with_context(method), *args, **kwargs)
 
     def list(self, include=None):
         """
@@ -44,6 +185,23 @@ class Tables(Endpoint):
         params = {'include': ','.join(include)} if include else {}
         return self._get(self.base_url, params=params)
 
+    def iter_list(self, include=None):
+        """
+        List all tables accessible by token, yielding each table as soon as
+        it is parsed instead of holding the whole listing in memory.
+
+        Args:
+            include (list): Properties to list (attributes, columns, buckets)
+
+        Yields:
+            table (dict): The parsed json of a table.
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        params = {'include': ','.join(include)} if include else {}
+        return self._get_iter(self.base_url, params=params)
+
     def detail(self, table_id):
         """
         Retrieves information about a given table.
@@ -71,8 +229,43 @@ class Tables(Endpoint):
         url = '{}/{}'.format(self.base_url, table_id)
         self._delete(url)
 
+    @staticmethod
+    def _slice_csv(file_path, slice_size, delimiter=',', enclosure='"',
+                   escaped_by='', without_headers=False, columns=None):
+        """
+        Split a local CSV file larger than ``slice_size`` into slices for a
+        sliced file.
+
+        Returns:
+            sliced (tuple): The columns of the file, ``columns`` if given
+                and the header row otherwise, and the byte ranges of its
+                slices without the header row, None when the file is not to
+                be sliced.
+        """
+        # missing files are reported by the upload
+        if slice_size is None or not os.path.isfile(file_path) or os.path.getsize(file_path) <= slice_size:
+            return None
+        # rows are told apart only in files with values in single character enclosures
+        if escaped_by != '' or len(enclosure) > 1:
+            return None
+        # slices have no header and the import needs the columns
+        if without_headers and not columns:
+            return None
+        header_size, slices = _split_csv(file_path, slice_size, enclosure,
+                                         skip_header=not without_headers)
+        # the columns given are loaded as they are for a file that is not sliced
+        if not without_headers and not columns:
+            with open(file_path, mode='rb') as file:
+                header = file.read(header_size).decode('utf-8-sig')
+            if enclosure:
+                reader = csv.reader(io.StringIO(header), delimiter=delimiter, quotechar=enclosure)
+            else:
+                reader = csv.reader(io.StringIO(header), delimiter=delimiter, quoting=csv.QUOTE_NONE)
+            columns = next(reader)
+        return columns, slices
+
     def create(self, bucket_id, name, file_path, delimiter=',', enclosure='"',
-               escaped_by='', primary_key=None):
+               escaped_by='', primary_key=None, slice_size=SLICE_SIZE_DEFAULT):
         """
         Create a new table from CSV file.
 
@@ -84,6 +277,9 @@ class Tables(Endpoint):
             enclosure (str): Field enclosure used in the CSV file.
             escaped_by (str): Escape character used in the CSV file.
             primary_key (list): Primary key of a table.
+            slice_size (int): Files larger than this many bytes are split
+                on row boundaries into slices uploaded in parallel, None to
+                always upload the file whole.
 
         Returns:
             table_id (str): Id of the created table.
@@ -91,14 +287,22 @@ class Tables(Endpoint):
         Raises:
             requests.HTTPError: If the API request fails.
         """
-        files = Files(self.root_url, self.token)
-        file_id = files.upload_file(file_path=file_path, tags=['file-import'],
-                                    do_notify=False, is_public=False)
+        files = self.files
+        columns = None
+        sliced = self._slice_csv(file_path, slice_size, delimiter, enclosure, escaped_by)
+        if sliced is None:
+            file_id = files.upload_file(file_path=file_path, tags=['file-import'],
+                                        do_notify=False, is_public=False)
+        else:
+            columns, slices = sliced
+            file_id = files.upload_sliced_file(os.path.basename(file_path), slices,
+                                               tags=['file-import'], do_notify=False,
+                                               is_public=False)
         job = self.create_raw(bucket_id=bucket_id, name=name,
                               data_file_id=file_id, delimiter=delimiter,
                               enclosure=enclosure, escaped_by=escaped_by,
-                              primary_key=primary_key)
-        jobs = Jobs(self.root_url, self.token)
+                              primary_key=primary_key, columns=columns)
+        jobs = Jobs(self.root_url, self.token, transport=self.requests)
         job = jobs.block_until_completed(job['id'])
         if job['status'] == 'error':
             raise RuntimeError(job['error']['message'])
@@ -107,7 +311,7 @@ class Tables(Endpoint):
     def create_raw(self, bucket_id, name, data_url=None, data_file_id=None,
                    snapshot_id=None, data_workspace_id=None,
                    data_table_name=None, delimiter=',', enclosure='"',
-                   escaped_by='', primary_key=None):
+                   escaped_by='', primary_key=None, columns=None):
         """
         Create a new table.
 
@@ -125,6 +329,8 @@ class Tables(Endpoint):
             enclosure (str): Field enclosure used in the CSV file.
             escaped_by (str): Escape character used in the CSV file.
             primary_key (list): Primary key of a table.
+            columns (list): Columns of the data file, required for sliced
+                files which have no header row.
 
         Returns:
             response_body: The parsed json from the HTTP
@@ -151,6 +357,8 @@ class Tables(Endpoint):
                              "specified.")
         if primary_key is not None and isinstance(primary_key, list):
             body['primaryKey'] = ",".join(primary_key)
+        if columns is not None and isinstance(columns, list):
+            body['columns[]'] = columns
         # todo solve this better
         url = '{}/v2/storage/buckets/{}/tables-async'.format(self.root_url,
                                                              bucket_id)
@@ -208,7 +416,7 @@ class Tables(Endpoint):
 
     def load(self, table_id, file_path, is_incremental=False, delimiter=',',
              enclosure='"', escaped_by='', columns=None,
-             without_headers=False):
+             without_headers=False, slice_size=SLICE_SIZE_DEFAULT):
         """
         Load data into an existing table
 
@@ -221,6 +429,9 @@ class Tables(Endpoint):
             escaped_by (str): Escape character used in the CSV file.
             columns (list): List of columns
             without_headers (bool): CSV does not contain headers
+            slice_size (int): Files larger than this many bytes are split
+                on row boundaries into slices uploaded in parallel, None to
+                always upload the file whole.
 
         Returns:
             response_body: The parsed json from the HTTP response
@@ -229,20 +440,157 @@ class Tables(Endpoint):
         Raises:
             requests.HTTPError: If the API request fails.
         """
-        files = Files(self.root_url, self.token)
-        file_id = files.upload_file(file_path=file_path, tags=['file-import'],
-                                    do_notify=False, is_public=False)
+        with self._span('tables.load', table_id=table_id):
+            files = self.files
+            sliced = self._slice_csv(file_path, slice_size, delimiter, enclosure, escaped_by,
+                                     without_headers, columns)
+            if sliced is None:
+                file_id = files.upload_file(file_path=file_path, tags=['file-import'],
+                                            do_notify=False, is_public=False)
+            else:
+                columns, slices = sliced
+                file_id = files.upload_sliced_file(os.path.basename(file_path), slices,
+                                                   tags=['file-import'], do_notify=False,
+                                                   is_public=False)
+            with self._span('jobs.start', table_id=table_id):
+                job = self.load_raw(table_id=table_id, data_file_id=file_id,
+                                    delimiter=delimiter, enclosure=enclosure,
+                                    escaped_by=escaped_by,
+                                    is_incremental=is_incremental, columns=columns,
+                                    without_headers=without_headers)
+            jobs = Jobs(self.root_url, self.token, transport=self.requests)
+            job = jobs.block_until_completed(job['id'])
+            if job['status'] == 'error':
+                raise RuntimeError(job['error']['message'])
+            return job['results']
+
+    def load_rows(self, table_id, rows, columns, is_incremental=False):
+        """
+        Load rows into an existing table, without a local file.
+
+        The rows are encoded to CSV in batches and compressed as they are
+        uploaded, so the rows may come from a generator larger than memory.
+
+        Args:
+            table_id (str): Table id
+            rows (iterable): Rows as sequences of values in the order of
+                ``columns``, None values are loaded as empty strings.
+            columns (list): Names of the columns of the rows
+            is_incremental (bool): Load incrementally (do not truncate table).
+
+        Returns:
+            response_body: The parsed json from the HTTP response
+                containing write results
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        return self._load_data(table_id, self._encode_rows(rows, columns), is_incremental)
+
+    def load_dataframe(self, table_id, df, is_incremental=False):
+        """
+        Load a pandas DataFrame into an existing table, without a local
+        file. Requires pandas.
+
+        Args:
+            table_id (str): Table id
+            df (pandas.DataFrame): The data, the index is not loaded.
+            is_incremental (bool): Load incrementally (do not truncate table).
+
+        Returns:
+            response_body: The parsed json from the HTTP response
+                containing write results
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        return self._load_data(table_id, self._encode_dataframe(df), is_incremental)
+
+    def load_arrow(self, table_id, data, is_incremental=False):
+        """
+        Load Arrow data into an existing table, without a local file.
+        Requires pyarrow.
+
+        Args:
+            table_id (str): Table id
+            data (pyarrow.Table): The data, or a ``pyarrow.RecordBatchReader``
+                streaming it.
+            is_incremental (bool): Load incrementally (do not truncate table).
+
+        Returns:
+            response_body: The parsed json from the HTTP response
+                containing write results
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+            ImportError: If pyarrow is not installed.
+        """
+        _import_pyarrow()
+        return self._load_data(table_id, self._encode_arrow(data), is_incremental)
+
+    def _load_data(self, table_id, chunks, is_incremental):
+        """
+        Upload CSV data in chunks and load it into an existing table.
+        """
+        if not isinstance(table_id, str) or table_id == '':
+            raise ValueError("Invalid table_id '{}'.".format(table_id))
+        files = self.files
+        file_id = files.upload_data('{}.csv'.format(table_id.split('.')[-1]), chunks,
+                                    tags=['file-import'], do_notify=False, is_public=False)
         job = self.load_raw(table_id=table_id, data_file_id=file_id,
-                            delimiter=delimiter, enclosure=enclosure,
-                            escaped_by=escaped_by,
-                            is_incremental=is_incremental, columns=columns,
-                            without_headers=without_headers)
-        jobs = Jobs(self.root_url, self.token)
+                            is_incremental=is_incremental)
+        jobs = Jobs(self.root_url, self.token, transport=self.requests)
         job = jobs.block_until_completed(job['id'])
         if job['status'] == 'error':
             raise RuntimeError(job['error']['message'])
         return job['results']
 
+    @staticmethod
+    def _encode_rows(rows, columns):
+        """
+        Encode rows into CSV chunks with a header row.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(columns)
+        rows = iter(rows)
+        for batch in iter(lambda: list(itertools.islice(rows, ENCODE_BATCH_ROWS)), []):
+            writer.writerows(batch)
+            if buffer.tell() >= COMPRESS_CHUNK_SIZE:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _encode_dataframe(df):
+        """
+        Encode a DataFrame into CSV chunks with a header row.
+        """
+        for start in range(0, max(len(df), 1), ENCODE_BATCH_ROWS):
+            yield df.iloc[start:start + ENCODE_BATCH_ROWS].to_csv(
+                index=False, header=start == 0, lineterminator='\n').encode('utf-8')
+
+    @staticmethod
+    def _encode_arrow(data):
+        """
+        Encode an Arrow table or record batch reader into CSV chunks with a
+        header row.
+        """
+        pa = _import_pyarrow()
+        if isinstance(data, pa.Table):
+            batches = data.to_batches(max_chunksize=ENCODE_BATCH_ROWS)
+        else:
+            batches = data
+        sink = pa.BufferOutputStream()
+        pa.csv.write_csv(data.schema.empty_table(), sink)
+        yield sink.getvalue().to_pybytes()
+        write_options = pa.csv.WriteOptions(include_header=False)
+        for batch in batches:
+            sink = pa.BufferOutputStream()
+            pa.csv.write_csv(batch, sink, write_options)
+            yield sink.getvalue().to_pybytes()
+
     def load_raw(self, table_id, data_url=None, data_file_id=None,
                  snapshot_id=None, data_workspace_id=None,
                  data_table_name=None, is_incremental=False,
@@ -290,7 +638,7 @@ class Tables(Endpoint):
             raise ValueError("Only one of enclosure and escaped_by may be "
                              "specified.")
         if columns is not None and isinstance(columns, list):
-            body['primaryKey[]'] = columns
+            body['columns[]'] = columns
         url = '{}/{}/import-async'.format(self.base_url, table_id)
         return self._post(url, data=body)
 
@@ -338,6 +686,15 @@ class Tables(Endpoint):
         Raises:
             requests.HTTPError: If the API request fails.
         """
+        r = self._preview_raw(table_id, changed_since, changed_until, columns,
+                              where_column, where_values, where_operator)
+        return r.content.decode('utf-8')
+
+    def _preview_raw(self, table_id, changed_since, changed_until, columns,
+                     where_column, where_values, where_operator):
+        """
+        Request a preview of a table and return the raw response.
+        """
         params = {}
         if not isinstance(table_id, str) or table_id == '':
             raise ValueError("Invalid table_id '{}'.".format(table_id))
@@ -356,8 +713,7 @@ class Tables(Endpoint):
         if columns is not None and isinstance(columns, list):
             params['columns'] = ','.join(columns)
         url = '{}/{}/data-preview'.format(self.base_url, table_id)
-        r = self._get_raw(url=url, params=params)
-        return r.content.decode('utf-8')
+        return self._get_raw(url=url, params=params)
 
     def export_to_file(self, table_id, path_name, limit=None,
                        file_format='rfc', changed_since=None,
@@ -390,45 +746,297 @@ class Tables(Endpoint):
         Raises:
             requests.HTTPError: If the API request fails.
         """
+        with self._span('tables.export_to_file', table_id=table_id):
 
-        table_detail = self.detail(table_id)
-        job = self.export_raw(table_id=table_id, limit=limit,
-                              file_format=file_format,
+            table_detail = self.detail(table_id)
+            with self._span('jobs.start', table_id=table_id):
+                job = self.export_raw(table_id=table_id, limit=limit,
+                                      file_format=file_format,
+                                      changed_since=changed_since,
+                                      changed_until=changed_until, columns=columns,
+                                      where_column=where_column,
+                                      where_values=where_values,
+                                      where_operator=where_operator, is_gzip=is_gzip)
+            jobs = Jobs(self.root_url, self.token, transport=self.requests)
+            job = jobs.block_until_completed(job['id'])
+            if job['status'] == 'error':
+                raise RuntimeError(job['error']['message'])
+            files = self.files
+            file_info = files.detail(file_id=job['results']['file']['id'], federation_token=True)
+            destination_file = os.path.join(path_name, table_detail['name'])
+            if columns is None:
+                columns = table_detail['columns']
+            with self._measure(FILE_TRANSFER, phase='download', file_id=file_info['id'],
+                               provider=file_info['provider']) as fields:
+                self._write_export_file(files._open_slices(file_info), destination_file, columns, is_gzip)
+                fields['bytes'] = os.path.getsize(destination_file)
+            return destination_file
+
+    @staticmethod
+    def _write_export_file(slices, destination_file, columns, is_gzip):
+        """
+        Stream a table export to the destination file with a header in a
+        single pass, without intermediate files.
+
+        Args:
+            slices (iterable): Readable binary streams of the export slices.
+            destination_file (str): Destination path for file.
+            columns (list): Column names written to the header.
+            is_gzip (bool): The slices are gzipped
+        """
+        # the file containing table export is always without headers (it is
+        # always sliced on Snowflake and Redshift
+        columns = ['"{}"'.format(col) for col in columns]
+        header = ",".join(columns) + '\n'
+        try:
+            with open(destination_file, mode='wb') as out_file:
+                out_file.write(header.encode('utf-8'))
+                for stream in slices:
+                    if is_gzip:
+                        with gzip.GzipFile(fileobj=stream, mode='rb') as gzip_stream:
+                            shutil.copyfileobj(gzip_stream, out_file, COPY_CHUNK_SIZE)
+                    else:
+                        shutil.copyfileobj(stream, out_file, COPY_CHUNK_SIZE)
+        except BaseException:
+            if os.path.exists(destination_file):
+                os.remove(destination_file)
+            raise
+
+    def export_iter(self, table_id, limit=None, changed_since=None,
+                    changed_until=None, columns=None, where_column=None,
+                    where_values=None, where_operator='eq', batch_size=None):
+        """
+        Export data from a table and iterate over its rows as the export
+        streams in, without writing a local file.
+
+        The export job runs when the method is called, the rows are then
+        read slice by slice and decompressed on the fly.
+
+        Args:
+            table_id (str): Table id
+            limit (int): Number of rows to export.
+            changed_until (str): Filtering by import date
+                Both until and since values can be a unix timestamp or any
+                date accepted by strtotime.
+            changed_since (str): Filtering by import date
+                Both until and since values can be a unix timestamp or any
+                date accepted by strtotime.
+            where_column (str): Column for exporting only matching rows
+            where_operator (str): 'eq' or 'neq'
+            where_values (list): Values for exporting only matching rows
+            columns (list): List of columns to export, all columns in the
+                order of the table detail by default
+            batch_size (int): Yield lists of up to ``batch_size`` rows
+                instead of single rows
+
+        Returns:
+            rows (generator): Each row as a list of values in the order of
+                ``columns``, or lists of rows when ``batch_size`` is given.
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+        """
+        if batch_size is not None and (not isinstance(batch_size, int) or batch_size < 1):
+            raise ValueError("Invalid batch_size '{}'.".format(batch_size))
+        file_id = self.export(table_id=table_id, limit=limit, file_format='rfc',
                               changed_since=changed_since,
                               changed_until=changed_until, columns=columns,
                               where_column=where_column,
                               where_values=where_values,
-                              where_operator=where_operator, is_gzip=is_gzip)
-        jobs = Jobs(self.root_url, self.token)
-        job = jobs.block_until_completed(job['id'])
-        if job['status'] == 'error':
-            raise RuntimeError(job['error']['message'])
-        files = Files(self.root_url, self.token)
-        temp_path = tempfile.TemporaryDirectory()
-        local_file = files.download(file_id=job['results']['file']['id'],
-                                    local_path=temp_path.name)
-        destination_file = os.path.join(path_name, table_detail['name'])
-        # the file containing table export is always without headers (it is
-        # always sliced on Snowflake and Redshift
-        if is_gzip:
-            import gzip
-            import shutil
-            with gzip.open(local_file, 'rb') as f_in, \
-                    open(local_file + '.un', 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
-            os.remove(local_file)
-            local_file = local_file + '.un'
-
-        with open(local_file, mode='rb') as in_file, \
-                open(destination_file, mode='wb') as out_file:
-            if columns is None:
-                columns = table_detail['columns']
-            columns = ['"{}"'.format(col) for col in columns]
-            header = ",".join(columns) + '\n'
-            out_file.write(header.encode('utf-8'))
-            for line in in_file:
-                out_file.write(line)
-        return destination_file
+                              where_operator=where_operator, is_gzip=True)
+        files = self.files
+        rows = self._read_export_rows(files.open_slices(file_id), is_gzip=True)
+        if batch_size is None:
+            return rows
+        return self._batch_rows(rows, batch_size)
+
+    @staticmethod
+    def _read_export_rows(slices, is_gzip):
+        """
+        Parse the rows of an export in the rfc format slice by slice.
+        """
+        for stream in slices:
+            if is_gzip:
+                stream = gzip.GzipFile(fileobj=stream, mode='rb')
+            with io.TextIOWrapper(stream, encoding='utf-8', newline='') as text_stream:
+                yield from csv.reader(text_stream)
+
+    def export_arrow(self, table_id, limit=None, changed_since=None,
+                     changed_until=None, columns=None, where_column=None,
+                     where_values=None, where_operator='eq',
+                     column_types=None, as_reader=False):
+        """
+        Export data from a table into an Arrow table, without writing a
+        local file.
+
+        Column types are taken from the base types of the table definition
+        or, for tables without one, from the ``KBC.datatype.basetype``
+        column metadata. Columns without a known type are read as strings.
+        The slices of the export are parsed in parallel. Requires pyarrow.
+
+        Args:
+            table_id (str): Table id
+            limit (int): Number of rows to export.
+            changed_until (str): Filtering by import date
+                Both until and since values can be a unix timestamp or any
+                date accepted by strtotime.
+            changed_since (str): Filtering by import date
+                Both until and since values can be a unix timestamp or any
+                date accepted by strtotime.
+            where_column (str): Column for exporting only matching rows
+            where_operator (str): 'eq' or 'neq'
+            where_values (list): Values for exporting only matching rows
+            columns (list): List of columns to export, all columns in the
+                order of the table detail by default
+            column_types (dict): Arrow data types overriding the types of
+                the table, by column name
+            as_reader (bool): Return a ``pyarrow.RecordBatchReader``
+                streaming the slices one by one instead of reading the
+                whole table into memory
+
+        Returns:
+            table (pyarrow.Table): The exported data, or a
+                ``pyarrow.RecordBatchReader`` when ``as_reader`` is set.
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+            ImportError: If pyarrow is not installed.
+        """
+        pa = _import_pyarrow()
+        table_info = self.detail(table_id)
+        columns = columns or table_info['columns']
+        schema = self._get_arrow_schema(pa, table_info, columns, column_types)
+        file_id = self.export(table_id=table_id, limit=limit, file_format='rfc',
+                              changed_since=changed_since,
+                              changed_until=changed_until, columns=columns,
+                              where_column=where_column,
+                              where_values=where_values,
+                              where_operator=where_operator, is_gzip=True)
+        files = self.files
+        file_info = files.detail(file_id, federation_token=True)
+        return self._read_arrow(files._get_slice_openers(file_info), schema, as_reader)
+
+    def export_parquet(self, table_id, path, limit=None, changed_since=None,
+                       changed_until=None, columns=None, where_column=None,
+                       where_values=None, where_operator='eq',
+                       column_types=None, compression='snappy'):
+        """
+        Export data from a table into a local Parquet file.
+
+        The slices of the export are streamed into the file one by one, so
+        the table does not have to fit into memory. Takes the same arguments
+        as ``export_arrow``. Requires pyarrow.
+
+        Args:
+            path (str): Path of the Parquet file to create
+            compression (str): Parquet compression codec
+
+        Returns:
+            path (str): Path of the created Parquet file.
+
+        Raises:
+            requests.HTTPError: If the API request fails.
+            ImportError: If pyarrow is not installed.
+        """
+        reader = self.export_arrow(table_id=table_id, limit=limit,
+                                   changed_since=changed_since,
+                                   changed_until=changed_until, columns=columns,
+                                   where_column=where_column,
+                                   where_values=where_values,
+                                   where_operator=where_operator,
+                                   column_types=column_types, as_reader=True)
+        self._write_parquet(reader, path, compression)
+        return path
+
+    @staticmethod
+    def _get_arrow_schema(pa, table_info, columns, column_types=None):
+        """
+        Build the Arrow schema of exported columns from a table detail.
+        """
+        basetypes = {}
+        definition = table_info.get('definition') or {}
+        for column in definition.get('columns', []):
+            basetypes[column['name']] = (column.get('basetype'), (column.get('definition') or {}).get('length'))
+        for column, metadata in (table_info.get('columnMetadata') or {}).items():
+            if column in basetypes or not metadata:
+                continue
+            values = {item['key']: item['value'] for item in metadata}
+            if 'KBC.datatype.basetype' in values:
+                basetypes[column] = (values['KBC.datatype.basetype'], values.get('KBC.datatype.length'))
+        column_types = column_types or {}
+        fields = []
+        for column in columns:
+            data_type = column_types.get(column)
+            if data_type is None and column in basetypes:
+                data_type = _get_arrow_type(pa, *basetypes[column])
+            fields.append(pa.field(column, data_type or pa.string()))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _read_arrow(slice_openers, schema, as_reader=False,
+                    max_workers=ARROW_MAX_WORKERS_DEFAULT):
+        """
+        Parse gzipped rfc slices of an export into Arrow.
+        """
+        pa = _import_pyarrow()
+        read_options = pa.csv.ReadOptions(column_names=schema.names)
+        parse_options = pa.csv.ParseOptions(newlines_in_values=True)
+        # exports quote every value, empty values of typed columns are nulls
+        convert_options = pa.csv.ConvertOptions(column_types=schema, strings_can_be_null=False)
+
+        def read_slice(open_slice):
+            with contextlib.closing(open_slice()) as stream, gzip.GzipFile(fileobj=stream, mode='rb') as gzip_stream:
+                # Arrow refuses empty input, which empty slices are
+                if not gzip_stream.peek(1):
+                    return schema.empty_table()
+                return pa.csv.read_csv(gzip_stream, read_options=read_options,
+                                       parse_options=parse_options,
+                                       convert_options=convert_options)
+
+        def iter_batches():
+            for open_slice in slice_openers:
+                with contextlib.closing(open_slice()) as stream, \
+                        gzip.GzipFile(fileobj=stream, mode='rb') as gzip_stream:
+                    if not gzip_stream.peek(1):
+                        continue
+                    yield from pa.csv.open_csv(gzip_stream, read_options=read_options,
+                                               parse_options=parse_options,
+                                               convert_options=convert_options)
+
+        if as_reader:
+            return pa.RecordBatchReader.from_batches(schema, iter_batches())
+        if len(slice_openers) < 2:
+            tables = [read_slice(open_slice) for open_slice in slice_openers]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(slice_openers))) as executor:
+                tables = list(executor.map(read_slice, slice_openers))
+        return pa.concat_tables(tables) if tables else schema.empty_table()
+
+    @staticmethod
+    def _write_parquet(reader, path, compression):
+        """
+        Stream record batches into a Parquet file, remove it on failure.
+        """
+        import pyarrow.parquet
+        try:
+            with pyarrow.parquet.ParquetWriter(path, reader.schema, compression=compression) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+    @staticmethod
+    def _batch_rows(rows, batch_size):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
     def export(self, table_id, limit=None, file_format='rfc',
                changed_since=None, changed_until=None, columns=None,
@@ -467,7 +1075,7 @@ class Tables(Endpoint):
                               where_column=where_column,
                               where_values=where_values,
                               where_operator=where_operator, is_gzip=is_gzip)
-        jobs = Jobs(self.root_url, self.token)
+        jobs = Jobs(self.root_url, self.token, transport=self.requests)
         job = jobs.block_until_completed(job['id'])
         if job['status'] == 'error':
             raise RuntimeError(job['error']['message'])
@@ -547,3 +1155,52 @@ class Tables(Endpoint):
         """
         url = '{}/{}/optimize'.format(self.base_url, table_id)
         return self._post(url)
+
+    def submit_create(self, *args, **kwargs):
+        """
+        Start ``create`` in the background.
+
+        Takes the same arguments as ``create``. Uploads of further tables
+        proceed while the import jobs of the previous ones are running.
+
+        Returns:
+            future (concurrent.futures.Future): Resolves to the id of the
+                created table.
+        """
+        return self._submit(self.create, *args, **kwargs)
+
+    def submit_load(self, *args, **kwargs):
+        """
+        Start ``load`` in the background.
+
+        Takes the same arguments as ``load``.
+
+        Returns:
+            future (concurrent.futures.Future): Resolves to the write results
+                of the import job.
+        """
+        return self._submit(self.load, *args, **kwargs)
+
+    def submit_export(self, *args, **kwargs):
+        """
+        Start ``export`` in the background.
+
+        Takes the same arguments as ``export``.
+
+        Returns:
+            future (concurrent.futures.Future): Resolves to the file id of the
+                table export.
+        """
+        return self._submit(self.export, *args, **kwargs)
+
+    def submit_export_to_file(self, *args, **kwargs):
+        """
+        Start ``export_to_file`` in the background.
+
+        Takes the same arguments as ``export_to_file``.
+
+        Returns:
+            future (concurrent.futures.Future): Resolves to the local file
+                with exported data.
+        """
+        return self._submit(self.export_to_file, *args, **kwargs)
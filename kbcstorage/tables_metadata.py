@@ -14,15 +14,16 @@ class TablesMetadata(Endpoint):
     """
     Tables Metadata Endpoint
     """
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None):
         """
         Create a Tables metadata endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
-        super().__init__(root_url, 'tables', token)
+        super().__init__(root_url, 'tables', token, transport=transport)
 
     def list(self, table_id):
         """
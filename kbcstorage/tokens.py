@@ -11,15 +11,16 @@ class Tokens(Endpoint):
     """
     Tokens  Endpoint
     """
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None):
         """
         Create a Tokens endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
-        super().__init__(root_url, 'tokens', token)
+        super().__init__(root_url, 'tokens', token, transport=transport)
 
     def verify(self):
         """
@@ -0,0 +1,136 @@
+"""
+OpenTelemetry tracing of the requests and operations of a client.
+
+Loads, exports, uploads and downloads of files are traced as spans with
+child spans for their phases: preparing a file, the upload and download of
+the file and of each of its slices, the merge of downloaded slices, starting
+a job and waiting for it. Every request to the Storage API, including each
+poll of a job, is a client span whose W3C trace context is sent in the
+request headers, so the spans of the API join the trace.
+
+Requires ``opentelemetry-api``, install it with
+``pip install kbcstorage[tracing]``, and an SDK configured by the
+application to export the spans.
+"""
+import contextlib
+from urllib.parse import urlparse
+
+from kbcstorage.events import FILE_TRANSFER, JOB_WAIT
+
+SPAN_PREFIX = 'kbcstorage.'
+ATTRIBUTE_PREFIX = 'kbc.'
+
+
+def _import_opentelemetry():
+    try:
+        from opentelemetry import propagate, trace
+    except ImportError as e:
+        raise ImportError("Tracing requires opentelemetry-api, install it with "
+                          "'pip install kbcstorage[tracing]'.") from e
+    return propagate, trace
+
+
+def _get_attributes(fields):
+    """
+    Get span attributes of the fields of an operation, skipping the values
+    which are not primitive.
+    """
+    return {ATTRIBUTE_PREFIX + name: value for name, value in fields.items()
+            if isinstance(value, (str, bool, int, float))}
+
+
+class Tracing:
+    """
+    Traces the requests and operations of the endpoints sharing a transport.
+    """
+    def __init__(self, tracer_provider=None, propagator=None):
+        """
+        Args:
+            tracer_provider (:obj:`opentelemetry.trace.TracerProvider`):
+                Provider of the tracer, the global one by default.
+            propagator (:obj:`opentelemetry.propagators.textmap.TextMapPropagator`):
+                Propagator injecting the trace context into the request
+                headers, the global one by default, which sends the W3C
+                ``traceparent`` and ``tracestate`` headers unless the
+                application configures another.
+        """
+        propagate, trace = _import_opentelemetry()
+        self._trace = trace
+        self._propagator = propagator if propagator is not None else propagate
+        self.tracer = trace.get_tracer('kbcstorage', tracer_provider=tracer_provider)
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Trace the block of a with statement as a span, the child of the
+        current span.
+
+        Args:
+            name (str): Name of the operation, e.g. 'tables.load'.
+            **attributes: Attributes of the span, None values are skipped.
+
+        Yields:
+            span (:obj:`opentelemetry.trace.Span`): The span.
+        """
+        with self.tracer.start_as_current_span(SPAN_PREFIX + name, attributes=_get_attributes(attributes)) as span:
+            yield span
+
+    @contextlib.contextmanager
+    def measure(self, name, measure):
+        """
+        Trace a block measured as an event as a span, with the fields of the
+        event as its attributes.
+
+        Args:
+            name (str): Name of the event.
+            measure: Context manager yielding the fields of the event.
+        """
+        with measure as fields:
+            if name == FILE_TRANSFER:
+                span_name = SPAN_PREFIX + 'transfer.' + fields['phase']
+            elif name == JOB_WAIT:
+                span_name = SPAN_PREFIX + 'jobs.wait'
+            else:
+                span_name = SPAN_PREFIX + name
+            with self.tracer.start_as_current_span(span_name) as span:
+                try:
+                    yield fields
+                finally:
+                    span.set_attributes(_get_attributes(fields))
+
+    @contextlib.contextmanager
+    def request(self, method, url, kwargs):
+        """
+        Trace a request to the Storage API as a client span and inject its
+        trace context into the headers in ``kwargs``.
+
+        Yields:
+            span (:obj:`opentelemetry.trace.Span`): The span.
+        """
+        attributes = {'http.request.method': method, 'url.full': url}
+        host = urlparse(url).hostname
+        if host:
+            attributes['server.address'] = host
+        with self.tracer.start_as_current_span(method, kind=self._trace.SpanKind.CLIENT,
+                                               attributes=attributes) as span:
+            headers = dict(kwargs.get('headers') or {})
+            self._propagator.inject(headers)
+            kwargs['headers'] = headers
+            yield span
+
+    def record_response(self, span, status_code):
+        span.set_attribute('http.response.status_code', status_code)
+        if status_code >= 400:
+            span.set_attribute('error.type', str(status_code))
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+
+    def record_retry(self, attempt, status_code, error, delay):
+        """
+        Record a retry of the request of the current span.
+        """
+        attributes = {'attempt': attempt, 'delay': delay}
+        if status_code is not None:
+            attributes['http.response.status_code'] = status_code
+        if error is not None:
+            attributes['error.type'] = error
+        self._trace.get_current_span().add_event('retry', attributes)
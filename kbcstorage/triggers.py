@@ -14,15 +14,16 @@ class Triggers(Endpoint):
     Triggers Endpoint
     """
 
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None):
         """
         Create a Triggers endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
-        super().__init__(root_url, 'triggers', token)
+        super().__init__(root_url, 'triggers', token, transport=transport)
 
     def list(self):
         """
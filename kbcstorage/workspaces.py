@@ -35,15 +35,16 @@ class Workspaces(Endpoint):
     """
     Workspaces Endpoint
     """
-    def __init__(self, root_url, token):
+    def __init__(self, root_url, token, transport=None):
         """
         Create a Workspaces endpoint.
 
         Args:
             root_url (:obj:`str`): The base url for the API.
             token (:obj:`str`): A storage API key.
+            transport (:obj:`RetryRequests`): Shared HTTP transport.
         """
-        super().__init__(root_url, 'workspaces', token)
+        super().__init__(root_url, 'workspaces', token, transport=transport)
 
     def list(self):
         """
@@ -191,14 +192,14 @@ class Workspaces(Endpoint):
         workspace = self.detail(workspace_id)
         if (workspace['type'] != 'file' and workspace['connection']['backend'] != 'abs'):
             raise Exception('Loading files to workspace is only available for ABS workspaces')
-        files = Files(self.root_url, self.token)
+        files = Files(self.root_url, self.token, transport=self.requests)
         if ('operator' in file_mapping and file_mapping['operator'] == 'and'):
             query = ' AND '.join(map(lambda tag: 'tags:"' + tag + '"', file_mapping['tags']))
             file_list = files.list(q=query)
         else:
             file_list = files.list(tags=file_mapping['tags'])
 
-        jobs = Jobs(self.root_url, self.token)
+        jobs = Jobs(self.root_url, self.token, transport=self.requests)
         jobs_list = []
         for file in file_list:
             inputs = {
@@ -211,9 +212,9 @@ class Workspaces(Endpoint):
             job = self._post(url, data=body)
             jobs_list.append(job)
 
-        for job in jobs_list:
-            if not (jobs.block_for_success(job['id'])):
+        for job in jobs.as_completed([job['id'] for job in jobs_list]):
+            if job['status'] != 'success':
                 try:
-                    print("Failed to load a file with error: %s" % job['results']['message'])
-                except IndexError:
+                    print("Failed to load a file with error: %s" % job['error']['message'])
+                except (KeyError, TypeError):
                     print("An unknown error occurred loading data.  Job ID %s" % job['id'])
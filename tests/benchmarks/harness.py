@@ -0,0 +1,181 @@
+"""
+Shared parts of the benchmarks: a local stub of the Storage API, running
+measured scripts in fresh interpreters and comparing results to a baseline.
+
+The benchmarks run only with ``RUN_BENCHMARKS=1``::
+
+    RUN_BENCHMARKS=1 BENCHMARK_OUTPUT=baseline.json python -m unittest discover -s tests/benchmarks -t .
+    RUN_BENCHMARKS=1 BENCHMARK_BASELINE=baseline.json python -m unittest discover -s tests/benchmarks -t .
+
+A measurement fails when it exceeds its baseline by more than
+``BENCHMARK_TOLERANCE`` (0.25 by default, i.e. 25 %).
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RUN_BENCHMARKS = bool(os.environ.get('RUN_BENCHMARKS'))
+TOLERANCE_DEFAULT = 0.25
+REPEAT_DEFAULT = 5
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FileBody:
+    """
+    Response body sent from a range of a file without reading it into
+    memory.
+    """
+    def __init__(self, path, offset=0, size=None):
+        self.path = path
+        self.offset = offset
+        self.size = os.path.getsize(path) - offset if size is None else size
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        for method, pattern, route in self.server.routes:
+            match = re.fullmatch(pattern, self.path.split('?')[0])
+            if method == self.command and match:
+                status, headers, content = route(self, match, body)
+                break
+        else:
+            status, headers, content = 404, {}, json.dumps({'error': 'Not found'}).encode()
+        if not isinstance(content, (bytes, FileBody)):
+            content = json.dumps(content).encode()
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(content.size if isinstance(content, FileBody) else len(content)))
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        if isinstance(content, FileBody):
+            with open(content.path, mode='rb') as file:
+                self.connection.sendfile(file, content.offset, content.size)
+        else:
+            self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    Local HTTP server answering requests by a list of routes, used as a
+    context manager.
+
+    A route is a tuple of the method, a regular expression of the path and a
+    function of the request handler, the match and the request body
+    returning the status, headers and the body, bytes, json or a
+    :obj:`FileBody`.
+    """
+    def __init__(self, routes):
+        self.routes = list(routes)
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.routes = self.routes
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+
+
+def json_route(method, pattern, body, status=200):
+    """
+    Route answering with a fixed json body.
+    """
+    return method, pattern, lambda handler, match, request_body: (status, {}, body)
+
+
+def run_python(script, *args, env=None):
+    """
+    Run a script in a fresh interpreter with the repository on the path.
+
+    Returns:
+        result: The json the script printed as its last line.
+    """
+    process_env = dict(os.environ, PYTHONPATH=ROOT_DIR, **(env or {}))
+    output = subprocess.run([sys.executable, '-c', script] + [str(arg) for arg in args], env=process_env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def get_repeat():
+    return int(os.environ.get('BENCHMARK_REPEAT', REPEAT_DEFAULT))
+
+
+def report(suite, results, higher_is_better=()):
+    """
+    Print the results of a suite, store them in ``BENCHMARK_OUTPUT`` and
+    compare them to ``BENCHMARK_BASELINE``.
+
+    Args:
+        suite (str): Name of the suite.
+        results (dict): Configuration -> measurement -> value, where lower
+            values are better.
+        higher_is_better (iterable): Names of the measurements where higher
+            values are better, such as throughput.
+
+    Returns:
+        regressions (list): Descriptions of the measurements worse than the
+            baseline by more than the tolerance.
+    """
+    for configuration, measurements in sorted(results.items()):
+        print('{} [{}]: {}'.format(suite, configuration,
+                                   ', '.join('{}={:.4g}'.format(name, value)
+                                             for name, value in sorted(measurements.items()))))
+    output_path = os.environ.get('BENCHMARK_OUTPUT')
+    if output_path:
+        stored = {}
+        if os.path.exists(output_path):
+            with open(output_path) as output_file:
+                stored = json.load(output_file)
+        stored[suite] = results
+        with open(output_path, 'w') as output_file:
+            json.dump(stored, output_file, indent=2, sort_keys=True)
+    baseline_path = os.environ.get('BENCHMARK_BASELINE')
+    if not baseline_path:
+        return []
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file).get(suite, {})
+    tolerance = float(os.environ.get('BENCHMARK_TOLERANCE', TOLERANCE_DEFAULT))
+    regressions = []
+    for configuration, measurements in results.items():
+        for name, value in measurements.items():
+            expected = baseline.get(configuration, {}).get(name)
+            if not expected:
+                continue
+            if name in higher_is_better:
+                if value < expected * (1 - tolerance):
+                    regressions.append('{} [{}] {}: {:.4g} < {:.4g} - {:.0%}'.format(
+                        suite, configuration, name, value, expected, tolerance))
+            elif value > expected * (1 + tolerance):
+                regressions.append('{} [{}] {}: {:.4g} > {:.4g} + {:.0%}'.format(
+                    suite, configuration, name, value, expected, tolerance))
+    return regressions
@@ -0,0 +1,60 @@
+"""
+Benchmark of the start of a short-lived process using the client: importing
+it, creating a ``Client`` and its first request, against a local stub of the
+Storage API. Each run uses a fresh interpreter.
+"""
+import time
+import unittest
+
+from .harness import RUN_BENCHMARKS, StubServer, get_repeat, json_route, median, report, run_python
+
+COLD_START_SCRIPT = '''
+import json
+import resource
+import sys
+import time
+
+
+def get_rss_mb():
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+result = {'startup_rss_mb': get_rss_mb()}
+start = time.perf_counter()
+from kbcstorage.client import Client
+result['import_seconds'] = time.perf_counter() - start
+result['import_rss_mb'] = get_rss_mb()
+
+start = time.perf_counter()
+client = Client(sys.argv[1], 'token', file_storage_support=sys.argv[2] == 'on')
+result['client_seconds'] = time.perf_counter() - start
+
+start = time.perf_counter()
+client.buckets.list()
+result['first_call_seconds'] = time.perf_counter() - start
+result['first_call_rss_mb'] = get_rss_mb()
+client.close()
+print(json.dumps(result))
+'''
+
+BUCKETS = [{'id': 'in.c-bucket-{}'.format(i), 'name': 'c-bucket-{}'.format(i), 'stage': 'in'} for i in range(50)]
+
+
+@unittest.skipUnless(RUN_BENCHMARKS, 'Benchmarks run only with RUN_BENCHMARKS=1.')
+class TestColdStart(unittest.TestCase):
+    def test_cold_start(self):
+        results = {}
+        with StubServer([json_route('GET', '/v2/storage/buckets', BUCKETS)]) as server:
+            for file_storage_support in ('on', 'off'):
+                runs = []
+                for _ in range(get_repeat()):
+                    start = time.perf_counter()
+                    run = run_python(COLD_START_SCRIPT, server.url, file_storage_support)
+                    run['process_seconds'] = time.perf_counter() - start
+                    runs.append(run)
+                results['file_storage_support=' + file_storage_support] = {
+                    name: median([run[name] for run in runs]) for name in runs[0]
+                }
+        regressions = report('cold_start', results)
+        self.assertEqual([], regressions)
@@ -0,0 +1,383 @@
+"""
+Benchmark of the throughput of the data path: ``Tables.export_to_file``,
+``Tables.load`` and ``Files.download`` of sliced and non-sliced tables.
+
+Runs offline against a local stub of the Storage API serving files from a
+local stand-in of S3, which keeps objects on disk. Each run uses a fresh
+interpreter and reports MB/s, peak RSS, the scratch disk used and the counts
+of read and write syscalls from ``/proc/self/io``, which does not count
+sending and receiving on sockets.
+
+The size of the synthetic table is ``BENCHMARK_TABLE_MB`` (256 by default),
+e.g. ``BENCHMARK_TABLE_MB=4096`` for a 4 GB table, which is split into
+``BENCHMARK_SLICES`` slices (8 by default) for the sliced runs.
+"""
+import gzip
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+from .harness import RUN_BENCHMARKS, FileBody, StubServer, get_repeat, json_route, median, report, run_python
+
+TABLE_MB_DEFAULT = 256
+SLICES_DEFAULT = 8
+BLOCK_ROWS = 10000
+COPY_CHUNK_SIZE = 16 * 2 ** 20
+BUCKET = 'kbc-bench'
+COLUMNS = ['id', 'name', 'value']
+SCRATCH_INTERVAL = 0.05
+
+THROUGHPUT_SCRIPT = '''
+import json
+import os
+import resource
+import sys
+import time
+
+from kbcstorage.client import Client
+
+
+def get_counters():
+    counters = {}
+    # read and write syscalls and bytes of all threads of the process, Linux only
+    if os.path.exists('/proc/self/io'):
+        with open('/proc/self/io') as io_file:
+            for line in io_file:
+                name, value = line.split(':')
+                counters[name] = int(value)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    counters['cpu_seconds'] = usage.ru_utime + usage.ru_stime
+    counters['context_switches'] = usage.ru_nvcsw + usage.ru_nivcsw
+    return counters
+
+
+url, operation, target, output, slice_size = sys.argv[1:]
+client = Client(url, 'token')
+before = get_counters()
+start = time.perf_counter()
+if operation == 'export_to_file':
+    size = os.path.getsize(client.tables.export_to_file(target, output))
+elif operation == 'load':
+    client.tables.load('in.c-bench.table', target, slice_size=int(slice_size) or None)
+    size = os.path.getsize(target)
+else:
+    size = os.path.getsize(client.files.download(target, output))
+seconds = time.perf_counter() - start
+after = get_counters()
+client.close()
+
+result = {
+    'seconds': seconds,
+    'mb_per_s': size / 2 ** 20 / seconds,
+    # kilobytes on Linux
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}
+for name, counter in (('cpu_seconds', 'cpu_seconds'), ('context_switches', 'context_switches'),
+                      ('read_syscalls', 'syscr'), ('write_syscalls', 'syscw')):
+    if counter in after:
+        result[name] = after[counter] - before[counter]
+for name, counter in (('read_mb', 'rchar'), ('written_mb', 'wchar')):
+    if counter in after:
+        result[name] = (after[counter] - before[counter]) / 2 ** 20
+print(json.dumps(result))
+'''
+
+
+class ObjectStore:
+    """
+    Local stand-in of S3 keeping objects in a directory, with the subset of
+    the API used by boto3 to put, get and download objects and to upload
+    them in parts. Requests are not authenticated.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._upload_ids = itertools.count(1)
+
+    def get_path(self, key):
+        return os.path.join(self.root, BUCKET, key)
+
+    def routes(self):
+        pattern = '/{}/(?P<key>.+)'.format(BUCKET)
+        return [
+            ('PUT', pattern, self._put),
+            ('POST', pattern, self._post),
+            ('GET', pattern, self._get),
+            ('HEAD', pattern, self._get),
+            ('DELETE', pattern, self._delete),
+        ]
+
+    def _get_upload_path(self, upload_id, part_number=None):
+        path = os.path.join(self.root, '.uploads', upload_id)
+        return path if part_number is None else os.path.join(path, '{:05d}'.format(int(part_number)))
+
+    @staticmethod
+    def _write(path, body):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode='wb') as file:
+            file.write(body)
+
+    def _put(self, handler, match, body):
+        query = parse_qs(urlparse(handler.path).query)
+        if 'uploadId' in query:
+            self._write(self._get_upload_path(query['uploadId'][0], query['partNumber'][0]), body)
+        else:
+            self._write(self.get_path(match.group('key')), body)
+        return 200, {'ETag': '"{}"'.format(len(body))}, b''
+
+    def _post(self, handler, match, body):
+        query = parse_qs(urlparse(handler.path).query, keep_blank_values=True)
+        key = match.group('key')
+        if 'uploads' in query:
+            upload_id = str(next(self._upload_ids))
+            os.makedirs(self._get_upload_path(upload_id))
+            return 200, {}, (
+                '<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult>'
+                '<Bucket>{}</Bucket><Key>{}</Key><UploadId>{}</UploadId>'
+                '</InitiateMultipartUploadResult>'.format(BUCKET, key, upload_id)
+            ).encode()
+        # completion of a multipart upload, the parts are joined in order
+        upload_path = self._get_upload_path(query['uploadId'][0])
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode='wb') as file:
+            for part_name in sorted(os.listdir(upload_path)):
+                with open(os.path.join(upload_path, part_name), mode='rb') as part:
+                    shutil.copyfileobj(part, file)
+        shutil.rmtree(upload_path)
+        return 200, {}, (
+            '<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUploadResult>'
+            '<Bucket>{}</Bucket><Key>{}</Key><ETag>"{}"</ETag>'
+            '</CompleteMultipartUploadResult>'.format(BUCKET, key, os.path.getsize(path))
+        ).encode()
+
+    def _get(self, handler, match, body):
+        path = self.get_path(match.group('key'))
+        if not os.path.isfile(path):
+            return 404, {'Content-Type': 'application/xml'}, b'<Error><Code>NoSuchKey</Code></Error>'
+        size = os.path.getsize(path)
+        headers = {'ETag': '"{}"'.format(size), 'Content-Type': 'binary/octet-stream',
+                   'Last-Modified': 'Thu, 01 Jan 2026 00:00:00 GMT', 'Accept-Ranges': 'bytes'}
+        byte_range = re.fullmatch(r'bytes=(\d+)-(\d*)', handler.headers.get('Range') or '')
+        if byte_range is None:
+            return 200, headers, FileBody(path)
+        first = int(byte_range.group(1))
+        last = min(int(byte_range.group(2) or size - 1), size - 1)
+        headers['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, size)
+        return 206, headers, FileBody(path, first, last - first + 1)
+
+    def _delete(self, handler, match, body):
+        query = parse_qs(urlparse(handler.path).query)
+        if 'uploadId' in query:
+            shutil.rmtree(self._get_upload_path(query['uploadId'][0]), ignore_errors=True)
+        elif os.path.exists(self.get_path(match.group('key'))):
+            os.remove(self.get_path(match.group('key')))
+        return 204, {}, b''
+
+
+class FakeStorage:
+    """
+    Local stub of the Storage API with the exports of two tables stored in an
+    :obj:`ObjectStore`, ``in.c-bench.table`` in a single file and
+    ``in.c-bench.sliced`` in slices. Jobs complete immediately.
+    """
+    EXPORT_FILE_IDS = {'in.c-bench.table': 1, 'in.c-bench.sliced': 2}
+
+    def __init__(self, store):
+        self.store = store
+        self.url = None
+        self._ids = itertools.count(100)
+        self._jobs = {}
+
+    def routes(self):
+        table = r'/v2/storage/tables/(?P<table_id>in\.c-bench\.\w+)'
+        return [
+            ('GET', table, self._table_detail),
+            ('POST', table + '/import-async', self._create_job),
+            ('POST', table + '/export-async', self._create_job),
+            ('GET', r'/v2/storage/jobs/(?P<job_id>\d+)', self._job_detail),
+            ('POST', '/v2/storage/files/prepare', self._prepare),
+            ('GET', r'/v2/storage/files/(?P<file_id>\d+)', self._file_detail),
+            json_route('GET', '/v2/storage/?', {'components': []}),
+        ] + self.store.routes()
+
+    def _table_detail(self, handler, match, body):
+        table_id = match.group('table_id')
+        return 200, {}, {'id': table_id, 'name': table_id.split('.')[-1], 'columns': COLUMNS}
+
+    def _create_job(self, handler, match, body):
+        job_id = next(self._ids)
+        results = {}
+        if handler.path.split('?')[0].endswith('/export-async'):
+            results = {'file': {'id': self.EXPORT_FILE_IDS[match.group('table_id')]}}
+        self._jobs[job_id] = {'id': job_id, 'status': 'success', 'results': results}
+        return 202, {}, {'id': job_id, 'status': 'waiting'}
+
+    def _job_detail(self, handler, match, body):
+        return 200, {}, self._jobs[int(match.group('job_id'))]
+
+    def _prepare(self, handler, match, body):
+        fields = parse_qs(body.decode())
+        file_id = next(self._ids)
+        return 200, {}, {
+            'id': file_id,
+            'name': fields['name'][0],
+            'provider': 'aws',
+            'region': 'us-east-1',
+            'uploadParams': {
+                'bucket': BUCKET,
+                'key': 'uploads/{}/{}'.format(file_id, fields['name'][0]),
+                'acl': 'private',
+                'x-amz-server-side-encryption': 'AES256',
+                'credentials': get_credentials(),
+            },
+        }
+
+    def _file_detail(self, handler, match, body):
+        file_id = int(match.group('file_id'))
+        is_sliced = file_id == self.EXPORT_FILE_IDS['in.c-bench.sliced']
+        key = 'exports/sliced/' if is_sliced else 'exports/table.csv.gz'
+        return 200, {}, {
+            'id': file_id,
+            'name': 'table.csv.gz',
+            'provider': 'aws',
+            'region': 'us-east-1',
+            'isSliced': is_sliced,
+            'url': '{}/{}/{}manifest'.format(self.url, BUCKET, key),
+            's3Path': {'bucket': BUCKET, 'key': key},
+            'credentials': get_credentials(),
+        }
+
+
+def get_credentials():
+    return {'AccessKeyId': 'bench', 'SecretAccessKey': 'bench', 'SessionToken': 'bench'}
+
+
+def write_table(path, size):
+    """
+    Write a csv table of about ``size`` bytes without a header. Values are
+    random so that the table compresses like real data.
+    """
+    block = ''.join('"{}","name-{}","{}"\n'.format(row, row, os.urandom(16).hex())
+                    for row in range(BLOCK_ROWS)).encode()
+    with open(path, mode='wb') as file:
+        for _ in range(max(1, size // len(block))):
+            file.write(block)
+
+
+def write_gzip_slices(source, destinations):
+    """
+    Split a csv table on row boundaries into gzipped slices.
+    """
+    slice_size = -(-os.path.getsize(source) // len(destinations))
+    with open(source, mode='rb') as source_file:
+        for destination in destinations:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with gzip.open(destination, mode='wb', compresslevel=1) as slice_file:
+                remaining = slice_size
+                while remaining > 0:
+                    chunk = source_file.read(min(remaining, COPY_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    slice_file.write(chunk)
+                    remaining -= len(chunk)
+                slice_file.write(source_file.readline())
+
+
+def get_tree_size(path):
+    size = 0
+    for directory, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                size += os.path.getsize(os.path.join(directory, file_name))
+            except OSError:
+                # removed while walking
+                pass
+    return size
+
+
+def run_measured(scratch, *args, env=None):
+    """
+    Run the throughput script sampling the peak size of its scratch directory.
+    """
+    peak = [0]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(SCRATCH_INTERVAL):
+            peak[0] = max(peak[0], get_tree_size(scratch))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        result = run_python(THROUGHPUT_SCRIPT, *args, env=env)
+    finally:
+        done.set()
+        sampler.join()
+    result['scratch_mb'] = max(peak[0], get_tree_size(scratch)) / 2 ** 20
+    return result
+
+
+@unittest.skipUnless(RUN_BENCHMARKS, 'Benchmarks run only with RUN_BENCHMARKS=1.')
+class TestThroughput(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp(prefix='kbc-bench-')
+        cls.store = ObjectStore(os.path.join(cls.temp_dir, 'store'))
+        cls.table_path = os.path.join(cls.temp_dir, 'table.csv')
+        write_table(cls.table_path, int(os.environ.get('BENCHMARK_TABLE_MB', TABLE_MB_DEFAULT)) * 2 ** 20)
+        slice_count = int(os.environ.get('BENCHMARK_SLICES', SLICES_DEFAULT))
+        write_gzip_slices(cls.table_path, [cls.store.get_path('exports/table.csv.gz')])
+        slice_keys = ['exports/sliced/part{:04d}.gz'.format(index) for index in range(slice_count)]
+        write_gzip_slices(cls.table_path, [cls.store.get_path(key) for key in slice_keys])
+        manifest = {'entries': [{'url': 's3://{}/{}'.format(BUCKET, key), 'mandatory': True} for key in slice_keys]}
+        with open(cls.store.get_path('exports/sliced/manifest'), mode='w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        # boto3 reaches the stand-in of S3 and computes checksums only where the API requires them
+        config_path = os.path.join(cls.temp_dir, 'aws_config')
+        with open(config_path, mode='w') as config_file:
+            config_file.write('[default]\ns3 =\n    addressing_style = path\n')
+        cls.env = {
+            'AWS_CONFIG_FILE': config_path,
+            'AWS_SHARED_CREDENTIALS_FILE': os.devnull,
+            'AWS_EC2_METADATA_DISABLED': 'true',
+            'AWS_REQUEST_CHECKSUM_CALCULATION': 'when_required',
+            'AWS_RESPONSE_CHECKSUM_VALIDATION': 'when_required',
+        }
+        cls.slice_size = -(-os.path.getsize(cls.table_path) // slice_count)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def measure(self, server, operation, target, slice_size=0):
+        runs = []
+        for _ in range(get_repeat()):
+            scratch = tempfile.mkdtemp(dir=self.temp_dir, prefix='scratch-')
+            env = dict(self.env, AWS_ENDPOINT_URL_S3=server.url, TMPDIR=scratch)
+            try:
+                runs.append(run_measured(scratch, server.url, operation, target, scratch, slice_size, env=env))
+            finally:
+                shutil.rmtree(scratch)
+                shutil.rmtree(self.store.get_path('uploads'), ignore_errors=True)
+        return {name: median([run[name] for run in runs]) for name in runs[0]}
+
+    def test_throughput(self):
+        storage = FakeStorage(self.store)
+        results = {}
+        with StubServer(storage.routes()) as server:
+            storage.url = server.url
+            results['export_to_file'] = self.measure(server, 'export_to_file', 'in.c-bench.table')
+            results['export_to_file sliced'] = self.measure(server, 'export_to_file', 'in.c-bench.sliced')
+            results['load'] = self.measure(server, 'load', self.table_path)
+            results['load sliced'] = self.measure(server, 'load', self.table_path, self.slice_size)
+            results['download'] = self.measure(server, 'download', FakeStorage.EXPORT_FILE_IDS['in.c-bench.table'])
+            results['download sliced'] = self.measure(server, 'download',
+                                                      FakeStorage.EXPORT_FILE_IDS['in.c-bench.sliced'])
+        regressions = report('throughput', results, higher_is_better=('mb_per_s',))
+        self.assertEqual([], regressions)
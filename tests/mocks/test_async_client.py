@@ -0,0 +1,297 @@
+"""
+Test basic functionality of the asynchronous client
+"""
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs
+
+import httpx
+import responses
+
+from kbcstorage.aio.client import AsyncClient
+from kbcstorage.aio.files import AsyncFiles
+from kbcstorage.aio.tables import AsyncTables
+from kbcstorage.files import Files
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from .bucket_responses import list_response as buckets_list_response
+from .job_responses import detail_response as job_detail_response
+from .workspace_responses import create_response as workspace_create_response
+
+
+class TestAsyncClientWithMocks(unittest.IsolatedAsyncioTestCase):
+    """
+    Test the asynchronous endpoints with a mock HTTP transport
+    """
+    def setUp(self):
+        self.responses = {}
+        self.requests = []
+        self.client = AsyncClient('https://connection.keboola.com/', 'dummy_token')
+        self.client.http_client._transport = httpx.MockTransport(self._handle)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def _handle(self, request):
+        self.requests.append(request)
+        queue = self.responses[(request.method, request.url.path)]
+        status, body = queue.pop(0) if len(queue) > 1 else queue[0]
+        return httpx.Response(status, json=body)
+
+    def _add(self, method, path, body, status=200):
+        self.responses.setdefault((method, path), []).append((status, body))
+
+    async def test_endpoints_share_client(self):
+        for endpoint in [self.client.buckets, self.client.files, self.client.jobs, self.client.tables,
+                         self.client.tables.metadata, self.client.workspaces, self.client.configurations,
+                         self.client.configurations.metadata, self.client.triggers]:
+            with self.subTest(endpoint=type(endpoint).__name__):
+                self.assertIs(self.client.http_client, endpoint.requests.client)
+
+    async def test_transfer_settings(self):
+        client = AsyncClient('https://connection.keboola.com/', 'dummy_token', transfer_max_workers=2,
+                             upload_part_size=8 * 1024 * 1024, max_part_retries=1)
+        self.assertIsInstance(client.tables.files, AsyncFiles)
+        for files in [client.files, client.tables.files]:
+            self.assertEqual((2, 8 * 1024 * 1024, 1),
+                             (files.max_workers, files.upload_part_size, files.max_part_retries))
+        await client.close()
+
+    async def test_list(self):
+        self._add('GET', '/v2/storage/buckets', buckets_list_response)
+        buckets = await self.client.buckets.list()
+        self.assertEqual(buckets_list_response, buckets)
+        self.assertEqual('dummy_token', self.requests[0].headers['X-StorageApi-Token'])
+
+    async def test_form_body_matches_requests(self):
+        self._add('POST', '/v2/storage/workspaces', workspace_create_response)
+        await self.client.workspaces.create(backend='snowflake')
+        body = parse_qs(self.requests[0].content.decode())
+        self.assertEqual({'backend': ['snowflake'], 'readOnlyStorageAccess': ['false']}, body)
+
+    async def test_json_body(self):
+        self._add('POST', '/v2/storage/tables/in.c-main.table/metadata', [])
+        await self.client.tables.metadata.create('in.c-main.table', 'user', [{'key': 'k', 'value': 'v'}])
+        body = json.loads(self.requests[0].content)
+        self.assertEqual('user', body['provider'])
+
+    @patch('asyncio.sleep', return_value=None)
+    async def test_retry(self, sleep_mock):
+        self._add('GET', '/v2/storage/buckets', {}, status=502)
+        self._add('GET', '/v2/storage/buckets', buckets_list_response)
+        buckets = await self.client.buckets.list()
+        self.assertEqual(buckets_list_response, buckets)
+        self.assertEqual(2, len(self.requests))
+
+    async def test_error(self):
+        self._add('GET', '/v2/storage/buckets', {'error': 'Unauthorized'}, status=401)
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self.client.buckets.list()
+
+    @patch('asyncio.sleep', return_value=None)
+    async def test_job_blocking(self, sleep_mock):
+        for _ in range(2):
+            self._add('GET', '/v2/storage/jobs/22077337', {'status': 'processing'})
+        self._add('GET', '/v2/storage/jobs/22077337', job_detail_response)
+        job = await self.client.jobs.block_until_completed(22077337)
+        self.assertEqual('success', job['status'])
+        self.assertEqual(2, sleep_mock.call_count)
+
+    @patch('asyncio.sleep', return_value=None)
+    async def test_events(self, sleep_mock):
+        emitted = []
+        self.client.events.subscribe(lambda name, fields: emitted.append((name, fields)))
+        self._add('GET', '/v2/storage/jobs/22077337', {}, status=502)
+        self._add('GET', '/v2/storage/jobs/22077337', job_detail_response)
+        await self.client.jobs.block_until_completed(22077337)
+        self.assertEqual(['request_start', 'retry', 'request_end', 'job_wait'], [name for name, _ in emitted])
+        self.assertEqual((200, 1), (emitted[2][1]['status_code'], emitted[2][1]['retries']))
+        self.assertEqual(('success', 1), (emitted[3][1]['status'], emitted[3][1]['polls']))
+
+    @patch('kbcstorage.jobs.POLL_INTERVAL_MIN', 0.01)
+    async def test_jobs_wait_all(self):
+        self._add('GET', '/v2/storage/jobs/1', {'id': 1, 'status': 'processing'})
+        self._add('GET', '/v2/storage/jobs/1', {'id': 1, 'status': 'success'})
+        self._add('GET', '/v2/storage/jobs/2', {'id': 2, 'status': 'error'})
+        jobs = await self.client.jobs.wait_all([1, 2])
+        self.assertEqual([1, 2], [job['id'] for job in jobs])
+        completed = [job['id'] async for job in self.client.jobs.as_completed([1, 2])]
+        self.assertEqual([1, 2], sorted(completed))
+
+    @patch('kbcstorage.jobs.POLL_INTERVAL_MIN', 0.01)
+    async def test_jobs_timeout(self):
+        """
+        Waits past the deadline raise the builtin TimeoutError as Jobs does.
+        """
+        self._add('GET', '/v2/storage/jobs/1', {'id': 1, 'status': 'success'})
+        self._add('GET', '/v2/storage/jobs/2', {'id': 2, 'status': 'processing'})
+        with self.assertRaisesRegex(TimeoutError, r'^Jobs 2 did not complete in 0.1 seconds.$') as context:
+            await self.client.jobs.wait_all([1, 2], timeout=0.1)
+        self.assertIs(TimeoutError, type(context.exception))
+        with self.assertRaisesRegex(TimeoutError, r'^Jobs 2 did not complete'):
+            [job async for job in self.client.jobs.as_completed([1, 2], timeout=0.1)]
+        with self.assertRaisesRegex(TimeoutError, r'^Jobs 2 did not complete'):
+            await self.client.jobs.wait_any([2], timeout=0.1)
+
+    async def test_delete(self):
+        self._add('DELETE', '/v2/storage/tables/in.c-main.table', None, status=204)
+        await self.client.tables.delete('in.c-main.table')
+        self.assertEqual('DELETE', self.requests[0].method)
+
+    async def test_iter_list(self):
+        self._add('GET', '/v2/storage/buckets', buckets_list_response)
+        buckets = [bucket async for bucket in self.client.buckets.iter_list()]
+        self.assertEqual(buckets_list_response, buckets)
+
+    async def test_load_rows(self):
+        self._add('POST', '/v2/storage/files/prepare', {
+            'id': 789, 'name': 'table.csv.gz', 'provider': 'aws', 'region': 'us-east-1',
+            'uploadParams': {'bucket': 'kbc-sapi-files', 'key': 'exp-2/789.table.csv.gz', 'acl': 'private',
+                             'x-amz-server-side-encryption': 'AES256',
+                             'credentials': {'AccessKeyId': 'key', 'SecretAccessKey': 'secret',
+                                             'SessionToken': 'token'}}
+        })
+        self._add('POST', '/v2/storage/tables/in.c-main.table/import-async', {'id': 123, 'status': 'waiting'})
+        self._add('GET', '/v2/storage/jobs/123', {'id': 123, 'status': 'success', 'results': {'totalRowsCount': 2}})
+        s3 = MagicMock()
+        with patch('boto3.resource', return_value=s3):
+            results = await self.client.tables.load_rows('in.c-main.table', [[1, 'a'], [2, 'b']], ['id', 'name'],
+                                                         is_incremental=True)
+        self.assertEqual({'totalRowsCount': 2}, results)
+        body = s3.Object.return_value.put.call_args.kwargs['Body'].getvalue()
+        self.assertEqual(b'id,name\n1,a\n2,b\n', gzip.decompress(body))
+
+    def _add_export(self, slices):
+        """
+        Mock an export job of in.c-main.table into a sliced file on AWS.
+        """
+        self._add('POST', '/v2/storage/tables/in.c-main.table/export-async', {'id': 123, 'status': 'waiting'})
+        self._add('GET', '/v2/storage/jobs/123', {'id': 123, 'status': 'success', 'results': {'file': {'id': 456}}})
+        self._add('GET', '/v2/storage/files/456', {
+            'id': 456, 'name': 'table.csv.gz', 'provider': 'aws', 'isSliced': True,
+            'url': 'https://kbc-sapi-files.s3.amazonaws.com/exp-2/456.csv.gzmanifest',
+            'region': 'us-east-1', 's3Path': {'bucket': 'kbc-sapi-files', 'key': 'exp-2/456.csv.gz'},
+            'credentials': {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token'}
+        })
+        s3 = MagicMock()
+        s3.meta.client.get_object.side_effect = lambda Bucket, Key: {'Body': io.BytesIO(gzip.compress(slices[Key]))}
+        # the manifest is downloaded with requests
+        manifest = responses.RequestsMock()
+        manifest.add(responses.GET, 'https://kbc-sapi-files.s3.amazonaws.com/exp-2/456.csv.gzmanifest',
+                     json={'entries': [{'url': 's3://kbc-sapi-files/' + key} for key in slices]})
+        return s3, manifest
+
+    async def test_export_iter(self):
+        s3, manifest = self._add_export({
+            'exp-2/456.csv.gz0000_part_00': b'"1","first"\n"2","second"\n',
+            'exp-2/456.csv.gz0001_part_00': b'"3","third"\n',
+        })
+        with manifest, patch('boto3.resource', return_value=s3):
+            rows = [row async for row in await self.client.tables.export_iter('in.c-main.table')]
+            self.assertEqual([['1', 'first'], ['2', 'second'], ['3', 'third']], rows)
+            batches = [batch async for batch in await self.client.tables.export_iter('in.c-main.table',
+                                                                                     batch_size=2)]
+            self.assertEqual([[['1', 'first'], ['2', 'second']], [['3', 'third']]], batches)
+
+    async def test_export_iter_cancelled(self):
+        """
+        Cancelled iteration closes the rows once the batch being read is done
+        """
+        reading = threading.Event()
+        release = threading.Event()
+        closed = []
+
+        def batches():
+            try:
+                yield [['1', 'first']]
+                reading.set()
+                release.wait(5)
+                yield [['2', 'second']]
+            finally:
+                closed.append(True)
+
+        async def consume():
+            async for _ in self.client.tables._iter_batches(batches(), True):
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.get_running_loop().run_in_executor(None, reading.wait, 5)
+        task.cancel()
+        await asyncio.wait([task], timeout=0.1)
+        self.assertFalse(task.done())
+        release.set()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual([True], closed)
+
+    async def test_open_slices(self):
+        s3, manifest = self._add_export({
+            'exp-2/456.csv.gz0000_part_00': b'"1","first"\n',
+            'exp-2/456.csv.gz0001_part_00': b'"2","second"\n',
+        })
+        with manifest, patch('boto3.resource', return_value=s3):
+            slice_openers = await self.client.files.open_slices(456)
+        self.assertEqual([b'"1","first"\n', b'"2","second"\n'],
+                         [gzip.decompress(open_slice().read()) for open_slice in slice_openers])
+
+    async def test_submit_export(self):
+        """
+        Submitted exports run as tasks, at most max_workers of them at once
+        """
+        tables = AsyncTables('https://connection.keboola.com/', 'dummy_token', transport=self.client._transport,
+                             max_workers=2)
+        running = []
+        peak = []
+
+        async def export(table_id):
+            running.append(table_id)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(table_id)
+            return table_id
+
+        with patch.object(tables, 'export', export):
+            tasks = [tables.submit_export('in.c-main.table{}'.format(index)) for index in range(5)]
+            self.assertIsInstance(tasks[0], asyncio.Task)
+            self.assertEqual(['in.c-main.table{}'.format(index) for index in range(5)],
+                             await asyncio.gather(*tasks))
+        self.assertEqual(2, max(peak))
+
+    @unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+    async def test_export_arrow_off_loop(self):
+        """
+        The slices of Arrow and Parquet exports are resolved off the loop.
+        """
+        self._add('GET', '/v2/storage/tables/in.c-main.table',
+                  {'id': 'in.c-main.table', 'name': 'table', 'columns': ['id', 'name']})
+        s3, manifest = self._add_export({
+            'exp-2/456.csv.gz0000_part_00': b'"1","first"\n',
+            'exp-2/456.csv.gz0001_part_00': b'"2","second"\n',
+        })
+        threads = []
+        get_slice_openers = Files._get_slice_openers
+
+        def record_thread(files, file_info):
+            threads.append(threading.get_ident())
+            return get_slice_openers(files, file_info)
+
+        with manifest, patch('boto3.resource', return_value=s3), \
+                patch.object(Files, '_get_slice_openers', record_thread), tempfile.TemporaryDirectory() as path_name:
+            table = await self.client.tables.export_arrow('in.c-main.table')
+            path = await self.client.tables.export_parquet('in.c-main.table', os.path.join(path_name, 'table.parquet'))
+            self.assertEqual(table, pyarrow.parquet.read_table(path))
+        self.assertEqual({'id': ['1', '2'], 'name': ['first', 'second']}, table.to_pydict())
+        self.assertEqual(2, len(threads))
+        self.assertNotIn(threading.get_ident(), threads)
@@ -0,0 +1,97 @@
+"""
+Test the cache of responses of read-only endpoints.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import responses
+
+from kbcstorage.cache import MemoryCache, ResponseCache, SqliteCache
+from kbcstorage.client import Client
+
+from .table_responses import list_response
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Test that the client serves metadata from the cache.
+    """
+    url = 'https://connection.keboola.com/v2/storage/tables'
+
+    def setUp(self):
+        self.client = Client('https://connection.keboola.com', 'token', cache=ResponseCache(ttl=60))
+
+    def tearDown(self):
+        self.client.close()
+
+    @responses.activate
+    def test_fresh(self):
+        """
+        Fresh responses are served without a request, as new copies.
+        """
+        responses.add(responses.GET, self.url, json=list_response)
+        first = self.client.tables.list()
+        first.clear()
+        self.assertEqual(list_response, self.client.tables.list())
+        self.assertEqual(1, len(responses.calls))
+
+    @responses.activate
+    def test_revalidate(self):
+        """
+        Stale responses are revalidated with their ETag.
+        """
+        responses.add(responses.GET, self.url, json=list_response, headers={'ETag': '"v1"'})
+        responses.add(responses.GET, self.url, status=304)
+        self.client.tables.list()
+        with patch('time.time', return_value=10 ** 10):
+            self.assertEqual(list_response, self.client.tables.list())
+        self.assertEqual('"v1"', responses.calls[1].request.headers['If-None-Match'])
+
+    @responses.activate
+    def test_invalidate_on_write(self):
+        """
+        Writes drop the cached responses of their group of endpoints.
+        """
+        responses.add(responses.GET, self.url, json=list_response)
+        responses.add(responses.DELETE, self.url + '/in.c-bucket.table', status=204)
+        self.client.tables.list()
+        self.client.tables.delete('in.c-bucket.table')
+        self.client.tables.list()
+        self.assertEqual(3, len(responses.calls))
+
+    @responses.activate
+    def test_jobs_not_cached(self):
+        """
+        Jobs are not cached and their completion drops storage responses.
+        """
+        job_url = 'https://connection.keboola.com/v2/storage/jobs/1'
+        responses.add(responses.GET, self.url, json=list_response)
+        responses.add(responses.GET, job_url, json={'id': 1, 'status': 'processing'})
+        responses.add(responses.GET, job_url, json={'id': 1, 'status': 'success'})
+        self.client.tables.list()
+        self.client.jobs.detail(1)
+        self.client.tables.list()
+        self.client.jobs.detail(1)
+        self.client.tables.list()
+        self.assertEqual(4, len(responses.calls))
+
+    def test_backends(self):
+        """
+        Both backends evict the least recently used responses.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sqlite_cache = SqliteCache(os.path.join(tmp_dir, 'cache.db'), max_entries=2)
+            for backend in (MemoryCache(max_entries=2), sqlite_cache):
+                with self.subTest(backend=type(backend).__name__):
+                    cache = ResponseCache(backend)
+                    for key in ('a', 'b'):
+                        cache.update(key, self.url, None, 200, {}, '[]')
+                    cache.get('a')
+                    cache.update('c', self.url, None, 200, {}, '[]')
+                    self.assertIsNone(cache.get('b'))
+                    self.assertEqual([], cache.get('a').body)
+                    cache.invalidate(self.url)
+                    self.assertIsNone(cache.get('a'))
+            sqlite_cache.close()
@@ -0,0 +1,72 @@
+"""
+Test the index of the tables of a project.
+"""
+import copy
+import unittest
+
+import responses
+
+from kbcstorage.catalog import Catalog
+from kbcstorage.tables import Tables
+
+
+def _table(table_id, columns, last_change='2024-01-01T00:00:00+0100', attributes=()):
+    bucket_id = table_id.rsplit('.', 1)[0]
+    return {
+        'id': table_id,
+        'name': table_id.rsplit('.', 1)[1],
+        'lastChangeDate': last_change,
+        'columns': list(columns),
+        'attributes': [{'name': name, 'value': value, 'protected': False} for name, value in attributes],
+        'bucket': {'id': bucket_id, 'name': bucket_id.split('.', 1)[1], 'stage': bucket_id.split('.')[0]}
+    }
+
+
+class TestCatalog(unittest.TestCase):
+    """
+    Test loading, lookups and incremental refresh of the catalog.
+    """
+    url = 'https://connection.keboola.com/v2/storage/tables'
+
+    def setUp(self):
+        self.tables = [
+            _table('in.c-main.orders', ['id', 'customer_id'], attributes=[('owner', 'sales')]),
+            _table('in.c-main.customers', ['id', 'name']),
+            _table('out.c-report.orders', ['id', 'total'], attributes=[('owner', 'finance')]),
+        ]
+        self.catalog = Catalog(Tables('https://connection.keboola.com', 'token'))
+
+    @responses.activate
+    def test_load(self):
+        responses.add(responses.GET, self.url + '?include=columns%2Cbuckets%2Cattributes', json=self.tables)
+        self.catalog.load()
+        self.assertEqual(3, len(self.catalog))
+        self.assertEqual(['id', 'name'], self.catalog.get('in.c-main.customers')['columns'])
+        self.assertEqual('c-report', self.catalog.get_bucket('out.c-report')['name'])
+        self.assertEqual({'in.c-main.orders', 'in.c-main.customers'}, self.catalog.tables_in_bucket('in.c-main'))
+        self.assertEqual({'in.c-main.orders', 'out.c-report.orders'}, self.catalog.tables_named('orders'))
+        self.assertEqual({'in.c-main.orders'}, self.catalog.tables_with_column('customer_id'))
+        self.assertEqual({'out.c-report.orders'}, self.catalog.tables_with_attribute('owner', 'finance'))
+        self.assertEqual(2, len(self.catalog.tables_with_attribute('owner')))
+        self.assertEqual(['in.c-main.missing'], self.catalog.missing(['in.c-main.orders', 'in.c-main.missing']))
+
+    @responses.activate
+    def test_refresh(self):
+        """
+        Only the changed tables are fetched on refresh.
+        """
+        responses.add(responses.GET, self.url + '?include=columns%2Cbuckets%2Cattributes', json=self.tables)
+        changed = _table('in.c-main.customers', ['id', 'name', 'email'], last_change='2024-02-01T00:00:00+0100')
+        added = _table('in.c-main.items', ['id'])
+        listing = [copy.deepcopy(self.tables[0]), changed, added]
+        responses.add(responses.GET, self.url, json=listing)
+        responses.add(responses.GET, self.url + '/in.c-main.customers', json=changed)
+        responses.add(responses.GET, self.url + '/in.c-main.items', json=added)
+        self.catalog.load()
+
+        self.assertEqual({'in.c-main.customers', 'in.c-main.items', 'out.c-report.orders'}, self.catalog.refresh())
+        self.assertEqual(4, len(responses.calls))
+        self.assertNotIn('out.c-report.orders', self.catalog)
+        self.assertEqual({'in.c-main.customers'}, self.catalog.tables_with_column('email'))
+        self.assertEqual({'in.c-main.orders'}, self.catalog.tables_named('orders'))
+        self.assertEqual(set(), self.catalog.tables_with_attribute('owner', 'finance'))
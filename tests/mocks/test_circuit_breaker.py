@@ -0,0 +1,92 @@
+"""
+Test the circuit breaker of the transport.
+"""
+import unittest
+from unittest.mock import patch
+
+import responses
+
+from kbcstorage.circuit_breaker import CircuitBreaker, CircuitOpenError
+from kbcstorage.client import Client
+from kbcstorage.retry_requests import RetryPolicy, RetryRequests
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test that the circuit opens on failures and closes after a probe.
+    """
+    url = 'https://connection.keboola.com/v2/storage/tables'
+
+    @patch('time.monotonic', return_value=100.0)
+    def test_states(self, monotonic_mock):
+        breaker = CircuitBreaker(failure_rate=0.5, window_size=4, min_calls=4, open_timeout=10)
+        for success in (True, False, True):
+            breaker.record(success)
+        self.assertEqual('closed', breaker.state)
+        breaker.record(False)
+        self.assertEqual('open', breaker.state)
+        with self.assertRaises(CircuitOpenError) as context:
+            breaker.before_request()
+        self.assertEqual(10, context.exception.retry_in)
+
+        monotonic_mock.return_value = 110.0
+        self.assertEqual('half_open', breaker.state)
+        breaker.before_request()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record(False)
+        self.assertEqual('open', breaker.state)
+
+        monotonic_mock.return_value = 120.0
+        breaker.before_request()
+        breaker.record(True)
+        self.assertEqual('closed', breaker.state)
+        breaker.before_request()
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_fail_fast(self, sleep_mock):
+        """
+        Failed requests open the circuit, and then requests fail fast.
+        """
+        responses.add(responses.Response(method='GET', url=self.url, json={}, status=502))
+        breaker = CircuitBreaker(window_size=4, min_calls=4)
+        transport = RetryRequests(retry_policy=RetryPolicy(max_attempts=3), circuit_breaker=breaker)
+        for _ in range(3):
+            self.assertEqual(502, transport.get(self.url).status_code)
+            self.assertEqual('closed', breaker.state)
+        self.assertEqual(502, transport.get(self.url).status_code)
+        self.assertEqual(12, len(responses.calls))
+        self.assertEqual('open', breaker.state)
+        with self.assertRaises(CircuitOpenError):
+            transport.get(self.url)
+        self.assertEqual(12, len(responses.calls))
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_open_while_retrying(self, sleep_mock):
+        """
+        A request stops retrying with its last response when the circuit
+        opens meanwhile.
+        """
+        breaker = CircuitBreaker(window_size=4, min_calls=4)
+
+        def fail(request):
+            # other requests fail meanwhile
+            for _ in range(4):
+                breaker.record(False)
+            return 502, {}, '{}'
+
+        responses.add_callback(responses.GET, self.url, callback=fail)
+        transport = RetryRequests(retry_policy=RetryPolicy(max_attempts=10), circuit_breaker=breaker)
+        self.assertEqual(502, transport.get(self.url).status_code)
+        self.assertEqual(1, len(responses.calls))
+
+    def test_client_state(self):
+        client = Client('https://connection.keboola.com', 'token')
+        self.assertIsNone(client._transport.circuit_breaker)
+        self.assertEqual('closed', client.circuit_state)
+        client.close()
+        client = Client('https://connection.keboola.com', 'token', circuit_breaker=CircuitBreaker())
+        self.assertEqual('closed', client.circuit_state)
+        client.close()
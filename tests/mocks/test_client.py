@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import unittest
 
 from kbcstorage.client import Client
@@ -14,3 +16,48 @@ class TestClient(unittest.TestCase):
     def test_url_trimmed(self):
         client = Client('https://example.com/', 'password')
         self.assertEqual(client.root_url, 'https://example.com')
+
+    def test_endpoints_share_transport(self):
+        client = Client('https://example.com', 'password')
+        endpoints = [client.buckets, client.files, client.jobs, client.tables, client.tables.metadata,
+                     client.workspaces, client.components, client.configurations,
+                     client.configurations.metadata, client.tokens, client.branches, client.triggers]
+        for endpoint in endpoints:
+            with self.subTest(endpoint=type(endpoint).__name__):
+                self.assertIs(client.session, endpoint.requests.session)
+
+    def test_pool_maxsize(self):
+        client = Client('https://example.com', 'password', pool_maxsize=25)
+        adapter = client.session.get_adapter('https://example.com')
+        self.assertEqual(25, adapter._pool_maxsize)
+
+    def test_transfer_settings(self):
+        client = Client('https://example.com', 'password', transfer_max_workers=2,
+                        upload_part_size=8 * 1024 * 1024, max_part_retries=1)
+        for files in [client.files, client.tables.files]:
+            with self.subTest(endpoint=type(files).__name__):
+                self.assertEqual(2, files.max_workers)
+                self.assertEqual(8 * 1024 * 1024, files.upload_part_size)
+                self.assertEqual(1, files.max_part_retries)
+                self.assertIs(client.session, files.requests.session)
+
+    def test_endpoints_lazy(self):
+        client = Client('https://example.com', 'password')
+        self.assertNotIn('tables', vars(client))
+        self.assertIs(client.tables, client.tables)
+        self.assertIn('tables', vars(client))
+
+    def test_without_file_storage(self):
+        client = Client('https://example.com', 'password', file_storage_support=False)
+        self.assertFalse(hasattr(client, 'files'))
+
+    def test_cloud_libraries_not_imported(self):
+        """
+        The libraries of the storage backends are imported only when a file
+        is transferred.
+        """
+        code = ('import sys; from kbcstorage.client import Client; '
+                'Client("https://example.com", "password").tables; '
+                'print(sorted({m.split(".")[0] for m in sys.modules} & {"boto3", "azure", "google"}))')
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+        self.assertEqual('[]', output.strip())
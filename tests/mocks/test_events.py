@@ -0,0 +1,132 @@
+"""
+Test the events of requests, job waits and file transfers.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import responses
+
+from kbcstorage.events import Events
+from kbcstorage.files import Files
+from kbcstorage.jobs import Jobs
+from kbcstorage.retry_requests import RetryRequests
+from kbcstorage.tables import Tables
+
+from . import test_tables
+from .test_files import MANIFEST_URL, _sliced_file_info
+
+URL = 'https://connection.keboola.com/v2/storage/jobs/123'
+
+
+class TestEvents(unittest.TestCase):
+    def setUp(self):
+        self.events = Events()
+        self.emitted = []
+        self.events.subscribe(lambda name, fields: self.emitted.append((name, fields)))
+        self.transport = RetryRequests(events=self.events)
+
+    def get(self, name):
+        return [fields for emitted_name, fields in self.emitted if emitted_name == name]
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_request(self, sleep_mock):
+        """
+        A request emits its start, its retries and its end.
+        """
+        responses.add(responses.GET, URL, status=503)
+        responses.add(responses.GET, URL, json={'id': 123})
+        self.transport.get(URL)
+        self.assertEqual(['request_start', 'retry', 'request_end'], [name for name, _ in self.emitted])
+        self.assertEqual({'method': 'GET', 'url': URL}, self.get('request_start')[0])
+        retry = self.get('retry')[0]
+        self.assertEqual((1, 503, None), (retry['attempt'], retry['status_code'], retry['error']))
+        end = self.get('request_end')[0]
+        self.assertEqual(200, end['status_code'])
+        self.assertIsNone(end['error'])
+        self.assertEqual(1, end['retries'])
+        self.assertEqual(retry['delay'], end['backoff_seconds'])
+        self.assertEqual(len(b'{"id": 123}'), end['bytes_received'])
+
+    @responses.activate
+    def test_request_error(self):
+        responses.add(responses.POST, URL, body=ValueError('Invalid body'))
+        with self.assertRaises(ValueError):
+            self.transport.post(URL, data='abc')
+        end = self.get('request_end')[0]
+        self.assertEqual((None, 'ValueError'), (end['status_code'], end['error']))
+
+    @responses.activate
+    def test_subscribe_names(self):
+        """
+        Subscribers get only the events they subscribed to, and unsubscribed
+        ones get none.
+        """
+        responses.add(responses.GET, URL, json={})
+        callback = self.events.subscribe(MagicMock(), ['request_end'])
+        self.transport.get(URL)
+        self.assertEqual(['request_end'], [call.args[0] for call in callback.call_args_list])
+        self.events.unsubscribe(callback)
+        self.transport.get(URL)
+        self.assertEqual(1, callback.call_count)
+
+    @responses.activate
+    def test_subscriber_failure(self):
+        """
+        A failing subscriber does not fail the request.
+        """
+        responses.add(responses.GET, URL, json={})
+        self.events.subscribe(MagicMock(side_effect=RuntimeError('Subscriber failed')))
+        with self.assertLogs('kbcstorage.events', 'ERROR'):
+            self.assertEqual(200, self.transport.get(URL).status_code)
+
+    @responses.activate
+    def test_job_wait(self):
+        responses.add(responses.GET, URL, json={'id': 123, 'status': 'success'})
+        Jobs('https://connection.keboola.com', 'token', transport=self.transport).block_until_completed(123)
+        job_wait = self.get('job_wait')[0]
+        self.assertEqual((123, 'success', 1, None), (job_wait['job_id'], job_wait['status'], job_wait['polls'],
+                                                     job_wait['error']))
+        self.assertGreaterEqual(job_wait['seconds'], 0)
+
+    @responses.activate
+    def test_file_transfer(self):
+        """
+        A sliced download emits the download of each slice, the merge and
+        the whole download.
+        """
+        file_info = _sliced_file_info(2)
+        responses.add(responses.GET, MANIFEST_URL, json=file_info['manifest'])
+        s3 = MagicMock()
+        s3.meta.client.download_file.side_effect = lambda bucket, key, path: open(path, 'w').close()
+        files = Files('https://connection.keboola.com', 'token', transport=self.transport)
+        with tempfile.TemporaryDirectory() as temp_dir, patch('boto3.resource', return_value=s3):
+            files._download(file_info, os.path.join(temp_dir, 'table.csv'))
+        transfers = self.get('file_transfer')
+        self.assertEqual(['download_slice', 'download_slice', 'merge', 'download'],
+                         [fields['phase'] for fields in transfers])
+        self.assertEqual([0, 1], sorted(fields['slice'] for fields in transfers[:2]))
+        self.assertEqual({(123, 'aws', 0)}, {(fields['file_id'], fields['provider'], fields['bytes'])
+                                             for fields in transfers})
+
+    @responses.activate
+    def test_export_to_file(self):
+        """
+        The download of a table export has the provider of its file.
+        """
+        s3 = test_tables.TestTablesEndpointWithMocks._add_export_responses(
+            {'exp-2/456.csv.gz0000_part_00': b'"1","first"\n'})
+        tables = Tables('https://connection.keboola.com', 'token', transport=self.transport)
+        with tempfile.TemporaryDirectory() as path_name, patch('boto3.resource', return_value=s3):
+            tables.export_to_file('in.c-main.table', path_name)
+        transfer = self.get('file_transfer')[0]
+        self.assertEqual(('download', 456, 'aws'), (transfer['phase'], transfer['file_id'], transfer['provider']))
+
+    @responses.activate
+    def test_without_subscribers(self):
+        responses.add(responses.GET, URL, json={})
+        events = MagicMock(enabled=False)
+        RetryRequests(events=events).get(URL)
+        events.emit.assert_not_called()
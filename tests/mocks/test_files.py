@@ -0,0 +1,418 @@
+"""
+Test basic functionality of the Files endpoint
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs
+
+import botocore.exceptions
+import responses
+
+from kbcstorage.files import Files, _append_file
+
+UPLOAD_RESOURCE = {
+    'id': 789,
+    'name': 'table.csv',
+    'provider': 'aws',
+    'region': 'us-east-1',
+    'uploadParams': {
+        'bucket': 'kbc-sapi-files', 'key': 'exp-2/789.table.csv', 'acl': 'private',
+        'x-amz-server-side-encryption': 'AES256',
+        'credentials': {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token'}
+    }
+}
+MANIFEST_URL = 'https://kbc-sapi-files.s3.amazonaws.com/exp-2/123.csv.gzmanifest'
+
+
+def _sliced_file_info(slice_count):
+    return {
+        'id': 123,
+        'name': 'table.csv.gz',
+        'provider': 'aws',
+        'isSliced': True,
+        'url': MANIFEST_URL,
+        'region': 'us-east-1',
+        'credentials': {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token'},
+        's3Path': {'bucket': 'kbc-sapi-files', 'key': 'exp-2/123.csv.gz'},
+        'manifest': {
+            'entries': [{'url': 's3://kbc-sapi-files/exp-2/123.csv.gz000{}_part_00'.format(index)}
+                        for index in range(slice_count)]
+        }
+    }
+
+
+class TestFilesEndpointWithMocks(unittest.TestCase):
+    """
+    Test the methods of a Files endpoint instance with mock responses
+    """
+    def setUp(self):
+        token = 'dummy_token'
+        base_url = 'https://connection.keboola.com/'
+        self.files = Files(base_url, token, max_workers=4)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.s3 = MagicMock()
+        self.s3.meta.client.download_file.side_effect = self._download_file
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def _download_file(bucket, key, path):
+        if key.endswith('_fail'):
+            raise IOError('Slice download failed')
+        with open(path, 'w') as slice_file:
+            slice_file.write(key.split('.gz')[1] + '\n')
+
+    @responses.activate
+    def test_download_sliced_aws(self):
+        """
+        Slices are downloaded concurrently and merged in manifest order
+        """
+        file_info = _sliced_file_info(10)
+        responses.add(responses.Response(method='GET', url=MANIFEST_URL, json=file_info['manifest']))
+        destination = os.path.join(self.temp_dir.name, 'table.csv')
+        with patch('boto3.resource', return_value=self.s3):
+            self.files._download(file_info, destination)
+        with open(destination) as merged_file:
+            expected = ''.join('000{}_part_00\n'.format(index) for index in range(10))
+            self.assertEqual(expected, merged_file.read())
+        self.assertEqual(['table.csv'], os.listdir(self.temp_dir.name))
+        self.assertEqual(10, self.s3.meta.client.download_file.call_count)
+
+    @responses.activate
+    def test_download_sliced_aws_failure(self):
+        """
+        Downloaded slices are removed when any slice fails
+        """
+        file_info = _sliced_file_info(3)
+        file_info['manifest']['entries'][1]['url'] += '_fail'
+        responses.add(responses.Response(method='GET', url=MANIFEST_URL, json=file_info['manifest']))
+        destination = os.path.join(self.temp_dir.name, 'table.csv')
+        with patch('boto3.resource', return_value=self.s3), self.assertRaises(IOError):
+            self.files._download(file_info, destination)
+        self.assertEqual([], os.listdir(self.temp_dir.name))
+
+    @responses.activate
+    def test_download_single_slice_aws(self):
+        """
+        A single slice becomes the destination file without copying
+        """
+        file_info = _sliced_file_info(1)
+        responses.add(responses.Response(method='GET', url=MANIFEST_URL, json=file_info['manifest']))
+        destination = os.path.join(self.temp_dir.name, 'table.csv')
+        with patch('boto3.resource', return_value=self.s3):
+            self.files._download(file_info, destination)
+        with open(destination) as merged_file:
+            self.assertEqual('0000_part_00\n', merged_file.read())
+
+    def test_append_file_fallback(self):
+        """
+        Appending falls back to user space copying when the kernel refuses
+        """
+        source = os.path.join(self.temp_dir.name, 'source')
+        destination = os.path.join(self.temp_dir.name, 'destination')
+        with open(source, 'wb') as source_file:
+            source_file.write(os.urandom(3 * 1024 * 1024))
+        with open(destination, 'wb') as destination_file:
+            destination_file.write(b'header\n')
+        with patch('os.copy_file_range', side_effect=OSError, create=True), \
+                patch('os.sendfile', side_effect=OSError, create=True), \
+                patch('kbcstorage.files.COPY_CHUNK_SIZE', 1024 * 1024), \
+                open(source, 'rb', buffering=0) as in_file, \
+                open(destination, 'ab', buffering=0) as out_file:
+            _append_file(in_file.fileno(), out_file.fileno())
+        with open(source, 'rb') as source_file, open(destination, 'rb') as destination_file:
+            self.assertEqual(b'header\n' + source_file.read(), destination_file.read())
+
+    def _write_upload_file(self, size):
+        file_path = os.path.join(self.temp_dir.name, 'table.csv')
+        with open(file_path, 'wb') as upload_file:
+            upload_file.write(bytes(index % 256 for index in range(size)))
+        return file_path
+
+    @patch('time.sleep', return_value=None)
+    def test_upload_multipart_aws(self, sleep_mock):
+        """
+        Large files are uploaded in parts concurrently, a failed part is retried alone
+        """
+        file_path = self._write_upload_file(25)
+        uploaded = {}
+        failures = [IOError('Connection reset')]
+
+        def upload_part(Bucket, Key, UploadId, PartNumber, Body):
+            if PartNumber == 2 and failures:
+                raise failures.pop()
+            uploaded[PartNumber] = Body
+            return {'ETag': 'etag{}'.format(PartNumber)}
+
+        self.s3.meta.client.create_multipart_upload.return_value = {'UploadId': 'upload'}
+        self.s3.meta.client.upload_part.side_effect = upload_part
+        files = Files('https://connection.keboola.com/', 'dummy_token', upload_part_size=10)
+        with patch('boto3.resource', return_value=self.s3):
+            files._upload(UPLOAD_RESOURCE, file_path, is_encrypted=True)
+        self.s3.meta.client.create_multipart_upload.assert_called_once_with(
+            Bucket='kbc-sapi-files', Key='exp-2/789.table.csv', ACL='private',
+            ContentDisposition='attachment; filename=table.csv;', ServerSideEncryption='AES256')
+        self.s3.meta.client.complete_multipart_upload.assert_called_once_with(
+            Bucket='kbc-sapi-files', Key='exp-2/789.table.csv', UploadId='upload',
+            MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': 'etag{}'.format(number)}
+                                       for number in range(1, 4)]})
+        with open(file_path, 'rb') as upload_file:
+            self.assertEqual(upload_file.read(), b''.join(uploaded[number] for number in range(1, 4)))
+        self.assertEqual(4, self.s3.meta.client.upload_part.call_count)
+        self.assertFalse(self.s3.Object.called)
+
+    @patch('time.sleep', return_value=None)
+    def test_upload_multipart_aws_failure(self, sleep_mock):
+        """
+        A part failing all its attempts aborts the multipart upload
+        """
+        file_path = self._write_upload_file(25)
+        self.s3.meta.client.create_multipart_upload.return_value = {'UploadId': 'upload'}
+        self.s3.meta.client.upload_part.side_effect = IOError('Connection reset')
+        files = Files('https://connection.keboola.com/', 'dummy_token', max_workers=1,
+                      upload_part_size=10, max_part_retries=3)
+        with patch('boto3.resource', return_value=self.s3), self.assertRaises(IOError):
+            files._upload(UPLOAD_RESOURCE, file_path, is_encrypted=True)
+        part_numbers = [call.kwargs['PartNumber'] for call in self.s3.meta.client.upload_part.call_args_list]
+        self.assertEqual(3, part_numbers.count(1))
+        self.s3.meta.client.abort_multipart_upload.assert_called_once_with(
+            Bucket='kbc-sapi-files', Key='exp-2/789.table.csv', UploadId='upload')
+        self.assertFalse(self.s3.meta.client.complete_multipart_upload.called)
+
+    def test_upload_parts_buffered(self):
+        """
+        The next part is read only once a worker is free to upload it
+        """
+        buffered = []
+        peak = []
+        lock = threading.Lock()
+
+        def read_parts():
+            for number in range(1, 11):
+                with lock:
+                    buffered.append(number)
+                    peak.append(len(buffered))
+                yield str(number).encode()
+
+        def upload_part(number, data):
+            time.sleep(0.01)
+            with lock:
+                buffered.remove(number)
+            return number
+
+        files = Files('https://connection.keboola.com/', 'dummy_token', max_workers=3)
+        self.assertEqual(list(range(1, 11)), files._Files__upload_parts(read_parts(), upload_part))
+        self.assertEqual(3, max(peak))
+
+    def test_upload_blocks_azure(self):
+        """
+        Large files are staged as blocks on Azure and committed in order
+        """
+        file_path = self._write_upload_file(25)
+        file_resource = {
+            'id': 789, 'name': 'table.csv', 'provider': 'azure',
+            'absUploadParams': {'container': 'exp-2', 'blobName': '789.table.csv',
+                                'absCredentials': {'SASConnectionString': 'connection'}}
+        }
+        service_client = MagicMock()
+        blob_client = service_client.get_blob_client.return_value
+        files = Files('https://connection.keboola.com/', 'dummy_token', upload_part_size=10)
+        with patch('azure.storage.blob.BlobServiceClient.from_connection_string', return_value=service_client):
+            files._upload(file_resource, file_path, is_encrypted=True)
+        staged = {call.args[0]: call.args[1] for call in blob_client.stage_block.call_args_list}
+        blocks = blob_client.commit_block_list.call_args.args[0]
+        self.assertEqual(['00001', '00002', '00003'], [block.id for block in blocks])
+        with open(file_path, 'rb') as upload_file:
+            self.assertEqual(upload_file.read(), b''.join(staged[block.id] for block in blocks))
+        self.assertFalse(blob_client.upload_blob.called)
+
+    def _add_prepare_response(self):
+        responses.add(
+            responses.Response(
+                method='POST',
+                url='https://connection.keboola.com/v2/storage/files/prepare',
+                json=dict(UPLOAD_RESOURCE, name='table.csv.gz')
+            )
+        )
+
+    @responses.activate
+    def test_upload_file_compress(self):
+        """
+        Compressed files are gzipped in memory and their size is sent to prepare
+        """
+        file_path = self._write_upload_file(1000)
+        self._add_prepare_response()
+        with patch('boto3.resource', return_value=self.s3):
+            file_id = self.files.upload_file(file_path, compress=True)
+        self.assertEqual(789, file_id)
+        body = self.s3.Object.return_value.put.call_args.kwargs['Body'].getvalue()
+        with open(file_path, 'rb') as upload_file:
+            self.assertEqual(upload_file.read(), gzip.decompress(body))
+        prepare_body = parse_qs(responses.calls[0].request.body)
+        self.assertEqual(['table.csv.gz'], prepare_body['name'])
+        self.assertEqual([str(len(body))], prepare_body['sizeBytes'])
+        self.assertEqual(['table.csv'], os.listdir(self.temp_dir.name))
+
+    @responses.activate
+    @patch('kbcstorage.files.COMPRESS_CHUNK_SIZE', 100)
+    def test_upload_file_compress_multipart(self):
+        """
+        Compressed chunks are joined into parts of a multipart upload
+        """
+        file_path = self._write_upload_file(1000)
+        self._add_prepare_response()
+        uploaded = {}
+
+        def upload_part(Bucket, Key, UploadId, PartNumber, Body):
+            uploaded[PartNumber] = Body
+            return {'ETag': 'etag{}'.format(PartNumber)}
+
+        self.s3.meta.client.create_multipart_upload.return_value = {'UploadId': 'upload'}
+        self.s3.meta.client.upload_part.side_effect = upload_part
+        files = Files('https://connection.keboola.com/', 'dummy_token', upload_part_size=200)
+        with patch('boto3.resource', return_value=self.s3):
+            files.upload_file(file_path, compress=True)
+        self.assertGreater(len(uploaded), 1)
+        with open(file_path, 'rb') as upload_file:
+            self.assertEqual(upload_file.read(),
+                             gzip.decompress(b''.join(uploaded[number] for number in sorted(uploaded))))
+        self.assertNotIn('sizeBytes', parse_qs(responses.calls[0].request.body))
+        self.assertTrue(self.s3.meta.client.complete_multipart_upload.called)
+
+    @responses.activate
+    def test_upload_sliced_file(self):
+        """
+        Slices are uploaded compressed next to a manifest listing them in order
+        """
+        file_path = self._write_upload_file(30)
+        responses.add(
+            responses.Response(
+                method='POST',
+                url='https://connection.keboola.com/v2/storage/files/prepare',
+                json=dict(UPLOAD_RESOURCE, name='table.csv.gz')
+            )
+        )
+        objects = {}
+        self.s3.Object.side_effect = lambda bucket_name, key: objects.setdefault(key, MagicMock())
+        with patch('boto3.resource', return_value=self.s3):
+            file_id = self.files.upload_sliced_file('table.csv', [(file_path, 0, 10), (file_path, 10, 20)])
+        self.assertEqual(789, file_id)
+        self.assertEqual(['1'], parse_qs(responses.calls[0].request.body)['isSliced'])
+        bodies = {key: s3_object.put.call_args.kwargs['Body'].getvalue() for key, s3_object in objects.items()}
+        manifest = json.loads(bodies.pop('exp-2/789.table.csvmanifest'))
+        self.assertEqual([{'url': 's3://kbc-sapi-files/exp-2/789.table.csvpart0000.gz', 'mandatory': True},
+                          {'url': 's3://kbc-sapi-files/exp-2/789.table.csvpart0001.gz', 'mandatory': True}],
+                         manifest['entries'])
+        with open(file_path, 'rb') as upload_file:
+            data = upload_file.read()
+        self.assertEqual(data[:10], gzip.decompress(bodies['exp-2/789.table.csvpart0000.gz']))
+        self.assertEqual(data[10:], gzip.decompress(bodies['exp-2/789.table.csvpart0001.gz']))
+
+    def test_upload_sliced_file_parts(self):
+        """
+        Slices uploaded in parallel upload their parts one by one
+        """
+        file_path = self._write_upload_file(60)
+        running = {}
+        peaks = {}
+        lock = threading.Lock()
+
+        def upload_part(Bucket, Key, UploadId, PartNumber, Body):
+            with lock:
+                running[Key] = running.get(Key, 0) + 1
+                peaks[Key] = max(peaks.get(Key, 0), running[Key])
+            time.sleep(0.01)
+            with lock:
+                running[Key] -= 1
+            return {'ETag': 'etag{}'.format(PartNumber)}
+
+        self.s3.meta.client.create_multipart_upload.return_value = {'UploadId': 'upload'}
+        self.s3.meta.client.upload_part.side_effect = upload_part
+        files = Files('https://connection.keboola.com/', 'dummy_token', max_workers=4, upload_part_size=10)
+        with patch('boto3.resource', return_value=self.s3):
+            files._upload_slices(UPLOAD_RESOURCE, [(file_path, 0, 30), (file_path, 30, 30)], is_encrypted=True,
+                                 compress=False)
+        self.assertEqual({'exp-2/789.table.csvpart0000': 1, 'exp-2/789.table.csvpart0001': 1}, peaks)
+        self.assertEqual(6, self.s3.meta.client.upload_part.call_count)
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_open_slices_resume(self, sleep_mock):
+        """
+        A slice failing while read is reopened from where it stopped, a
+        missing slice is not retried
+        """
+        data = b'"1","first"\n"2","second"\n'
+        ranges = []
+
+        class BrokenBody:
+            def __init__(self, content, truncated):
+                self.content = content
+                self.truncated = truncated
+
+            def read(self, size=-1):
+                if not self.content and self.truncated:
+                    raise IOError('Connection reset')
+                chunk, self.content = self.content[:5], self.content[5:]
+                return chunk
+
+            def close(self):
+                pass
+
+        def get_object(Bucket, Key, Range=None):
+            ranges.append(Range)
+            if Key.endswith('0001_part_00'):
+                raise botocore.exceptions.ClientError({'Error': {'Code': 'NoSuchKey'},
+                                                       'ResponseMetadata': {'HTTPStatusCode': 404}}, 'GetObject')
+            offset = int(Range[len('bytes='):-1]) if Range else 0
+            return {'Body': BrokenBody(data[offset:offset + 10], offset + 10 < len(data))}
+
+        file_info = _sliced_file_info(2)
+        responses.add(responses.Response(method='GET', url=MANIFEST_URL, json=file_info['manifest']))
+        self.s3.meta.client.get_object.side_effect = get_object
+        with patch('boto3.resource', return_value=self.s3):
+            open_first, open_second = self.files._get_slice_openers(file_info)
+            with open_first() as stream:
+                self.assertEqual(data, stream.read())
+            with self.assertRaises(botocore.exceptions.ClientError):
+                open_second()
+        self.assertEqual([None, 'bytes=10-', 'bytes=20-', None], ranges)
+
+    def test_sliced_azure(self):
+        """
+        Slices of a sliced file on Azure are listed by its manifest for
+        downloads and streams alike
+        """
+        file_info = {
+            'id': 123, 'name': 'table.csv', 'provider': 'azure', 'isSliced': True,
+            'absPath': {'container': 'exp-2', 'name': '123.table.csv'},
+            'absCredentials': {'SASConnectionString': 'connection'}
+        }
+        blobs = {'123.table.csv0000_part_00': b'"1"\n', '123.table.csv0001_part_00': b'"2"\n'}
+        manifest = {'entries': [{'url': 'https://account.blob.core.windows.net/exp-2/' + name} for name in blobs]}
+
+        def download_blob(name):
+            data = json.dumps(manifest).encode() if name == '123.table.csvmanifest' else blobs[name]
+            downloader = MagicMock()
+            downloader.readall.return_value = data
+            downloader.readinto.side_effect = lambda stream: stream.write(data)
+            downloader.chunks.return_value = [data]
+            return downloader
+
+        service_client = MagicMock()
+        service_client.get_container_client.return_value.download_blob.side_effect = download_blob
+        destination = os.path.join(self.temp_dir.name, 'table.csv')
+        with patch('azure.storage.blob.BlobServiceClient.from_connection_string', return_value=service_client):
+            self.files._download(file_info, destination)
+            slices = [open_slice().read() for open_slice in self.files._get_slice_openers(file_info)]
+        service_client.get_container_client.assert_called_with(container='exp-2')
+        with open(destination, 'rb') as downloaded_file:
+            self.assertEqual(b'"1"\n"2"\n', downloaded_file.read())
+        self.assertEqual([b'"1"\n', b'"2"\n'], slices)
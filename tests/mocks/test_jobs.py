@@ -2,6 +2,7 @@
 Test basic functionality of the Jobs endpoint
 """
 import unittest
+from unittest.mock import patch
 
 import responses
 
@@ -156,3 +157,57 @@ class TestJobsEndpointWithMocks(unittest.TestCase):
         job_id = '22077337'
         success = self.jobs.block_for_success(job_id)
         assert success is False
+
+    def _add_job(self, job_id, statuses):
+        for status in statuses:
+            responses.add(
+                responses.Response(
+                    method='GET',
+                    url='https://connection.keboola.com/v2/storage/jobs/{}'.format(job_id),
+                    json={'id': job_id, 'status': status}
+                )
+            )
+
+    @responses.activate
+    @patch('kbcstorage.jobs.POLL_INTERVAL_MIN', 0.01)
+    def test_as_completed(self):
+        """
+        Jobs are yielded in the order they complete.
+        """
+        self._add_job(1, ['waiting', 'processing', 'processing', 'success'])
+        self._add_job(2, ['success'])
+        self._add_job(3, ['processing', 'error'])
+        jobs = list(self.jobs.as_completed([1, 2, 3]))
+        assert [job['id'] for job in jobs] == [2, 3, 1]
+
+    @responses.activate
+    @patch('kbcstorage.jobs.POLL_INTERVAL_MIN', 0.01)
+    def test_wait_all(self):
+        """
+        Completed jobs are returned in the order of job ids.
+        """
+        self._add_job(1, ['processing', 'success'])
+        self._add_job(2, ['success'])
+        jobs = self.jobs.wait_all([1, 2], max_concurrent_requests=1)
+        assert [job['id'] for job in jobs] == [1, 2]
+
+    @responses.activate
+    @patch('kbcstorage.jobs.POLL_INTERVAL_MIN', 0.01)
+    def test_wait_any(self):
+        """
+        The first completed job is returned.
+        """
+        self._add_job(1, ['processing'])
+        self._add_job(2, ['processing', 'success'])
+        job = self.jobs.wait_any([1, 2])
+        assert job['id'] == 2
+
+    @responses.activate
+    @patch('kbcstorage.jobs.POLL_INTERVAL_MIN', 0.01)
+    def test_wait_all_timeout(self):
+        """
+        Waiting fails when jobs do not complete before the deadline.
+        """
+        self._add_job(1, ['processing'])
+        with self.assertRaises(TimeoutError):
+            self.jobs.wait_all([1], timeout=0.1)
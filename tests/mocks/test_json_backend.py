@@ -0,0 +1,54 @@
+"""
+Test decoding of responses and incremental parsing of listings.
+"""
+import json
+import unittest
+from unittest.mock import MagicMock
+
+import responses
+
+from kbcstorage import json_backend
+from kbcstorage.tables import Tables
+
+from .table_responses import list_response
+
+
+class TestJsonBackend(unittest.TestCase):
+    def tearDown(self):
+        json_backend.set_loads()
+
+    def test_iter_array(self):
+        """
+        Items are parsed regardless of how the document is split.
+        """
+        document = json.dumps([{'id': 'in.c-é', 'columns': ['a', ']']}, 123, -4.5e-3, 'x"', None, True])
+        data = document.encode('utf-8')
+        for size in (1, 2, 3, 7, len(data)):
+            with self.subTest(size=size):
+                chunks = [data[i:i + size] for i in range(0, len(data), size)]
+                self.assertEqual(json.loads(document), list(json_backend.iter_array(chunks)))
+        self.assertEqual([], list(json_backend.iter_array([b' [ ', b' ]'])))
+
+    def test_iter_array_invalid(self):
+        for data in (b'[1, 2', b'[1 2]', b'{"id": 1}'):
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    list(json_backend.iter_array([data]))
+
+    @responses.activate
+    def test_set_loads(self):
+        """
+        Responses are decoded with the configured function.
+        """
+        responses.add(responses.GET, 'https://connection.keboola.com/v2/storage/tables', json=list_response)
+        loads = MagicMock(side_effect=json.loads)
+        json_backend.set_loads(loads)
+        self.assertEqual(list_response, Tables('https://connection.keboola.com', 'token').list())
+        self.assertTrue(loads.called)
+
+    @responses.activate
+    def test_iter_list(self):
+        responses.add(responses.GET, 'https://connection.keboola.com/v2/storage/tables', json=list_response)
+        tables = Tables('https://connection.keboola.com', 'token').iter_list()
+        self.assertEqual(list_response[0], next(tables))
+        self.assertEqual(list_response[1:], list(tables))
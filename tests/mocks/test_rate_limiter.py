@@ -0,0 +1,70 @@
+"""
+Test the adaptive rate limiting of requests.
+"""
+import unittest
+from unittest.mock import patch
+
+import responses
+
+from kbcstorage.rate_limiter import RateLimiter, RateLimits, get_endpoint_group
+from kbcstorage.retry_requests import RetryRequests
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Test the adaptive token bucket.
+    """
+    @patch('time.monotonic', return_value=100.0)
+    def test_reserve(self, monotonic_mock):
+        """
+        Requests over the burst are queued at the rate of the limiter.
+        """
+        limiter = RateLimiter(rate=2, burst=2)
+        self.assertEqual([0.0, 0.0, 0.5, 1.0], [limiter.reserve() for _ in range(4)])
+        monotonic_mock.return_value = 102.0
+        self.assertEqual(0.0, limiter.reserve())
+
+    @patch('time.monotonic', return_value=100.0)
+    def test_aimd(self, monotonic_mock):
+        """
+        The rate is halved on throttling at most once per cooldown and grows
+        back additively.
+        """
+        limiter = RateLimiter(rate=8, min_rate=1, max_rate=10)
+        limiter.record(throttled=True)
+        limiter.record(throttled=True)
+        self.assertEqual(4, limiter.rate)
+        monotonic_mock.return_value = 102.0
+        limiter.record(throttled=True)
+        self.assertEqual(2, limiter.rate)
+        limiter.record(throttled=False)
+        self.assertEqual(2.5, limiter.rate)
+        for _ in range(100):
+            limiter.record(throttled=False)
+        self.assertEqual(10, limiter.rate)
+
+    def test_endpoint_group(self):
+        url = 'https://connection.keboola.com/v2/storage/'
+        self.assertEqual('jobs', get_endpoint_group('GET', url + 'jobs/123'))
+        self.assertEqual('files', get_endpoint_group('POST', url + 'files/prepare'))
+        self.assertEqual('list', get_endpoint_group('GET', url + 'tables'))
+        self.assertEqual('write', get_endpoint_group('POST', url + 'buckets'))
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_transport(self, sleep_mock):
+        """
+        The transport waits for the limiter of the group of a request and
+        slows down when throttled.
+        """
+        url = 'https://connection.keboola.com/v2/storage/jobs/123'
+        responses.add(responses.Response(method='GET', url=url, json={}, status=429,
+                                         headers={'Retry-After': '0'}))
+        responses.add(responses.Response(method='GET', url=url, json={'id': 123}))
+        jobs = RateLimiter(rate=4, burst=1)
+        files = RateLimiter(rate=1, burst=1)
+        transport = RetryRequests(rate_limits=RateLimits({'jobs': jobs, 'files': files}))
+        self.assertEqual({'id': 123}, transport.get(url).json())
+        self.assertLess(jobs.rate, 4)
+        self.assertEqual(1, files.rate)
+        self.assertGreater(sleep_mock.call_args_list[-1][0][0], 0)
@@ -8,6 +8,7 @@ import requests
 import responses
 
 from kbcstorage.base import Endpoint
+from kbcstorage.retry_requests import RetryBudget, RetryPolicy, RetryRequests, _get_jittered_backoff
 from kbcstorage.tables import Tables
 
 from .table_responses import list_response
@@ -167,3 +168,118 @@ class TestRequestRetry(unittest.TestCase):
             )
         )
         assert isinstance(self.two_retries.list(), list)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """
+    Test the retry policy of the transport.
+    """
+    url = 'https://connection.keboola.com/v2/storage/retries'
+
+    @staticmethod
+    def _add(method, statuses, headers=None):
+        for status in statuses:
+            responses.add(responses.Response(method=method, url=TestRetryPolicy.url, json={}, status=status,
+                                             headers=headers))
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_retry_after(self, sleep_mock):
+        """
+        Rate limited requests are retried after the delay the server asks for.
+        """
+        self._add('GET', [429], headers={'Retry-After': '3'})
+        self._add('GET', [200])
+        response = RetryRequests().get(self.url)
+        self.assertEqual(200, response.status_code)
+        sleep_mock.assert_called_once_with(3.0)
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_retry_after_over_max(self, sleep_mock):
+        """
+        Requests are not retried when the server asks to wait too long.
+        """
+        self._add('GET', [503], headers={'Retry-After': '3600'})
+        self.assertEqual(503, RetryRequests().get(self.url).status_code)
+        self.assertFalse(sleep_mock.called)
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_post_not_idempotent(self, sleep_mock):
+        """
+        POST requests are retried only when the server refused them.
+        """
+        self._add('POST', [503, 502, 200])
+        response = RetryRequests().post(self.url, data={'name': 'table'})
+        self.assertEqual(502, response.status_code)
+        self.assertEqual(2, len(responses.calls))
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_connection_error(self, sleep_mock):
+        """
+        Idempotent requests are retried after connection errors.
+        """
+        responses.add(responses.Response(method='GET', url=self.url, body=requests.ConnectionError('reset')))
+        self._add('GET', [200])
+        self.assertEqual(200, RetryRequests().get(self.url).status_code)
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_positional_args_retried(self, sleep_mock):
+        """
+        Positional arguments are sent with every attempt.
+        """
+        self._add('GET', [502, 200])
+        RetryRequests().get(self.url, {'include': 'columns'})
+        self.assertEqual(['include=columns', 'include=columns'],
+                         [call.request.url.split('?')[1] for call in responses.calls])
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_budget(self, sleep_mock):
+        """
+        Retries stop when the retry budget shared by requests is spent.
+        """
+        self._add('GET', [502] * 5)
+        budget = RetryBudget(ratio=0, min_per_second=0, max_balance=2)
+        response = RetryRequests(retry_policy=RetryPolicy(budget=budget)).get(self.url)
+        self.assertEqual(502, response.status_code)
+        self.assertEqual(3, len(responses.calls))
+        self.assertFalse(budget.withdraw())
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    @patch('time.monotonic', return_value=100.0)
+    def test_budget_seconds(self, monotonic_mock, sleep_mock):
+        """
+        Retries stop when the delays of the requests would exceed the
+        seconds of the budget, which refill as time passes.
+        """
+        self._add('GET', [429, 429, 429, 200], headers={'Retry-After': '2'})
+        budget = RetryBudget(max_seconds=5)
+        transport = RetryRequests(retry_policy=RetryPolicy(budget=budget))
+        self.assertEqual(429, transport.get(self.url).status_code)
+        self.assertEqual([2, 2], [call.args[0] for call in sleep_mock.call_args_list])
+        monotonic_mock.return_value = 103.0
+        self.assertEqual(200, transport.get(self.url).status_code)
+        self.assertEqual(4, len(responses.calls))
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_timeout(self, sleep_mock):
+        """
+        No retry is started that would exceed the time budget of a request.
+        """
+        self._add('GET', [429, 200], headers={'Retry-After': '2'})
+        response = RetryRequests(retry_policy=RetryPolicy(timeout=1)).get(self.url)
+        self.assertEqual(429, response.status_code)
+        self.assertFalse(sleep_mock.called)
+
+    def test_jittered_backoff(self):
+        delay = None
+        for _ in range(20):
+            next_delay = _get_jittered_backoff(delay, base=1, cap=30)
+            self.assertTrue(1 <= next_delay <= min(30, 3 * (delay or 1)))
+            delay = next_delay
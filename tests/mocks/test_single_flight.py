@@ -0,0 +1,109 @@
+"""
+Test that identical concurrent GET requests are coalesced.
+"""
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import responses
+
+from kbcstorage.aio.client import AsyncClient
+from kbcstorage.aio.single_flight import AsyncSingleFlight
+from kbcstorage.jobs import Jobs
+from kbcstorage.single_flight import SingleFlight
+
+from .job_responses import detail_response
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    Test coalescing of the requests of threads.
+    """
+    url = 'https://connection.keboola.com/v2/storage/jobs/22077337'
+
+    @responses.activate
+    def test_coalesce(self):
+        """
+        Threads waiting for the same job share one request.
+        """
+        def callback(request):
+            time.sleep(0.2)
+            return 200, {}, '{"id": 22077337, "status": "success"}'
+
+        responses.add_callback(responses.GET, self.url, callback=callback)
+        jobs = Jobs('https://connection.keboola.com', 'token')
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda _: jobs.detail(22077337), range(5)))
+        self.assertEqual(1, len(responses.calls))
+        self.assertEqual([{'id': 22077337, 'status': 'success'}] * 5, results)
+        results[0]['status'] = 'changed'
+        self.assertEqual('success', results[1]['status'])
+
+    def test_error_shared(self):
+        """
+        An error of the request is raised in all waiting threads.
+        """
+        single_flight = SingleFlight()
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.2)
+            raise ValueError('failed')
+
+        def follow():
+            started.wait()
+            return single_flight.do('key', lambda: 'not called')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.do, 'key', fail)
+            follower = executor.submit(follow)
+            with self.assertRaises(ValueError):
+                leader.result()
+            with self.assertRaises(ValueError):
+                follower.result()
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    """
+    Test coalescing of the requests of tasks.
+    """
+    async def test_coalesce(self):
+        requests = []
+
+        async def handle(request):
+            requests.append(request)
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json=detail_response)
+
+        client = AsyncClient('https://connection.keboola.com/', 'token')
+        client.http_client._transport = httpx.MockTransport(handle)
+        jobs = await asyncio.gather(*(client.jobs.detail(22077337) for _ in range(5)))
+        await client.close()
+        self.assertEqual(1, len(requests))
+        self.assertEqual([detail_response] * 5, jobs)
+
+    async def test_leader_cancelled(self):
+        """
+        A waiting task makes the call when the task making it is cancelled.
+        """
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def call():
+            calls.append(len(calls))
+            await asyncio.sleep(0.1)
+            return len(calls)
+
+        leader = asyncio.create_task(single_flight.do('key', call))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(single_flight.do('key', call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        self.assertEqual([2, 2], await asyncio.gather(*followers))
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual([0, 1], calls)
@@ -1,11 +1,29 @@
 """
 Test basic functionality of the Tables endpoint
 """
+import csv
+import gzip
+import io
+import os
+import tempfile
 import unittest
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs
 
 import responses
 
-from kbcstorage.tables import Tables
+from kbcstorage.tables import Tables, _split_csv
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
 
 from .table_responses import list_response
 
@@ -33,3 +51,361 @@ class TestTablesEndpointWithMocks(unittest.TestCase):
         )
         tables_list = self.tables.list()
         assert isinstance(tables_list, list)
+
+    @responses.activate
+    def test_submit_export(self):
+        """
+        Tables mock export runs in the background
+        """
+        responses.add(
+            responses.Response(
+                method='POST',
+                url='https://connection.keboola.com/v2/storage/tables/in.c-main.table/export-async',
+                json={'id': 123, 'status': 'waiting'}
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://connection.keboola.com/v2/storage/jobs/123',
+                json={'id': 123, 'status': 'success', 'results': {'file': {'id': 456}}}
+            )
+        )
+        future = self.tables.submit_export('in.c-main.table')
+        assert future.result() == 456
+        self.tables.shutdown()
+
+    @responses.activate
+    @patch('kbcstorage.files.Files.upload_file', return_value=789)
+    def test_submit_load(self, upload_mock):
+        """
+        Tables mock loads run in the background
+        """
+        for table in ['first', 'second']:
+            responses.add(
+                responses.Response(
+                    method='POST',
+                    url='https://connection.keboola.com/v2/storage/tables/in.c-main.{}/import-async'.format(table),
+                    json={'id': table, 'status': 'waiting'}
+                )
+            )
+            responses.add(
+                responses.Response(
+                    method='GET',
+                    url='https://connection.keboola.com/v2/storage/jobs/{}'.format(table),
+                    json={'id': table, 'status': 'success', 'results': {'table': table}}
+                )
+            )
+        futures = [self.tables.submit_load('in.c-main.{}'.format(table), '/data/{}.csv'.format(table))
+                   for table in ['first', 'second']]
+        assert [future.result()['table'] for future in futures] == ['first', 'second']
+        assert upload_mock.call_count == 2
+        self.tables.shutdown()
+
+    @staticmethod
+    def _add_export_responses(slices, table_detail=None):
+        """
+        Mock an export job of in.c-main.table into a sliced file on AWS
+        """
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://connection.keboola.com/v2/storage/tables/in.c-main.table',
+                json=table_detail or {'id': 'in.c-main.table', 'name': 'table', 'columns': ['id', 'name']}
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='POST',
+                url='https://connection.keboola.com/v2/storage/tables/in.c-main.table/export-async',
+                json={'id': 123, 'status': 'waiting'}
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://connection.keboola.com/v2/storage/jobs/123',
+                json={'id': 123, 'status': 'success', 'results': {'file': {'id': 456}}}
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://connection.keboola.com/v2/storage/files/456?federationToken=true',
+                json={
+                    'id': 456, 'name': 'table.csv.gz', 'provider': 'aws', 'isSliced': True,
+                    'url': 'https://kbc-sapi-files.s3.amazonaws.com/exp-2/456.csv.gzmanifest',
+                    'region': 'us-east-1', 's3Path': {'bucket': 'kbc-sapi-files', 'key': 'exp-2/456.csv.gz'},
+                    'credentials': {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token'}
+                }
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://kbc-sapi-files.s3.amazonaws.com/exp-2/456.csv.gzmanifest',
+                json={'entries': [{'url': 's3://kbc-sapi-files/' + key} for key in slices]}
+            )
+        )
+        s3 = MagicMock()
+        s3.meta.client.get_object.side_effect = lambda Bucket, Key: {'Body': io.BytesIO(gzip.compress(slices[Key]))}
+        return s3
+
+    @responses.activate
+    def test_export_to_file(self):
+        """
+        Tables mock export streams gzipped slices into the destination file
+        """
+        s3 = self._add_export_responses({
+            'exp-2/456.csv.gz0000_part_00': b'"1","first"\n"2","second"\n',
+            'exp-2/456.csv.gz0001_part_00': b'"3","third"\n',
+        })
+        with tempfile.TemporaryDirectory() as path_name, patch('boto3.resource', return_value=s3):
+            destination = self.tables.export_to_file('in.c-main.table', path_name)
+            assert destination == os.path.join(path_name, 'table')
+            assert os.listdir(path_name) == ['table']
+            with open(destination, 'rb') as destination_file:
+                assert destination_file.read() == b'"id","name"\n"1","first"\n"2","second"\n"3","third"\n'
+
+    @responses.activate
+    def test_export_iter(self):
+        """
+        Tables mock export yields rows parsed from the streamed slices
+        """
+        s3 = self._add_export_responses({
+            'exp-2/456.csv.gz0000_part_00': b'"1","first"\n"2","multi\nline"\n',
+            'exp-2/456.csv.gz0001_part_00': b'"3","third"\n',
+        })
+        with patch('boto3.resource', return_value=s3):
+            rows = list(self.tables.export_iter('in.c-main.table'))
+        assert rows == [['1', 'first'], ['2', 'multi\nline'], ['3', 'third']]
+
+    @responses.activate
+    def test_export_iter_batches(self):
+        """
+        Tables mock export yields batches of rows
+        """
+        s3 = self._add_export_responses({
+            'exp-2/456.csv.gz0000_part_00': b'"1","first"\n"2","second"\n',
+            'exp-2/456.csv.gz0001_part_00': b'"3","third"\n',
+        })
+        with patch('boto3.resource', return_value=s3):
+            batches = list(self.tables.export_iter('in.c-main.table', batch_size=2))
+        assert batches == [[['1', 'first'], ['2', 'second']], [['3', 'third']]]
+
+    @unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+    @responses.activate
+    def test_export_arrow(self):
+        """
+        Tables mock export is parsed into Arrow with types of the table
+        """
+        table_detail = {
+            'id': 'in.c-main.table', 'name': 'table', 'columns': ['id', 'name', 'price'],
+            'columnMetadata': {
+                'id': [{'key': 'KBC.datatype.basetype', 'value': 'INTEGER'}],
+                'price': [{'key': 'KBC.datatype.basetype', 'value': 'NUMERIC'},
+                          {'key': 'KBC.datatype.length', 'value': '10,2'}],
+            }
+        }
+        s3 = self._add_export_responses({
+            'exp-2/456.csv.gz0000_part_00': b'"1","first","1.50"\n"2","multi\nline",""\n',
+            'exp-2/456.csv.gz0001_part_00': b'',
+            'exp-2/456.csv.gz0002_part_00': b'"3","","2.25"\n',
+        }, table_detail)
+        with patch('boto3.resource', return_value=s3):
+            table = self.tables.export_arrow('in.c-main.table')
+        expected_schema = pyarrow.schema([('id', pyarrow.int64()), ('name', pyarrow.string()),
+                                          ('price', pyarrow.decimal128(10, 2))])
+        assert table.schema == expected_schema
+        assert table.column('id').to_pylist() == [1, 2, 3]
+        assert table.column('name').to_pylist() == ['first', 'multi\nline', '']
+        assert [str(value) if value is not None else None for value in table.column('price').to_pylist()] \
+            == ['1.50', None, '2.25']
+
+    @unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_arrow_numeric_types(self):
+        """
+        Numeric columns without a scale are integers, decimals when too
+        precise for 64 bits
+        """
+        for basetype, length, expected in [('NUMERIC', None, pyarrow.float64()),
+                                           ('NUMERIC', '10,2', pyarrow.decimal128(10, 2)),
+                                           ('NUMERIC', '18', pyarrow.int64()),
+                                           ('NUMERIC', '18,0', pyarrow.int64()),
+                                           ('DECIMAL', '38,0', pyarrow.decimal128(38, 0)),
+                                           ('DECIMAL', '20', pyarrow.decimal128(20, 0))]:
+            with self.subTest(basetype=basetype, length=length):
+                table_info = {'columnMetadata': {'value': [{'key': 'KBC.datatype.basetype', 'value': basetype}]}}
+                if length:
+                    table_info['columnMetadata']['value'].append({'key': 'KBC.datatype.length', 'value': length})
+                schema = self.tables._get_arrow_schema(pyarrow, table_info, ['value'])
+                assert schema.field('value').type == expected
+
+    @unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+    @responses.activate
+    def test_export_parquet(self):
+        """
+        Tables mock export is streamed into a Parquet file
+        """
+        s3 = self._add_export_responses({
+            'exp-2/456.csv.gz0000_part_00': b'"1","first"\n"2","second"\n',
+            'exp-2/456.csv.gz0001_part_00': b'"3","third"\n',
+        })
+        with tempfile.TemporaryDirectory() as path_name, patch('boto3.resource', return_value=s3):
+            path = self.tables.export_parquet('in.c-main.table', os.path.join(path_name, 'table.parquet'),
+                                              column_types={'id': pyarrow.int32()})
+            table = pyarrow.parquet.read_table(path)
+        assert table.schema.field('id').type == pyarrow.int32()
+        assert table.to_pydict() == {'id': [1, 2, 3], 'name': ['first', 'second', 'third']}
+
+    @patch('kbcstorage.tables.COPY_CHUNK_SIZE', 7)
+    def test_split_csv(self):
+        """
+        CSV files are split on row boundaries, not on line breaks in values
+        """
+        rows = [['id', 'text'], ['1', 'one'], ['2', 'multi\nline "quoted"\nvalue'], ['3', 'x' * 30], ['4', '']]
+        with tempfile.TemporaryDirectory() as path_name:
+            file_path = os.path.join(path_name, 'table.csv')
+            with open(file_path, 'w', newline='') as csv_file:
+                csv.writer(csv_file, quoting=csv.QUOTE_ALL, lineterminator='\n').writerows(rows)
+            for slice_size in [1, 5, 12, 20, 1000]:
+                with self.subTest(slice_size=slice_size):
+                    header_size, slices = _split_csv(file_path, slice_size)
+                    with open(file_path, 'rb') as csv_file:
+                        data = csv_file.read()
+                    assert data[:header_size] == b'"id","text"\n'
+                    assert b''.join(data[offset:offset + size] for _, offset, size in slices) == data[header_size:]
+                    parsed = [row for _, offset, size in slices
+                              for row in csv.reader(io.StringIO(data[offset:offset + size].decode()))]
+                    assert parsed == rows[1:]
+                    if slice_size == 1:
+                        assert len(slices) == 4
+
+    @responses.activate
+    @patch('kbcstorage.files.Files.upload_sliced_file', return_value=789)
+    def test_load_sliced(self, upload_mock):
+        """
+        Tables mock load of a large file uploads it sliced with its columns
+        """
+        responses.add(
+            responses.Response(
+                method='POST',
+                url='https://connection.keboola.com/v2/storage/tables/in.c-main.table/import-async',
+                json={'id': 123, 'status': 'waiting'}
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://connection.keboola.com/v2/storage/jobs/123',
+                json={'id': 123, 'status': 'success', 'results': {'importedColumns': ['id', 'name']}}
+            )
+        )
+        with tempfile.TemporaryDirectory() as path_name:
+            file_path = os.path.join(path_name, 'table.csv')
+            with open(file_path, 'w') as csv_file:
+                csv_file.write('"id","name"\n"1","first"\n"2","second"\n')
+            self.tables.load('in.c-main.table', file_path, slice_size=10)
+        name, slices = upload_mock.call_args.args
+        assert name == 'table.csv'
+        assert [(offset, size) for _, offset, size in slices] == [(12, 12), (24, 13)]
+        body = parse_qs(responses.calls[0].request.body)
+        assert body['columns[]'] == ['id', 'name']
+        assert body['dataFileId'] == ['789']
+
+    def test_slice_csv_columns(self):
+        """
+        Columns given to a load of a large file are kept over its header
+        """
+        with tempfile.TemporaryDirectory() as path_name:
+            file_path = os.path.join(path_name, 'table.csv')
+            with open(file_path, 'w') as csv_file:
+                csv_file.write('"id","name"\n"1","first"\n"2","second"\n')
+            columns, slices = Tables._slice_csv(file_path, 10, columns=['ID', 'NAME'])
+            assert columns == ['ID', 'NAME']
+            assert [(offset, size) for _, offset, size in slices] == [(12, 12), (24, 13)]
+            columns, _ = Tables._slice_csv(file_path, 10)
+            assert columns == ['id', 'name']
+
+    @staticmethod
+    def _add_load_responses():
+        """
+        Mock an upload to AWS and its import job into in.c-main.table
+        """
+        responses.add(
+            responses.Response(
+                method='POST',
+                url='https://connection.keboola.com/v2/storage/files/prepare',
+                json={
+                    'id': 789, 'name': 'table.csv.gz', 'provider': 'aws', 'region': 'us-east-1',
+                    'uploadParams': {
+                        'bucket': 'kbc-sapi-files', 'key': 'exp-2/789.table.csv.gz', 'acl': 'private',
+                        'x-amz-server-side-encryption': 'AES256',
+                        'credentials': {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token'}
+                    }
+                }
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='POST',
+                url='https://connection.keboola.com/v2/storage/tables/in.c-main.table/import-async',
+                json={'id': 123, 'status': 'waiting'}
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://connection.keboola.com/v2/storage/jobs/123',
+                json={'id': 123, 'status': 'success', 'results': {'importedColumns': ['id', 'name']}}
+            )
+        )
+        return MagicMock()
+
+    @staticmethod
+    def _get_loaded_data(s3):
+        return gzip.decompress(s3.Object.return_value.put.call_args.kwargs['Body'].getvalue())
+
+    @responses.activate
+    @patch('kbcstorage.tables.ENCODE_BATCH_ROWS', 2)
+    def test_load_rows(self):
+        """
+        Tables mock load of rows streams them compressed into the upload
+        """
+        s3 = self._add_load_responses()
+        rows = ([str(index), 'row "{}"\n'.format(index) if index % 2 else None] for index in range(5))
+        with patch('boto3.resource', return_value=s3):
+            results = self.tables.load_rows('in.c-main.table', rows, columns=['id', 'name'], is_incremental=True)
+        assert results == {'importedColumns': ['id', 'name']}
+        expected = 'id,name\n0,\n1,"row ""1""\n"\n2,\n3,"row ""3""\n"\n4,\n'
+        assert self._get_loaded_data(s3) == expected.encode('utf-8')
+        body = parse_qs(responses.calls[1].request.body)
+        assert body['dataFileId'] == ['789']
+        assert body['incremental'] == ['1']
+
+    @unittest.skipUnless(pandas, 'pandas is not installed')
+    @responses.activate
+    @patch('kbcstorage.tables.ENCODE_BATCH_ROWS', 2)
+    def test_load_dataframe(self):
+        """
+        Tables mock load of a DataFrame encodes it in batches
+        """
+        s3 = self._add_load_responses()
+        df = pandas.DataFrame({'id': [1, 2, 3], 'name': ['first', 'second', None]})
+        with patch('boto3.resource', return_value=s3):
+            self.tables.load_dataframe('in.c-main.table', df)
+        assert self._get_loaded_data(s3) == b'id,name\n1,first\n2,second\n3,\n'
+
+    @unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+    @responses.activate
+    @patch('kbcstorage.tables.ENCODE_BATCH_ROWS', 2)
+    def test_load_arrow(self):
+        """
+        Tables mock load of an Arrow table encodes it batch by batch
+        """
+        s3 = self._add_load_responses()
+        table = pyarrow.table({'id': [1, 2, 3], 'name': ['first', 'second', None]})
+        with patch('boto3.resource', return_value=s3):
+            self.tables.load_arrow('in.c-main.table', table)
+        loaded = list(csv.reader(io.StringIO(self._get_loaded_data(s3).decode('utf-8'))))
+        assert loaded == [['id', 'name'], ['1', 'first'], ['2', 'second'], ['3', '']]
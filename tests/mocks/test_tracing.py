@@ -0,0 +1,175 @@
+"""
+Test OpenTelemetry tracing of requests and table loads.
+"""
+import contextlib
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import responses
+
+from kbcstorage.files import Files
+from kbcstorage.retry_requests import RetryRequests
+from kbcstorage.tables import Tables
+
+from .test_files import MANIFEST_URL, UPLOAD_RESOURCE, _sliced_file_info
+
+try:
+    from opentelemetry import trace
+    from kbcstorage.tracing import Tracing
+except ImportError:
+    trace = None
+
+URL = 'https://connection.keboola.com/v2/storage'
+
+if trace is not None:
+    class _Span(trace.NonRecordingSpan):
+        def __init__(self, name, parent, kind, attributes, span_id):
+            super().__init__(trace.SpanContext(trace_id=1, span_id=span_id, is_remote=False,
+                                               trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED)))
+            self.name = name
+            self.parent = parent
+            self.kind = kind
+            self.attributes = dict(attributes or {})
+            self.events = []
+            self.status = None
+
+        def is_recording(self):
+            return True
+
+        def set_attribute(self, key, value):
+            self.attributes[key] = value
+
+        def set_attributes(self, attributes):
+            self.attributes.update(attributes)
+
+        def add_event(self, name, attributes=None, timestamp=None):
+            self.events.append((name, dict(attributes or {})))
+
+        def set_status(self, status, description=None):
+            self.status = status
+
+    class _Tracer(trace.Tracer):
+        """
+        Tracer keeping the spans in memory.
+        """
+        def __init__(self):
+            self.spans = []
+            self._lock = threading.Lock()
+
+        def start_span(self, name, context=None, kind=trace.SpanKind.INTERNAL, attributes=None, *args, **kwargs):
+            parent = trace.get_current_span(context)
+            with self._lock:
+                span = _Span(name, parent if isinstance(parent, _Span) else None, kind, attributes,
+                             len(self.spans) + 1)
+                self.spans.append(span)
+            return span
+
+        @contextlib.contextmanager
+        def start_as_current_span(self, name, context=None, kind=trace.SpanKind.INTERNAL, attributes=None,
+                                  *args, **kwargs):
+            with trace.use_span(self.start_span(name, context, kind, attributes), end_on_exit=True) as span:
+                yield span
+
+    class _TracerProvider(trace.TracerProvider):
+        def __init__(self):
+            self.tracer = _Tracer()
+
+        def get_tracer(self, *args, **kwargs):
+            return self.tracer
+
+
+@unittest.skipUnless(trace, 'opentelemetry-api is not installed')
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.provider = _TracerProvider()
+        self.transport = RetryRequests(tracing=Tracing(self.provider))
+
+    def get_span(self, name):
+        return next(span for span in self.provider.tracer.spans if span.name == name)
+
+    def get_tree(self, span=None):
+        """
+        Names of the spans nested under their parents.
+        """
+        return [(child.name, self.get_tree(child)) for child in self.provider.tracer.spans if child.parent is span]
+
+    @responses.activate
+    @patch('time.sleep', return_value=None)
+    def test_request(self, sleep_mock):
+        """
+        A request is a client span whose trace context is sent in the headers.
+        """
+        responses.add(responses.GET, URL + '/buckets', status=503)
+        responses.add(responses.GET, URL + '/buckets', json=[])
+        self.transport.get(URL + '/buckets', headers={'X-StorageApi-Token': 'token'})
+        span = self.get_span('GET')
+        self.assertEqual(trace.SpanKind.CLIENT, span.kind)
+        self.assertEqual(200, span.attributes['http.response.status_code'])
+        self.assertEqual([('retry', {'attempt': 1, 'delay': sleep_mock.call_args.args[0],
+                                     'http.response.status_code': 503})], span.events)
+        for call in responses.calls:
+            self.assertEqual('00-{:032x}-{:016x}-01'.format(1, span.get_span_context().span_id),
+                             call.request.headers['traceparent'])
+            self.assertEqual('token', call.request.headers['X-StorageApi-Token'])
+
+    @responses.activate
+    def test_request_error(self):
+        responses.add(responses.GET, URL + '/buckets', status=404)
+        self.transport.get(URL + '/buckets')
+        span = self.get_span('GET')
+        self.assertEqual(trace.StatusCode.ERROR, span.status.status_code)
+        self.assertEqual('404', span.attributes['error.type'])
+
+    @responses.activate
+    def test_load(self):
+        """
+        A load is a span with the spans of its upload and its job.
+        """
+        responses.add(responses.POST, URL + '/files/prepare', json=UPLOAD_RESOURCE)
+        responses.add(responses.POST, URL + '/tables/in.c-main.table/import-async', json={'id': 123})
+        responses.add(responses.GET, URL + '/jobs/123', json={'id': 123, 'status': 'success', 'results': {}})
+        tables = Tables('https://connection.keboola.com', 'token', transport=self.transport)
+        with tempfile.TemporaryDirectory() as path_name, patch('boto3.resource'):
+            file_path = os.path.join(path_name, 'table.csv')
+            with open(file_path, 'w') as csv_file:
+                csv_file.write('"id","name"\n"1","first"\n')
+            tables.load('in.c-main.table', file_path)
+        self.assertEqual([
+            ('kbcstorage.tables.load', [
+                ('kbcstorage.files.upload_file', [
+                    ('kbcstorage.files.prepare', [('POST', [])]),
+                    ('kbcstorage.transfer.upload', []),
+                ]),
+                ('kbcstorage.jobs.start', [('POST', [])]),
+                ('kbcstorage.jobs.wait', [('GET', [])]),
+            ])
+        ], self.get_tree())
+        self.assertEqual('in.c-main.table', self.get_span('kbcstorage.tables.load').attributes['kbc.table_id'])
+        self.assertEqual('success', self.get_span('kbcstorage.jobs.wait').attributes['kbc.status'])
+
+    @responses.activate
+    def test_download_sliced(self):
+        """
+        Slices downloaded in other threads are children of the download.
+        """
+        file_info = _sliced_file_info(2)
+        responses.add(responses.GET, MANIFEST_URL, json=file_info['manifest'])
+        responses.add(responses.GET, URL + '/files/123', json=file_info)
+        s3 = MagicMock()
+        s3.meta.client.download_file.side_effect = lambda bucket, key, path: open(path, 'w').close()
+        files = Files('https://connection.keboola.com', 'token', transport=self.transport)
+        with tempfile.TemporaryDirectory() as temp_dir, patch('boto3.resource', return_value=s3):
+            files.download(123, temp_dir)
+        self.assertEqual([
+            ('kbcstorage.files.download', [
+                ('GET', []),
+                ('kbcstorage.transfer.download', [
+                    ('kbcstorage.transfer.download_slice', []),
+                    ('kbcstorage.transfer.download_slice', []),
+                    ('kbcstorage.transfer.merge', []),
+                ]),
+            ])
+        ], self.get_tree())
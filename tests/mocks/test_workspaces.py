@@ -1,6 +1,8 @@
 """
 Asses basic functionality of the Workspace endpoint.
 """
+import contextlib
+import io
 import unittest
 import responses
 from requests import HTTPError
@@ -235,3 +237,48 @@ class TestWorkspacesEndpointWithMocks(unittest.TestCase):
             self.ws.load_files(workspace_id, {'tags': ['sapi-client-python-tests'], 'destination': 'data/in/files'})
         except Exception as ex:
             assert str(ex) == msg
+
+    @responses.activate
+    def test_load_files_errors(self):
+        """
+        Mock load_files prints the errors of the failed load jobs
+        """
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://connection.keboola.com/v2/storage/workspaces/1',
+                json=dict(detail_response, type='file', connection={'backend': 'abs'})
+            )
+        )
+        responses.add(
+            responses.Response(
+                method='GET',
+                url='https://connection.keboola.com/v2/storage/files',
+                json=[{'id': file_id, 'name': 'file{}'.format(file_id)} for file_id in range(1, 4)]
+            )
+        )
+        for job_id in range(1, 4):
+            responses.add(
+                responses.Response(
+                    method='POST',
+                    url='https://connection.keboola.com/v2/storage/workspaces/1/load',
+                    json={'id': job_id, 'status': 'waiting', 'results': None}
+                )
+            )
+        for job in [{'id': 1, 'status': 'success', 'results': {}},
+                    {'id': 2, 'status': 'error', 'results': None, 'error': {'message': 'Invalid file'}},
+                    {'id': 3, 'status': 'error', 'results': None}]:
+            responses.add(
+                responses.Response(
+                    method='GET',
+                    url='https://connection.keboola.com/v2/storage/jobs/{}'.format(job['id']),
+                    json=job
+                )
+            )
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.ws.load_files(1, {'tags': ['sapi-client-python-tests'], 'destination': 'data/in/files'})
+        assert sorted(output.getvalue().splitlines()) == [
+            'An unknown error occurred loading data.  Job ID 3',
+            'Failed to load a file with error: Invalid file',
+        ]